@@ -0,0 +1,163 @@
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+
+from agent.intent_classifier import LinearIntentClassifier
+from agent.vectorizer_io import export_tfidf_vectorizer, load_tfidf_vectorizer
+
+logger = logging.getLogger(__name__)
+
+# Incrementar sempre que o layout dos artefatos mudar
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+# Tentativas de `load_artifacts` quando a versão apontada é removida durante a leitura
+LOAD_RETRIES = 3
+
+# Parâmetros do HashingVectorizer que afetam `transform` (todos JSON-serializáveis)
+HASHING_PARAMS = ("ngram_range", "n_features", "alternate_sign", "norm", "lowercase", "analyzer", "binary")
+
+
+def is_artifact_dir(path) -> bool:
+    return (Path(path) / MANIFEST_FILE).is_file()
+
+
+def supports_artifacts(model, vectorizer) -> bool:
+    """
+    Indica se o par modelo/vetorizador pode ser gravado sem pickle: vetorizador TF-IDF ou
+    hashing e classificador linear (LinearIntentClassifier ou estimador com `coef_`).
+    O SVC com probabilidades calibradas (Platt) não tem representação linear e fica no pickle.
+    """
+    # Importado só aqui: o scikit-learn é a maior parte do custo de import do processo
+    from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+
+    if not isinstance(vectorizer, (TfidfVectorizer, HashingVectorizer)):
+        return False
+    if isinstance(model, LinearIntentClassifier):
+        return True
+    return hasattr(model, "coef_") and not getattr(model, "probability", False) and hasattr(model, "classes_")
+
+
+def save_artifacts(directory, model, vectorizer) -> Path:
+    """
+    Grava classificador e vetorizador em `directory` como arrays NumPy + manifesto JSON:
+    coef_t.npy (pesos transpostos, float32, prontos para mmap), intercept.npy, classes.json
+    e, para TF-IDF, vocabulary.json + idf.npy.
+
+    Cada gravação vai para um diretório próprio ao lado do destino
+    (`.<nome>.v-<ns>-<pid>`), e `directory` é um link simbólico para a versão atual, trocado
+    com os.replace (atômico): em nenhum momento o caminho deixa de existir ou aponta para
+    artefatos incompletos. A versão anterior é mantida até a próxima gravação, para leitores
+    que já resolveram o link (`load_artifacts`); as mais antigas são apagadas.
+    """
+    if not supports_artifacts(model, vectorizer):
+        raise ValueError(f"Modelo {type(model).__name__} não suportado pelo formato de artefatos.")
+    if not isinstance(model, LinearIntentClassifier):
+        model = LinearIntentClassifier.from_estimator(model)
+
+    target = Path(directory)
+    target.parent.mkdir(parents=True, exist_ok=True)
+    tmp = target.parent / f".{target.name}.v-{time.time_ns()}-{os.getpid()}"
+    tmp.mkdir()
+
+    # Transposta contígua: é o layout usado por LinearIntentClassifier em X @ W^T
+    np.save(tmp / "coef_t.npy", np.ascontiguousarray(model.coef_.T, dtype=np.float32))
+    np.save(tmp / "intercept.npy", np.asarray(model.intercept_, dtype=np.float32))
+    with open(tmp / "classes.json", "w", encoding="utf-8") as f:
+        json.dump([str(c) for c in model.classes_], f, ensure_ascii=False)
+
+    if hasattr(vectorizer, "vocabulary_"):  # TfidfVectorizer treinado
+        params, terms, idf = export_tfidf_vectorizer(vectorizer)
+        with open(tmp / "vocabulary.json", "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(tmp / "idf.npy", idf)
+        vectorizer_manifest = {"type": "tfidf", "params": params}
+    else:
+        params = {name: getattr(vectorizer, name) for name in HASHING_PARAMS}
+        params["ngram_range"] = list(params["ngram_range"])
+        vectorizer_manifest = {"type": "hashing", "params": params}
+
+    manifest = {
+        "format_version": ARTIFACT_FORMAT_VERSION,
+        "created_at": time.time(),
+        "classifier": {"type": "linear", "n_classes": len(model.classes_), "n_features": model.n_features_in_},
+        "vectorizer": vectorizer_manifest,
+    }
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    previous = target.resolve() if target.is_symlink() else None
+    link = target.parent / f".{target.name}.link-{os.getpid()}"
+    if link.is_symlink():
+        link.unlink()
+    os.symlink(tmp.name, link)
+    if target.is_dir() and not target.is_symlink():
+        # Layout anterior (diretório comum): convertido uma única vez, com uma breve janela sem o caminho
+        legacy = target.parent / f".{target.name}.v-legacy-{os.getpid()}"
+        os.rename(target, legacy)
+        previous = legacy
+    os.replace(link, target)
+    _remove_old_versions(target, keep={tmp.name, previous.name if previous else None})
+    logger.info(f"Artefatos do classificador gravados em {target} ({tmp.name}).")
+    return target
+
+
+def _remove_old_versions(target: Path, keep) -> None:
+    for path in target.parent.glob(f".{target.name}.v-*"):
+        if path.name not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def load_artifacts(directory, mmap: bool = True) -> Tuple[LinearIntentClassifier, object]:
+    """
+    Carrega classificador e vetorizador gravados por `save_artifacts`, sem pickle.
+    Com `mmap=True` os pesos são mapeados em memória (somente leitura), então vários
+    workers compartilham as mesmas páginas do cache do sistema operacional. O link da
+    versão atual é resolvido uma vez por tentativa, então todos os arquivos vêm da mesma
+    gravação; se a versão for removida durante a leitura (duas gravações seguidas), o link
+    é resolvido de novo.
+
+    Returns:
+        tuple: (LinearIntentClassifier, TfidfVectorizer|HashingVectorizer)
+    """
+    link = Path(directory)
+    for attempt in range(LOAD_RETRIES):
+        try:
+            return _load_version(link.resolve(), mmap)
+        except FileNotFoundError:
+            if attempt == LOAD_RETRIES - 1 or not link.is_symlink():
+                raise
+
+
+def _load_version(directory: Path, mmap: bool) -> Tuple[LinearIntentClassifier, object]:
+    with open(directory / MANIFEST_FILE, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Versão de artefatos incompatível em {directory}: {manifest.get('format_version')}")
+
+    mode = "r" if mmap else None
+    coef_t = np.load(directory / "coef_t.npy", mmap_mode=mode)
+    intercept = np.load(directory / "intercept.npy")
+    with open(directory / "classes.json", "r", encoding="utf-8") as f:
+        classes = json.load(f)
+    model = LinearIntentClassifier(coef_t.T, intercept, classes)
+
+    spec = manifest["vectorizer"]
+    if spec["type"] == "tfidf":
+        with open(directory / "vocabulary.json", "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        vectorizer = load_tfidf_vectorizer(spec["params"], terms, np.load(directory / "idf.npy"))
+    elif spec["type"] == "hashing":
+        from sklearn.feature_extraction.text import HashingVectorizer
+
+        params = dict(spec["params"])
+        params["ngram_range"] = tuple(params["ngram_range"])
+        vectorizer = HashingVectorizer(**params)
+    else:
+        raise ValueError(f"Tipo de vetorizador desconhecido em {directory}: {spec['type']}")
+    return model, vectorizer
@@ -0,0 +1,126 @@
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List
+
+import numpy as np
+
+from config.config import EMBEDDING_BATCH_MAX_SIZE, EMBEDDING_BATCH_MAX_LATENCY_MS, EMBEDDING_BATCH_TIMEOUT
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingBatcher:
+    def __init__(self, encoder, max_batch_size: int = EMBEDDING_BATCH_MAX_SIZE,
+                 max_latency_ms: float = EMBEDDING_BATCH_MAX_LATENCY_MS, timeout: float = EMBEDDING_BATCH_TIMEOUT):
+        """
+        Agrupa pedidos de embedding de chamadas concorrentes em um único `encode(lista)`.
+
+        Args:
+            encoder: objeto com `encode(sentences, batch_size=..., convert_to_numpy=True)`.
+            max_batch_size (int): máximo de textos por lote.
+            max_latency_ms (float): tempo máximo que o primeiro pedido espera o lote encher.
+            timeout (float): segundos que `encode` espera pelo lote antes de codificar direto.
+        """
+        self.encoder = encoder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max(0.0, max_latency_ms) / 1000.0
+        self.timeout = max(0.0, timeout)
+        self._queue = queue.Queue()
+        self._worker = None
+        self._worker_pid = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._errors = 0
+        self._fallbacks = 0
+        self._encode_time = 0.0
+
+    def _ensure_worker(self):
+        # A thread é criada no primeiro uso e recriada após fork (threads não sobrevivem ao fork)
+        if self._worker is not None and self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+        with self._lock:
+            if self._worker is None or self._worker_pid != os.getpid() or not self._worker.is_alive():
+                self._queue = queue.Queue()
+                self._worker_pid = os.getpid()
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Codifica os textos compartilhando lotes com outras chamadas concorrentes.
+        Se o lote não ficar pronto em `timeout` segundos (thread parada ou travada), os
+        pedidos ainda na fila são cancelados e os textos são codificados direto no encoder.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        self._ensure_worker()
+        futures = []
+        for text in texts:
+            future = Future()
+            self._queue.put((text, future))
+            futures.append(future)
+        deadline = time.monotonic() + self.timeout
+        try:
+            return np.stack([f.result(timeout=max(0.0, deadline - time.monotonic())) for f in futures])
+        except FutureTimeoutError:
+            for future in futures:
+                future.cancel()
+            self._fallbacks += 1
+            logger.warning(f"Lote de embeddings sem resposta em {self.timeout}s; codificando {len(texts)} textos direto.")
+            return np.asarray(self.encoder.encode(list(texts), batch_size=len(texts), convert_to_numpy=True))
+
+    def encode_one(self, text: str) -> np.ndarray:
+        return self.encode([text])[0]
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            # Pedidos cancelados por timeout em `encode` já foram codificados direto
+            batch = [(text, future) for text, future in self._collect() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            start = time.perf_counter()
+            try:
+                embeddings = self.encoder.encode(texts, batch_size=len(texts), convert_to_numpy=True)
+                for (_, future), embedding in zip(batch, embeddings):
+                    future.set_result(embedding)
+            except Exception as e:
+                logger.error(f"Erro no lote de embeddings ({len(texts)} textos): {e}")
+                self._errors += 1
+                for _, future in batch:
+                    future.set_exception(e)
+            self._encode_time += time.perf_counter() - start
+            self._batches += 1
+            self._items += len(texts)
+
+    def get_stats(self) -> Dict:
+        """Métricas do batcher, incluindo a taxa de preenchimento dos lotes."""
+        batches = self._batches
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_latency_ms": self.max_latency * 1000,
+            "batches": batches,
+            "items": self._items,
+            "errors": self._errors,
+            "fallbacks": self._fallbacks,
+            "pending": self._queue.qsize(),
+            "avg_batch_size": self._items / batches if batches else 0.0,
+            "fill_rate": self._items / (batches * self.max_batch_size) if batches else 0.0,
+            "avg_encode_ms": self._encode_time / batches * 1000 if batches else 0.0,
+        }
@@ -0,0 +1,91 @@
+import logging
+import threading
+import time
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitOpenError(Exception):
+    """O circuito está aberto: a dependência está indisponível e a chamada não foi feita."""
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 3, reset_timeout: float = 10.0):
+        """
+        Circuit breaker simples: após `failure_threshold` falhas seguidas o circuito abre e
+        as chamadas falham imediatamente; depois de `reset_timeout` segundos uma única
+        chamada de teste é liberada (meio-aberto) para verificar a recuperação.
+
+        Args:
+            name (str): nome da dependência protegida (usado nos logs).
+            failure_threshold (int): falhas consecutivas para abrir o circuito.
+            reset_timeout (float): segundos até liberar a chamada de teste.
+        """
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self._times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """Indica se a chamada pode ser feita agora."""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> bool:
+        """
+        Registra uma chamada bem sucedida.
+
+        Returns:
+            bool: True se o circuito estava aberto/meio-aberto e acabou de fechar (recuperação).
+        """
+        with self._lock:
+            recovered = self._state != self.CLOSED
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+        if recovered:
+            logger.info(f"Circuito '{self.name}' fechado: dependência recuperada.")
+        return recovered
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._times_opened += 1
+                    logger.warning(f"Circuito '{self.name}' aberto após {self._failures} falhas.")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def get_status(self) -> Dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self._times_opened,
+        }
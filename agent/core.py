@@ -1,101 +1,484 @@
+import asyncio
 import random
 import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from agent.nlp import NLPProcessor
 from agent.llm_api import LLMAPI
 from agent.memory import MemoryManager
 from agent.plugins.plugins import PluginManager
 from agent.knowledge_base import KnowledgeBase
+from agent.hot_reload import ModelState
 from agent.reranker import Reranker
-from config.config import KNOWLEDGE_BASE_PATH, LOG_LEVEL
+from agent.model_registry import registry
+from agent.response_cache import ResponseCache
+from agent.semantic_cache import SemanticCache, context_key
+from agent.metrics import STAGE_SECONDS, RESPONSES, LLM_CALLS
+from config.config import (
+    KNOWLEDGE_BASE_PATH, KNOWLEDGE_FILES, KB_SNAPSHOT_PATH, LOG_LEVEL, MEMORY_MAX_CACHED_SESSIONS,
+    ENABLE_CACHING, RESPONSE_CACHE_SHARED, STAGED_STARTUP, STARTUP_WAIT_TIMEOUT,
+    SEMANTIC_CACHE_ENABLED, SEMANTIC_CACHE_SHARED, SEMANTIC_CACHE_CONTEXT,
+)
 
 
+class NotReadyError(Exception):
+    """Os componentes pesados do agente ainda estão carregando (ou falharam ao carregar)."""
+
 
 class AgentCore:
     CONTEXT_LIMIT = 50  # máximo de interações guardadas no contexto
 
-    def __init__(self):
+    def __init__(self, staged=STAGED_STARTUP, knowledge_files=KNOWLEDGE_FILES, kb_snapshot_path=KB_SNAPSHOT_PATH,
+                 model_dir=None, engine=None, memory=None, llm=None, reranker=None):
+        """
+        Com `staged=True` só os componentes leves (memória, plugins, LLM, cache) são criados
+        aqui; base de conhecimento, classificador e embeddings carregam em uma thread em
+        segundo plano, nessa ordem. Enquanto isso, mensagens idênticas a um padrão da base
+        já são respondidas e as demais aguardam até STARTUP_WAIT_TIMEOUT (`NotReadyError`).
+
+        Os demais argumentos substituem as dependências padrão (usado pelos benchmarks):
+        arquivos e snapshot da base, diretório/engine dos modelos de intenção e instâncias
+        prontas de MemoryManager, LLMAPI e Reranker.
+        """
         logging.basicConfig(level=LOG_LEVEL)
-        self.nlp = NLPProcessor()
-        self.llm = LLMAPI()
-        self.memory = MemoryManager()
+        self.llm = llm or LLMAPI()
+        self.memory = memory or MemoryManager()
         self.plugins = PluginManager()
-        self.reranker = Reranker()
         self.context = self.load_context()
+        # Contextos em memória das demais sessões (LRU limitado a MEMORY_MAX_CACHED_SESSIONS)
+        self.session_contexts = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        # Cache das respostas determinísticas (intenção/padrão); desativado por padrão
+        self.cache = ResponseCache(memory=self.memory if RESPONSE_CACHE_SHARED else None) if ENABLE_CACHING else None
+        # Cache semântico na frente da LLM: paráfrases de perguntas já respondidas por ela
+        self.semantic_cache = SemanticCache(
+            embed=lambda text: self.nlp.embed_text(text),
+            memory=self.memory if SEMANTIC_CACHE_SHARED else None,
+        ) if SEMANTIC_CACHE_ENABLED else None
+
+        # Classificador + base de conhecimento; trocados em bloco pelo HotReloader
+        self.state = None
+        self.reranker = None
+        self.staged = staged
+        self.knowledge_files = knowledge_files
+        self.kb_snapshot_path = kb_snapshot_path
+        self.nlp_options = {k: v for k, v in (("model_dir", model_dir), ("engine", engine)) if v is not None}
+        self._reranker = reranker
+        self._startup_kb = None
+        self._loaded = threading.Event()
+        self._startup = {"stage": "starting", "started_at": time.time(), "components": {}, "error": None,
+                         "degraded": []}
+        if staged:
+            threading.Thread(target=self._load_components, name="agent-startup", daemon=True).start()
+        else:
+            self._load_components()
+
+    @contextmanager
+    def _stage(self, name):
+        self._startup["stage"] = name
+        component = self._startup["components"][name] = {"status": "loading", "seconds": None}
+        start = time.perf_counter()
+        try:
+            yield
+            component["status"] = "ready"
+        except Exception:
+            component["status"] = "failed"
+            raise
+        finally:
+            component["seconds"] = round(time.perf_counter() - start, 3)
+
+    def _load_components(self):
+        try:
+            with self._stage("knowledge_base"):
+                kb = KnowledgeBase(self.knowledge_files, snapshot_path=self.kb_snapshot_path)
+            # A partir daqui, padrões idênticos já podem ser respondidos
+            self._startup_kb = kb
+            with self._stage("intent_model"):
+                nlp = NLPProcessor(**self.nlp_options)
+            with self._stage("reranker"):
+                reranker = self._reranker or Reranker()
+                # Embeddings das respostas da base calculados uma única vez (ou lidos do cache em disco)
+                reranker.precompute(kb.get_all_responses())
+            if self.staged:
+                try:
+                    with self._stage("embedding_model"):
+                        registry.warm_up()
+                except Exception as e:
+                    # Base e classificador já carregaram: segue sem reranking, como no modo sem etapas
+                    logging.error(f"Modelo de embeddings indisponível; respondendo sem reranking: {e}")
+                    reranker.disable()
+                    self._startup["degraded"].append("embedding_model")
+            self.reranker = reranker
+            self.state = ModelState(nlp, kb)
+            self._startup["stage"] = "ready"
+        except Exception as e:
+            self._startup["stage"] = "failed"
+            self._startup["error"] = str(e)
+            logging.error(f"Falha ao inicializar o agente: {e}")
+            if not self.staged:
+                raise
+        finally:
+            self._startup["ready_after_s"] = round(time.time() - self._startup["started_at"], 3)
+            self._loaded.set()
+
+    def is_ready(self):
+        return self._loaded.is_set() and self.state is not None
+
+    def wait_until_ready(self, timeout=STARTUP_WAIT_TIMEOUT):
+        """
+        Aguarda o fim da inicialização em etapas.
+
+        Raises:
+            NotReadyError: se o prazo acabar ou a inicialização tiver falhado.
+        """
+        self._loaded.wait(timeout)
+        if self.state is None:
+            raise NotReadyError(self._startup["error"] or "Agente ainda inicializando.")
+
+    def get_readiness(self):
+        """Estado da inicialização: etapa atual, situação e duração de cada componente."""
+        return {
+            "ready": self.is_ready(),
+            "stage": self._startup["stage"],
+            "staged": self.staged,
+            "components": {name: dict(info) for name, info in self._startup["components"].items()},
+            "error": self._startup["error"],
+            "degraded": list(self._startup["degraded"]),
+            "ready_after_s": self._startup.get("ready_after_s"),
+        }
 
-        self.kb = KnowledgeBase([
-            "data/knowledge_data_large.json",
-            "data/knowledge_data_large1.json",
-            "data/knowledge_data_large2.json",
-            "data/knowledge_data_large3.json",
-            "data/knowledge_data_large4.json",
-            "data/knowledge_data_large5.json",
-            "data/knowledge_data_large6.json",
-            "data/knowledge_data_large7.json",
-            "data/knowledge_data_large8.json",
-            "data/knowledge_data_large9.json",
-            "data/knowledge_data_large10.json",
-            "data/knowledge_data.json"
-        ])
-
-    def load_context(self):
-        history = self.memory.load_history()
+    def answer_during_startup(self, user_input):
+        """Resposta por padrão idêntico, disponível assim que a base carrega (antes dos modelos)."""
+        kb = self._startup_kb
+        intent = kb.find_exact_intent(user_input) if kb is not None else None
+        responses = kb.find_responses(intent) if intent else []
+        if not responses:
+            return None
+        RESPONSES.inc("startup")
+        return random.choice(responses)
+
+    @property
+    def nlp(self):
+        return self.state.nlp
+
+    @property
+    def kb(self):
+        return self.state.kb
+
+    def swap_state(self, state):
+        """Publica um novo conjunto de artefatos; requisições em andamento seguem com o anterior."""
+        old, self.state = self.state, state
+        return old
+
+    def warm_up(self):
+        """Carrega antecipadamente os modelos de embeddings compartilhados."""
+        if self.staged:
+            return  # já faz parte da carga em segundo plano
+        registry.warm_up()
+        logging.info(f"Modelos de embeddings carregados: {registry.loaded_models()}")
+
+    def load_context(self, session_id=None):
+        history = self.memory.load_history(session_id=session_id)
         if len(history) > self.CONTEXT_LIMIT:
             history = history[-self.CONTEXT_LIMIT:]
         return history
 
-    def save_context(self, user_input, agent_response):
-        self.context.append({"user": user_input, "agent": agent_response})
-        if len(self.context) > self.CONTEXT_LIMIT:
-            self.context = self.context[-self.CONTEXT_LIMIT:]
-        self.memory.save_interaction(user_input, agent_response)
+    def get_context(self, session_id=None):
+        if session_id is None:
+            return self.context
+        with self._sessions_lock:
+            context = self.session_contexts.get(session_id)
+            if context is not None:
+                self.session_contexts.move_to_end(session_id)
+                return context
+        context = self.load_context(session_id)
+        with self._sessions_lock:
+            context = self.session_contexts.setdefault(session_id, context)
+            while len(self.session_contexts) > MEMORY_MAX_CACHED_SESSIONS:
+                self.session_contexts.popitem(last=False)
+        return context
+
+    def save_context(self, user_input, agent_response, session_id=None):
+        with STAGE_SECONDS.time("save_context"):
+            context = self.get_context(session_id)
+            context.append({"user": user_input, "agent": agent_response})
+            if len(context) > self.CONTEXT_LIMIT:
+                del context[:-self.CONTEXT_LIMIT]
+            self.memory.save_interaction(user_input, agent_response, limit=self.CONTEXT_LIMIT, session_id=session_id)
 
-    def detect_intent(self, text):
-        prediction = self.nlp.predict_intent(text, confidence_threshold=0.6)
+    def detect_intent(self, text, state=None):
+        with STAGE_SECONDS.time("detect_intent"):
+            prediction = (state or self.state).nlp.predict_intent(text, confidence_threshold=0.6)
         if prediction and prediction['intent'] != "desconhecido":
             logging.info(f"Intenção detectada: {prediction['intent']} (Confiança: {prediction['confidence']:.2f})")
             return prediction['intent']
         logging.info("Nenhuma intenção confiável detectada.")
         return None
 
-    def get_response_from_knowledge(self, intent, user_input):
-        responses = self.kb.find_responses(intent)
+    def get_response_from_knowledge(self, intent, user_input, state=None):
+        with STAGE_SECONDS.time("knowledge_lookup"):
+            responses = (state or self.state).kb.find_responses(intent)
         if responses:
             # Utiliza reranker para melhorar resposta, se possível
-            best_response = self.reranker.rank_best_response(user_input, responses)
+            with STAGE_SECONDS.time("rerank"):
+                best_response = self.reranker.rank_best_response(user_input, responses)
             return best_response or random.choice(responses)
         return None
 
-    def get_response(self, user_input):
-        intent = self.detect_intent(user_input)
+    def answer_from_knowledge(self, user_input, state=None):
+        """
+        Parte determinística do pipeline (intenção → base → rerank, depois padrão semelhante).
+        Consulta o cache de respostas antes, quando habilitado.
+
+        Returns:
+            str|None: resposta da base de conhecimento, ou None se for preciso recorrer à LLM.
+        """
+        state = state or self.state
+        # Lida uma única vez: um add_new_intent concorrente não pode gravar esta resposta sob a versão nova
+        version = state.version
+        if self.cache is not None:
+            with STAGE_SECONDS.time("cache_lookup"):
+                cached = self.cache.get(user_input, version)
+            if cached is not None:
+                RESPONSES.inc("cache")
+                return cached
+        response = self._resolve_from_knowledge(user_input, state)
+        if response is not None and self.cache is not None:
+            self.cache.set(user_input, version, response)
+        return response
+
+    def _resolve_from_knowledge(self, user_input, state):
+        intent = self.detect_intent(user_input, state)
         if intent:
-            response = self.get_response_from_knowledge(intent, user_input)
+            response = self.get_response_from_knowledge(intent, user_input, state)
             if response:
-                self.save_context(user_input, response)
+                RESPONSES.inc("intent")
                 return response
 
-        similar_pattern = self.kb.find_most_similar_pattern(user_input, threshold=0.5)
+        with STAGE_SECONDS.time("pattern_search"):
+            similar_pattern = state.kb.find_most_similar_pattern(user_input, threshold=0.5)
         if similar_pattern:
-            responses = self.kb.get_response_by_pattern(similar_pattern)
+            responses = state.kb.get_response_by_pattern(similar_pattern)
             # Reranking também nas respostas do padrão semelhante
-            response = self.reranker.rank_best_response(user_input, responses) if responses else None
+            with STAGE_SECONDS.time("rerank"):
+                response = self.reranker.rank_best_response(user_input, responses) if responses else None
             response = response or (random.choice(responses) if responses else None)
             if response:
-                self.save_context(user_input, response)
+                RESPONSES.inc("pattern")
                 return response
+        return None
+
+    LLM_ERROR_RESPONSE = "Desculpe, não consegui processar sua solicitação."
+
+    def _semantic_context_key(self, context):
+        # "history": a resposta pode citar dados da sessão (ex.: o nome do usuário), então só é
+        # reaproveitada com o mesmo histórico enviado à LLM; "ignore" considera só a mensagem
+        if SEMANTIC_CACHE_CONTEXT == "ignore":
+            return ""
+        return context_key(self.llm.history(context))
 
-        # Fallback para LLM (apenas placeholder)
+    def _cached_llm_answer(self, user_input, context):
+        """
+        Consulta o cache semântico entre as respostas geradas com o mesmo histórico
+        (SEMANTIC_CACHE_CONTEXT). O placeholder da LLM não configurada não é guardado.
+
+        Returns:
+            tuple: (resposta ou None, embedding da pergunta ou None). Sem embedding, a resposta
+            gerada não deve ir para o cache (`_remember_llm_answer`).
+        """
+        if self.semantic_cache is None:
+            return None, None
+        if not self.llm.configured:
+            self.semantic_cache.record_skip()
+            return None, None
+        try:
+            with STAGE_SECONDS.time("semantic_cache_lookup"):
+                response, vector = self.semantic_cache.lookup(user_input, self._semantic_context_key(context))
+        except Exception as e:
+            logging.error(f"Erro ao consultar o cache semântico: {e}")
+            return None, None
+        if response is not None:
+            RESPONSES.inc("semantic_cache")
+        return response, vector
+
+    def _remember_llm_answer(self, user_input, response, vector, context):
+        if self.semantic_cache is None or vector is None or not response:
+            return
+        try:
+            self.semantic_cache.add(user_input, response, vector, self._semantic_context_key(context))
+        except Exception as e:
+            logging.error(f"Erro ao gravar no cache semântico: {e}")
+
+    def ask_llm(self, user_input, session_id=None):
+        # Fallback para LLM (bloqueia a thread até a resposta completa; no servidor use ask_llm_async).
+        # Cópia do contexto: prompt e chave do cache semântico usam o mesmo histórico
+        context = list(self.get_context(session_id))
+        cached, vector = self._cached_llm_answer(user_input, context)
+        if cached is not None:
+            return cached
+        RESPONSES.inc("llm")
+        try:
+            with STAGE_SECONDS.time("llm"):
+                response = self.llm.call_llm(user_input, context)
+            LLM_CALLS.inc("ok")
+            self._remember_llm_answer(user_input, response, vector, context)
+            return response
+        except Exception as e:
+            LLM_CALLS.inc("error")
+            logging.error(f"Erro na chamada da LLM: {e}")
+            return self.LLM_ERROR_RESPONSE
+
+    async def ask_llm_async(self, user_input, session_id=None):
+        """Fallback para a LLM sem ocupar uma thread durante a geração."""
+        loop = asyncio.get_running_loop()
+        # Contexto, embedding e Redis são bloqueantes: rodam no pool padrão, fora do event loop
+        context = list(await loop.run_in_executor(None, self.get_context, session_id))
+        cached, vector = await loop.run_in_executor(None, self._cached_llm_answer, user_input, context)
+        if cached is not None:
+            return cached
+        RESPONSES.inc("llm")
+        try:
+            with STAGE_SECONDS.time("llm"):
+                response = await self.llm.acall_llm(user_input, context)
+            LLM_CALLS.inc("ok")
+            await loop.run_in_executor(None, self._remember_llm_answer, user_input, response, vector, context)
+            return response
+        except Exception as e:
+            LLM_CALLS.inc("error")
+            logging.error(f"Erro na chamada da LLM: {e}")
+            return self.LLM_ERROR_RESPONSE
+
+    async def stream_llm(self, user_input, session_id=None):
+        """
+        Fallback para a LLM em trechos, à medida que são gerados. Se a chamada falhar antes do
+        primeiro trecho, emite a mensagem de erro padrão; depois dele, repassa a exceção.
+        Respostas do cache semântico chegam em um único trecho.
+        """
+        loop = asyncio.get_running_loop()
+        context = list(await loop.run_in_executor(None, self.get_context, session_id))
+        cached, vector = await loop.run_in_executor(None, self._cached_llm_answer, user_input, context)
+        if cached is not None:
+            yield cached
+            return
+        RESPONSES.inc("llm")
+        parts = []
         try:
-            response = self.llm.call_llm(user_input, self.context)
+            with STAGE_SECONDS.time("llm"):
+                async for delta in self.llm.astream(user_input, context):
+                    parts.append(delta)
+                    yield delta
+            LLM_CALLS.inc("ok")
         except Exception as e:
+            LLM_CALLS.inc("error")
             logging.error(f"Erro na chamada da LLM: {e}")
-            response = "Desculpe, não consegui processar sua solicitação."
+            if parts:
+                raise
+            yield self.LLM_ERROR_RESPONSE
+            return
+        await loop.run_in_executor(None, self._remember_llm_answer, user_input, "".join(parts), vector, context)
+
+    def prepare_response(self, user_input, session_id=None):
+        """
+        Parte síncrona de `get_response`, sem a LLM: resposta da base (ou da carga em etapas),
+        já salva no contexto, ou None quando é preciso recorrer à LLM. Permite ao servidor
+        aguardar a LLM de forma assíncrona, sem prender um worker de inferência.
+        """
+        if not self.is_ready():
+            response = self.answer_during_startup(user_input)
+            if response is not None:
+                self.save_context(user_input, response, session_id)
+                return response
+            self.wait_until_ready()
+        response = self.answer_from_knowledge(user_input)
+        if response is not None:
+            self.save_context(user_input, response, session_id)
+        return response
 
-        self.save_context(user_input, response)
+    def get_response(self, user_input, session_id=None):
+        response = self.prepare_response(user_input, session_id)
+        if response is None:
+            response = self.ask_llm(user_input, session_id)
+            self.save_context(user_input, response, session_id)
         return response
 
+    def get_responses(self, user_inputs, session_id=None):
+        """
+        Executa o pipeline completo para uma lista de mensagens, em lote: uma predição de
+        intenção, uma busca de padrões e um encode de perguntas para todas as mensagens.
+        As interações são salvas no contexto na ordem recebida.
+        """
+        responses = self.answer_batch_from_knowledge(user_inputs)
+        for i, text in enumerate(user_inputs):
+            if responses[i] is None:
+                responses[i] = self.ask_llm(text, session_id)
+            self.save_context(text, responses[i], session_id)
+        return responses
+
+    def answer_batch_from_knowledge(self, user_inputs, state=None):
+        """
+        Versão em lote de `answer_from_knowledge`; não altera contexto nem memória.
+
+        Returns:
+            list[str|None]: resposta da base para cada mensagem, ou None onde for preciso a LLM.
+        """
+        if state is None:
+            if not self.is_ready():
+                self.wait_until_ready()
+            state = self.state
+        version = state.version
+        responses = [None] * len(user_inputs)
+        pending = []
+        for i, text in enumerate(user_inputs):
+            cached = self.cache.get(text, version) if self.cache is not None else None
+            if cached is not None:
+                responses[i] = cached
+                RESPONSES.inc("cache")
+            else:
+                pending.append(i)
+
+        # Etapas em lote têm rótulos próprios: a duração cobre todas as mensagens
+        candidates = {}
+        if pending:
+            with STAGE_SECONDS.time("detect_intent_batch"):
+                predictions = state.nlp.predict_intent_batch([user_inputs[i] for i in pending], confidence_threshold=0.6)
+            unresolved = []
+            for i, prediction in zip(pending, predictions):
+                intent = prediction["intent"] if prediction and prediction["intent"] != "desconhecido" else None
+                kb_responses = state.kb.find_responses(intent) if intent else []
+                if kb_responses:
+                    candidates[i] = kb_responses
+                    RESPONSES.inc("intent")
+                else:
+                    unresolved.append(i)
+            if unresolved:
+                with STAGE_SECONDS.time("pattern_search_batch"):
+                    patterns = state.kb.find_most_similar_patterns([user_inputs[i] for i in unresolved], threshold=0.5)
+                for i, pattern in zip(unresolved, patterns):
+                    kb_responses = state.kb.get_response_by_pattern(pattern) if pattern else []
+                    if kb_responses:
+                        candidates[i] = kb_responses
+                        RESPONSES.inc("pattern")
+
+        if candidates:
+            order = list(candidates)
+            with STAGE_SECONDS.time("rerank_batch"):
+                ranked = self.reranker.rank_best_responses([user_inputs[i] for i in order], [candidates[i] for i in order])
+            for i, best in zip(order, ranked):
+                responses[i] = best or random.choice(candidates[i])
+                if self.cache is not None:
+                    self.cache.set(user_inputs[i], version, responses[i])
+        return responses
+
     def execute_plugin(self, command, params=None):
         return self.plugins.execute_command(command, params)
 
+    def close(self):
+        """Libera recursos e grava interações ainda pendentes na memória."""
+        self.memory.close()
+        self.llm.close()
+
 if __name__ == "__main__":
     agent = AgentCore()
     print("Jarvis iniciado. Digite 'sair' para encerrar.")
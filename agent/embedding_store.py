@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def text_key(text: str) -> str:
+    """Chave estável de um texto (sha1 do conteúdo em UTF-8)."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    def __init__(self, dim: Optional[int] = None, model_name: Optional[str] = None):
+        """
+        Armazena embeddings normalizados (L2) de textos, indexados pelo hash do texto.
+
+        Args:
+            dim (int|None): dimensão dos embeddings; definida no primeiro lote se None.
+            model_name (str|None): modelo que gerou os embeddings, gravado nos metadados
+                para descartar o store quando o modelo mudar.
+        """
+        self.dim = dim
+        self.model_name = model_name
+        # Trocados sempre juntos, sob o lock: toda linha do índice existe na matriz
+        self.matrix = np.zeros((0, dim or 0), dtype=np.float32)
+        self.index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, text: str):
+        return text_key(text) in self.index
+
+    def rows_for(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Retorna os índices das linhas dos textos, ou None se algum não estiver no store."""
+        with self._lock:
+            return self._rows(self.index, texts)
+
+    @staticmethod
+    def _rows(index, texts):
+        rows = []
+        for text in texts:
+            row = index.get(text_key(text))
+            if row is None:
+                return None
+            rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def embeddings_for(self, texts: List[str]) -> Optional[np.ndarray]:
+        """Retorna os embeddings dos textos (uma linha por texto), ou None se algum faltar."""
+        with self._lock:
+            index, matrix = self.index, self.matrix
+        rows = self._rows(index, texts)
+        return None if rows is None else matrix[rows]
+
+    def missing(self, texts: Iterable[str]) -> List[str]:
+        """Lista (sem repetição) os textos que ainda não têm embedding."""
+        seen, result = set(), []
+        for text in texts:
+            key = text_key(text)
+            if key not in self.index and key not in seen:
+                seen.add(key)
+                result.append(text)
+        return result
+
+    def add(self, texts: List[str], embeddings: np.ndarray) -> None:
+        """Adiciona embeddings (serão normalizados) para os textos informados."""
+        if not texts:
+            return
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        embeddings = embeddings / np.maximum(norms, 1e-12)
+        with self._lock:
+            dim, matrix, index = self.dim, self.matrix, self.index
+            if dim is None or matrix.shape[0] == 0:
+                dim = embeddings.shape[1]
+                matrix = np.zeros((0, dim), dtype=np.float32)
+            elif embeddings.shape[1] != dim:
+                raise ValueError(f"Embeddings com dimensão {embeddings.shape[1]}; o store usa {dim}.")
+            index = dict(index)
+            new_rows = []
+            for text, emb in zip(texts, embeddings):
+                key = text_key(text)
+                if key in index:
+                    continue
+                index[key] = matrix.shape[0] + len(new_rows)
+                new_rows.append(emb)
+            if new_rows:
+                # np.vstack copia a matriz (inclusive quando ela vem de um mmap somente leitura)
+                matrix = np.vstack([matrix, np.stack(new_rows)])
+            # Leitores copiam a referência do par sob o lock (`embeddings_for`)
+            self.dim, self.matrix, self.index = dim, matrix, index
+
+    def encode_missing(self, encoder, texts: Iterable[str], batch_size: int = 64) -> int:
+        """
+        Calcula em lote os embeddings dos textos ausentes usando o encoder.
+
+        Returns:
+            int: quantidade de novos embeddings adicionados.
+        """
+        pending = self.missing(texts)
+        if not pending:
+            return 0
+        embeddings = encoder.encode(pending, batch_size=batch_size, convert_to_numpy=True)
+        self.add(pending, embeddings)
+        return len(pending)
+
+    def save(self, path) -> None:
+        """
+        Salva a matriz em `<path>.npy` e o índice em `<path>.json`.
+
+        Cada arquivo é escrito em um temporário no mesmo diretório e trocado com os.replace:
+        processos que mapearam a versão anterior (mmap) continuam lendo o arquivo antigo.
+        A matriz é trocada antes do índice; um leitor entre as duas trocas vê um índice
+        antigo, cujas linhas continuam na matriz nova (as linhas só são acrescentadas).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with self._lock:
+            matrix, meta = self.matrix, {"model": self.model_name, "dim": self.dim, "index": self.index}
+        suffix = f".tmp-{os.getpid()}-{threading.get_ident()}"
+        npy_path, json_path = path.with_suffix(".npy"), path.with_suffix(".json")
+        tmp_npy, tmp_json = Path(f"{npy_path}{suffix}"), Path(f"{json_path}{suffix}")
+        try:
+            with open(tmp_npy, "wb") as f:
+                np.save(f, matrix)
+            with open(tmp_json, "w", encoding="utf-8") as f:
+                json.dump(meta, f)
+            os.replace(tmp_npy, npy_path)
+            os.replace(tmp_json, json_path)
+        finally:
+            for tmp in (tmp_npy, tmp_json):
+                tmp.unlink(missing_ok=True)
+        logger.info(f"Embeddings de respostas salvos em {npy_path} ({len(meta['index'])} entradas).")
+
+    @classmethod
+    def load(cls, path, mmap: bool = True) -> "EmbeddingStore":
+        """
+        Carrega um store salvo com `save`. Com `mmap=True`, a matriz é mapeada em memória
+        (somente leitura) e compartilhada pelo page cache entre processos.
+        """
+        path = Path(path)
+        with open(path.with_suffix(".json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        store = cls(meta.get("dim"), meta.get("model"))
+        matrix = np.load(path.with_suffix(".npy"), mmap_mode="r" if mmap else None)
+        index = meta.get("index", {})
+        if index and max(index.values()) >= matrix.shape[0]:
+            raise ValueError(f"Índice de {path.with_suffix('.json')} aponta para linhas ausentes da matriz.")
+        store.matrix, store.index = matrix, index
+        return store
@@ -0,0 +1,161 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict
+
+from config.config import INFERENCE_EXECUTOR, INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# Alvo herdado pelos processos filhos (via fork) no modo "process"
+_process_target = None
+
+
+class QueueFullError(Exception):
+    """A fila de inferência atingiu o limite; o chamador deve tentar novamente depois."""
+
+
+def _call_target(target, method, args, submitted):
+    started = time.monotonic()
+    return started - submitted, getattr(target, method)(*args)
+
+
+def _call_process_target(method, args, submitted):
+    return _call_target(_process_target, method, args, submitted)
+
+
+class InferenceExecutor:
+    # Métodos que só leem o estado carregado; os únicos aceitos no modo "process"
+    STATELESS_METHODS = frozenset({"answer_from_knowledge", "answer_batch_from_knowledge"})
+
+    def __init__(self, target, kind: str = INFERENCE_EXECUTOR, max_workers: int = INFERENCE_WORKERS,
+                 max_queue: int = INFERENCE_QUEUE_SIZE):
+        """
+        Executa chamadas síncronas e pesadas do agente fora do event loop, em um pool
+        de threads ou de processos, com fila limitada.
+
+        Args:
+            target: objeto cujos métodos serão executados (normalmente o AgentCore).
+            kind (str): "thread" ou "process". No modo "process" os filhos são criados via fork
+                e herdam o alvo já carregado; o que eles alteram (contexto, memória, base)
+                ficaria só no filho, então apenas os métodos de STATELESS_METHODS são aceitos
+                e o chamador grava o contexto no próprio processo. Os caches de respostas
+                passam a ser por processo.
+            max_workers (int): número de workers executando em paralelo.
+            max_queue (int): quantas chamadas podem aguardar além das que estão executando.
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Tipo de executor inválido: '{kind}'. Use 'thread' ou 'process'.")
+        self.target = target
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_queue = max(0, max_queue)
+        self._slots = threading.BoundedSemaphore(self.max_workers + self.max_queue)
+        self._pool = None
+        self._pool_pid = None
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._outstanding = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_last = 0.0
+
+    def _get_pool(self):
+        if self._pool is None or self._pool_pid != os.getpid():
+            with self._lock:
+                if self._pool is None or self._pool_pid != os.getpid():
+                    if self.kind == "thread":
+                        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="inference")
+                    else:
+                        global _process_target
+                        _process_target = self.target
+                        self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                         mp_context=multiprocessing.get_context("fork"))
+                    self._pool_pid = os.getpid()
+        return self._pool
+
+    async def run(self, method: str, *args):
+        """
+        Executa `target.<method>(*args)` no pool e aguarda o resultado sem bloquear o loop.
+
+        A vaga só é devolvida quando a chamada termina no pool: se quem aguarda for cancelado
+        (cliente desconectou, timeout), a chamada já em execução continua ocupando a vaga.
+
+        Raises:
+            QueueFullError: se já houver `max_workers + max_queue` chamadas pendentes.
+            ValueError: no modo "process", para métodos fora de STATELESS_METHODS.
+        """
+        if self.kind == "process" and method not in self.STATELESS_METHODS:
+            raise ValueError(f"Método '{method}' altera o estado do agente e não pode rodar em um processo filho.")
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise QueueFullError("Fila de inferência cheia.")
+        with self._lock:
+            self._submitted += 1
+            self._outstanding += 1
+        submitted = time.monotonic()
+        try:
+            if self.kind == "thread":
+                future = self._get_pool().submit(_call_target, self.target, method, args, submitted)
+            else:
+                future = self._get_pool().submit(_call_process_target, method, args, submitted)
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        # Cancelar o awaiter cancela a chamada só se ela ainda estiver na fila do pool
+        waited, result = await asyncio.wrap_future(future)
+        with self._lock:
+            self._completed += 1
+            self._wait_total += waited
+            self._wait_last = waited
+            self._wait_max = max(self._wait_max, waited)
+        return result
+
+    def _release(self, future) -> None:
+        with self._lock:
+            self._outstanding -= 1
+        self._slots.release()
+
+    def get_stats(self) -> Dict:
+        """Retorna profundidade da fila, tempos de espera e contadores do executor."""
+        with self._lock:
+            outstanding = self._outstanding
+            return {
+                "kind": self.kind,
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "outstanding": outstanding,
+                "queue_depth": max(0, outstanding - self.max_workers),
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "wait_avg_ms": (self._wait_total / self._completed * 1000) if self._completed else 0.0,
+                "wait_max_ms": self._wait_max * 1000,
+                "wait_last_ms": self._wait_last * 1000,
+            }
+
+    def recycle(self) -> None:
+        """
+        No modo "process", descarta o pool atual para que os próximos workers sejam criados
+        (via fork) a partir do estado atual do alvo, ex.: após um hot-reload de modelos.
+        As chamadas em andamento terminam nos workers antigos.
+        """
+        if self.kind != "process":
+            return
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None and self._pool_pid == os.getpid():
+            pool.shutdown(wait=False)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None and self._pool_pid == os.getpid():
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,206 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List
+
+from agent.knowledge_base import KnowledgeBase
+from agent.nlp import NLPProcessor
+from config.config import KNOWLEDGE_FILES, KB_SNAPSHOT_PATH, HOT_RELOAD_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class ModelState:
+    def __init__(self, nlp: NLPProcessor, kb: KnowledgeBase):
+        """
+        Conjunto de artefatos usados para responder: classificador de intenções e
+        base de conhecimento. Uma requisição lê `AgentCore.state` uma única vez e usa o mesmo
+        conjunto até o fim, então uma troca nunca mistura versões no meio do pipeline.
+        """
+        self.nlp = nlp
+        self.kb = kb
+        self.loaded_at = time.time()
+
+    @property
+    def version(self) -> str:
+        """Versão combinada (modelos + base); muda também com alterações da base em tempo de execução."""
+        return f"{self.nlp.version}:{self.kb.version}"
+
+    def warm_up(self, sample: str = "olá") -> None:
+        """Exercita os caminhos de inferência para que a primeira requisição não pague a inicialização."""
+        self.nlp.predict_intent(sample)
+        self.kb.find_most_similar_pattern(sample)
+
+
+def load_state(knowledge_files=KNOWLEDGE_FILES, snapshot_path=KB_SNAPSHOT_PATH, **nlp_options) -> ModelState:
+    """
+    Carrega um novo conjunto de artefatos a partir dos arquivos atuais em disco.
+    `nlp_options` (model_dir, engine) são repassados ao NLPProcessor.
+    """
+    return ModelState(NLPProcessor(**nlp_options), KnowledgeBase(knowledge_files, snapshot_path=snapshot_path))
+
+
+class ReloadInProgressError(Exception):
+    """Já existe uma recarga em andamento."""
+
+
+class HotReloader:
+    def __init__(self, agent, knowledge_files=None, interval: float = HOT_RELOAD_INTERVAL):
+        """
+        Recarrega modelos de intenção e base de conhecimento sem reiniciar o processo.
+
+        A carga e o aquecimento acontecem fora do caminho das requisições; ao final, a
+        referência `agent.state` é trocada de uma só vez. Requisições em andamento terminam
+        com o conjunto antigo. Se a carga falhar, o conjunto atual continua em uso.
+        Intenções e respostas alteradas em tempo de execução e ainda não salvas
+        (`save_knowledge`) são reaplicadas na nova base.
+
+        Args:
+            agent (AgentCore): agente cujo estado será trocado; arquivos e snapshot da base e
+                opções dos modelos de intenção vêm dele.
+            knowledge_files (list|None): arquivos da base de conhecimento; None usa os do agente.
+            interval (float): intervalo, em segundos, da verificação de arquivos do watcher.
+        """
+        self.agent = agent
+        self.knowledge_files = knowledge_files if knowledge_files is not None else agent.knowledge_files
+        self.interval = interval
+        self._on_swap: List[Callable[[ModelState], None]] = []
+        self._reload_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._watcher = None
+        self._watcher_pid = None
+        self._stop = threading.Event()
+        self._reloads = 0
+        self._failures = 0
+        self._last_reload_at = None
+        self._last_duration = None
+        self._last_reason = None
+        self._last_error = None
+
+    def on_swap(self, callback: Callable[[ModelState], None]) -> None:
+        """Registra uma função chamada após cada troca (ex.: reciclar workers de processo)."""
+        self._on_swap.append(callback)
+
+    def watched_paths(self) -> List[str]:
+        return [*self.agent.state.nlp.artifact_files(), *[str(p) for p in self.knowledge_files]]
+
+    def _signature(self):
+        signature = []
+        for path in self.watched_paths():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_size, stat.st_mtime_ns))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def reload(self, reason: str = "manual") -> Dict:
+        """
+        Carrega, aquece e publica um novo conjunto de artefatos.
+
+        Raises:
+            ReloadInProgressError: se outra recarga já estiver em andamento.
+        """
+        if self.agent.state is None:
+            raise ReloadInProgressError("Inicialização do agente ainda em andamento.")
+        if not self._reload_lock.acquire(blocking=False):
+            raise ReloadInProgressError("Recarga já em andamento.")
+        try:
+            start = time.perf_counter()
+            old = self.agent.state
+            try:
+                nlp_options = {**self.agent.nlp_options, "engine": old.nlp.engine}
+                state = load_state(self.knowledge_files, self.agent.kb_snapshot_path, **nlp_options)
+                if not state.nlp.is_ready():
+                    raise ValueError("Modelos de NLP ausentes ou inválidos.")
+                changes = old.kb.runtime_changes()
+                carried = state.kb.replay_changes(changes)
+                state.warm_up()
+                # Embeddings das respostas novas (as já conhecidas vêm do cache em disco)
+                self.agent.reranker.precompute(state.kb.get_all_responses())
+            except Exception as e:
+                with self._stats_lock:
+                    self._failures += 1
+                    self._last_error = str(e)
+                logger.error(f"Falha ao recarregar os modelos ({reason}); mantendo a versão {old.version}: {e}")
+                raise
+
+            self.agent.swap_state(state)
+            # Alterações feitas na base antiga durante a carga
+            carried += state.kb.replay_changes(old.kb.runtime_changes(len(changes)))
+            old.kb.close()
+            if carried:
+                logger.info(f"Alterações não salvas da base reaplicadas após a recarga: {sorted(set(carried))}")
+            duration = time.perf_counter() - start
+            with self._stats_lock:
+                self._reloads += 1
+                self._last_reload_at = time.time()
+                self._last_duration = duration
+                self._last_reason = reason
+                self._last_error = None
+            logger.info(f"Modelos recarregados ({reason}) em {duration:.2f}s: {old.version} -> {state.version}")
+            for callback in self._on_swap:
+                try:
+                    callback(state)
+                except Exception as e:
+                    logger.error(f"Erro no callback de troca de modelos: {e}")
+            return self.get_status()
+        finally:
+            self._reload_lock.release()
+
+    def start_watching(self) -> None:
+        """Inicia (ou reinicia, após fork) a thread que observa os arquivos de modelo e da base."""
+        if self._watcher is not None and self._watcher_pid == os.getpid():
+            return
+        self._watcher_pid = os.getpid()
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch_loop, name="hot-reload-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch_loop(self):
+        # Na inicialização em etapas, só começa a observar depois que os modelos carregaram
+        while self.agent.state is None:
+            if self._stop.wait(self.interval):
+                return
+        current = self._signature()
+        pending = None
+        while not self._stop.wait(self.interval):
+            signature = self._signature()
+            if signature == current:
+                pending = None
+                continue
+            # Só recarrega quando os arquivos param de mudar por um intervalo (escrita concluída)
+            if signature != pending:
+                pending = signature
+                continue
+            try:
+                self.reload(reason="watcher")
+            except ReloadInProgressError:
+                continue
+            except Exception:
+                pass  # Já registrado; só tenta de novo quando os arquivos mudarem outra vez
+            current, pending = signature, None
+
+    def get_status(self) -> Dict:
+        state = self.agent.state
+        if state is None:
+            return {"version": None, "in_progress": False, "reloads": self._reloads, "failures": self._failures}
+        with self._stats_lock:
+            return {
+                "version": state.version,
+                "nlp_version": state.nlp.version,
+                "kb_version": state.kb.version,
+                "loaded_at": state.loaded_at,
+                "reloads": self._reloads,
+                "failures": self._failures,
+                "in_progress": self._reload_lock.locked(),
+                "last_reload_at": self._last_reload_at,
+                "last_duration_ms": self._last_duration * 1000 if self._last_duration is not None else None,
+                "last_reason": self._last_reason,
+                "last_error": self._last_error,
+                "watching": self._watcher is not None and self._watcher_pid == os.getpid() and not self._stop.is_set(),
+            }
@@ -0,0 +1,63 @@
+import numpy as np
+
+
+class LinearIntentClassifier:
+    """
+    Classificador de intenções linear em NumPy puro: um produto esparso-denso seguido de
+    softmax. Compatível com a parte da API do scikit-learn usada pelo NLPProcessor
+    (`classes_`, `predict_proba`, `predict`).
+    """
+
+    def __init__(self, coef, intercept, classes):
+        """
+        Args:
+            coef (array): pesos, formato (n_classes, n_features).
+            intercept (array): vieses, formato (n_classes,).
+            classes (array): rótulos das intenções, na ordem das linhas de `coef`.
+        """
+        # Transposta contígua: X (esparsa, n x f) @ W^T (f x c) sem cópias a cada chamada.
+        # Se `coef` já for a transposta de um array contíguo (ex.: mmap de agent.artifacts), não há cópia.
+        self._coef_t = np.ascontiguousarray(np.asarray(coef, dtype=np.float32).T)
+        self.coef_ = self._coef_t.T
+        self.intercept_ = np.asarray(intercept, dtype=np.float32)
+        self.classes_ = np.asarray(classes)
+
+    @classmethod
+    def from_estimator(cls, estimator):
+        """
+        Converte um modelo linear treinado do scikit-learn (LogisticRegression, SGDClassifier,
+        LinearSVC...) para o formato NumPy. Em problemas binários, a classe negativa recebe
+        pesos zero, de forma que o softmax equivale à sigmoide do modelo original.
+        """
+        coef = np.asarray(estimator.coef_)
+        intercept = np.asarray(estimator.intercept_).ravel()
+        if coef.shape[0] == 1 and len(estimator.classes_) == 2:
+            coef = np.vstack([np.zeros_like(coef), coef])
+            intercept = np.concatenate([[0.0], intercept])
+        return cls(coef, intercept, estimator.classes_)
+
+    @property
+    def n_features_in_(self):
+        return self.coef_.shape[1]
+
+    def decision_function(self, X):
+        return np.asarray(X @ self._coef_t) + self.intercept_
+
+    def predict_proba(self, X):
+        scores = self.decision_function(X)
+        scores -= scores.max(axis=1, keepdims=True)
+        np.exp(scores, out=scores)
+        scores /= scores.sum(axis=1, keepdims=True)
+        return scores
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.decision_function(X), axis=1)]
+
+    def save(self, path):
+        """Salva pesos, vieses e classes em um `.npz` (sem pickle)."""
+        np.savez(path, coef=self.coef_, intercept=self.intercept_, classes=self.classes_.astype(str))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["coef"], data["intercept"], data["classes"])
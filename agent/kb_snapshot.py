@@ -0,0 +1,155 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from agent.vectorizer_io import export_tfidf_vectorizer, load_tfidf_vectorizer
+
+logger = logging.getLogger(__name__)
+
+# Incrementar sempre que o layout do snapshot mudar
+SNAPSHOT_FORMAT_VERSION = 1
+MANIFEST_FILE = "manifest.json"
+
+
+def source_fingerprint(paths: List[Path], build_params: Optional[Dict] = None) -> str:
+    """
+    Calcula a impressão digital das fontes do snapshot: versão do formato, parâmetros de
+    construção e o sha256 do conteúdo de cada arquivo JSON, na ordem informada.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{SNAPSHOT_FORMAT_VERSION}".encode())
+    digest.update(json.dumps(build_params or {}, sort_keys=True).encode())
+    for path in paths:
+        digest.update(str(path).encode("utf-8"))
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_snapshot(kb, root, fingerprint: str) -> Path:
+    """
+    Grava o estado compilado da base em `<root>/<fingerprint>/`: intenções mescladas,
+    tabela padrão→intenção, vocabulário/IDF do vetorizador e a matriz TF-IDF em CSR.
+
+    O diretório é escrito em um temporário e renomeado no final, então leitores
+    concorrentes nunca veem um snapshot incompleto.
+    """
+    root = Path(root)
+    target = root / fingerprint
+    if (target / MANIFEST_FILE).is_file():
+        return target
+    tmp = root / f".{fingerprint}.tmp-{os.getpid()}"
+    tmp.mkdir(parents=True, exist_ok=True)
+
+    with open(tmp / "knowledge.json", "w", encoding="utf-8") as f:
+        json.dump({"intencoes": kb.intents, "entidades": kb.entities}, f, ensure_ascii=False)
+    with open(tmp / "patterns.json", "w", encoding="utf-8") as f:
+        json.dump({"patterns": kb.patterns, "intents": [kb.pattern_to_intent[p] for p in kb.patterns]}, f, ensure_ascii=False)
+
+    shape = None
+    if kb.tfidf_matrix is not None:
+        params, terms, idf = export_tfidf_vectorizer(kb.vectorizer)
+        with open(tmp / "vocabulary.json", "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.save(tmp / "idf.npy", idf)
+        matrix = kb.tfidf_matrix.tocsr()
+        np.save(tmp / "tfidf_data.npy", matrix.data)
+        np.save(tmp / "tfidf_indices.npy", matrix.indices)
+        np.save(tmp / "tfidf_indptr.npy", matrix.indptr)
+        shape = list(matrix.shape)
+    else:
+        params = None
+
+    manifest = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "fingerprint": fingerprint,
+        "sources": [str(p) for p in kb.data_paths],
+        "created_at": time.time(),
+        "n_patterns": len(kb.patterns),
+        "vectorizer": params,
+        "tfidf_shape": shape,
+    }
+    # O manifesto é o último arquivo escrito: sua presença marca o snapshot como completo
+    with open(tmp / MANIFEST_FILE, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    try:
+        os.rename(tmp, target)
+    except OSError:
+        # Outro processo publicou o mesmo snapshot primeiro
+        shutil.rmtree(tmp, ignore_errors=True)
+    _prune_old_snapshots(root, keep=fingerprint)
+    logger.info(f"Snapshot da base de conhecimento gravado em {target}.")
+    return target
+
+
+def _prune_old_snapshots(root: Path, keep: str) -> None:
+    for entry in root.iterdir():
+        if entry.is_dir() and entry.name != keep and not entry.name.startswith("."):
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def read_snapshot(root, fingerprint: str, mmap: bool = True) -> Optional[Dict]:
+    """
+    Carrega o snapshot correspondente à impressão digital, se existir.
+    Os arrays da matriz TF-IDF são mapeados em memória (somente leitura) quando `mmap=True`.
+
+    Returns:
+        dict|None: intents, entities, patterns, pattern_to_intent, vectorizer e tfidf_matrix.
+    """
+    directory = Path(root) / fingerprint
+    manifest_path = directory / MANIFEST_FILE
+    if not manifest_path.is_file():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        return None
+
+    with open(directory / "knowledge.json", "r", encoding="utf-8") as f:
+        knowledge = json.load(f)
+    with open(directory / "patterns.json", "r", encoding="utf-8") as f:
+        table = json.load(f)
+
+    vectorizer, matrix = None, None
+    if manifest.get("tfidf_shape"):
+        from scipy import sparse
+
+        mode = "r" if mmap else None
+        with open(directory / "vocabulary.json", "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        vectorizer = load_tfidf_vectorizer(manifest["vectorizer"], terms, np.load(directory / "idf.npy"))
+        matrix = sparse.csr_matrix(
+            (np.load(directory / "tfidf_data.npy", mmap_mode=mode),
+             np.load(directory / "tfidf_indices.npy", mmap_mode=mode),
+             np.load(directory / "tfidf_indptr.npy", mmap_mode=mode)),
+            shape=tuple(manifest["tfidf_shape"]), copy=False,
+        )
+
+    return {
+        "manifest": manifest,
+        "intents": knowledge.get("intencoes", {}),
+        "entities": knowledge.get("entidades", {}),
+        "patterns": table["patterns"],
+        "pattern_to_intent": dict(zip(table["patterns"], table["intents"])),
+        "vectorizer": vectorizer,
+        "tfidf_matrix": matrix,
+    }
+
+
+if __name__ == "__main__":
+    from agent.knowledge_base import KnowledgeBase
+    from config.config import KNOWLEDGE_FILES, KB_SNAPSHOT_PATH
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.time()
+    kb = KnowledgeBase(KNOWLEDGE_FILES, snapshot_path=None)
+    path = kb.compile(KB_SNAPSHOT_PATH)
+    print(f"Snapshot compilado em {path} ({len(kb.patterns)} padrões) em {time.time() - start:.2f}s")
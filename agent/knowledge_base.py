@@ -1,27 +1,115 @@
 import json
+import logging
+import os
+import threading
+import uuid
 from pathlib import Path
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
 from collections import defaultdict
+from agent.similarity_index import make_index, recall_at_k
+from agent.kb_snapshot import source_fingerprint, read_snapshot, write_snapshot
+from config.config import (
+    SIMILARITY_INDEX_BACKEND, KB_SNAPSHOT_PATH,
+    KB_INCREMENTAL_INDEX, KB_COMPACTION_INTERVAL, KB_COMPACTION_THRESHOLD,
+)
+
+logger = logging.getLogger(__name__)
 
 class KnowledgeBase:
-    def __init__(self, json_paths):
+    VECTORIZER_PARAMS = {"ngram_range": (1, 2), "max_features": 1000}
+
+    def __init__(self, json_paths, index_backend=SIMILARITY_INDEX_BACKEND, snapshot_path=KB_SNAPSHOT_PATH,
+                 incremental=KB_INCREMENTAL_INDEX, compaction_interval=KB_COMPACTION_INTERVAL,
+                 compaction_threshold=KB_COMPACTION_THRESHOLD):
         """
         Recebe uma lista de arquivos ou um único arquivo (string).
+        `index_backend` escolhe o índice de similaridade dos padrões ("exact" ou "inverted").
+        `snapshot_path` aponta para o diretório de snapshots compilados; se houver um snapshot
+        com o mesmo hash das fontes, ele é mapeado em memória em vez de reprocessar os JSONs.
+        Com `incremental=True`, `add_new_intent` só vetoriza os padrões novos (vocabulário fixo)
+        e uma compactação em segundo plano reajusta o vocabulário/IDF periodicamente.
         """
         if isinstance(json_paths, str) or isinstance(json_paths, Path):
             json_paths = [json_paths]
         self.data_paths = [Path(p) for p in json_paths]
+        self.snapshot_path = Path(snapshot_path) if snapshot_path else None
+        self.index_backend = index_backend
+        self.index = make_index(index_backend)
+        self.incremental = incremental
+        self.compaction_interval = compaction_interval
+        self.compaction_threshold = compaction_threshold
+        self.delta_matrix = None
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        self._compaction_thread = None
+        self._compaction_pid = None
+        self._closed = threading.Event()
+        self._search_state = (None, None, None, 0, [])
+        # Alterações em tempo de execução ainda não gravadas com save_knowledge (reaplicadas no hot-reload)
+        self._runtime_changes = []
+        self.fingerprint = self._fingerprint()
+        # Versão do conteúdo: igual entre processos com as mesmas fontes, nova a cada alteração em tempo de execução
+        self.version = self.fingerprint[:16]
+        if not self._load_from_snapshot():
+            self._build_from_sources()
+            if self.snapshot_path:
+                try:
+                    self.compile(self.snapshot_path)
+                except Exception as e:
+                    logger.error(f"Erro ao gravar snapshot da base de conhecimento: {e}")
+        self._build_index()
+
+    def _fingerprint(self):
+        params = {k: list(v) if isinstance(v, tuple) else v for k, v in self.VECTORIZER_PARAMS.items()}
+        return source_fingerprint(self.data_paths, params)
+
+    def _build_from_sources(self):
         self.knowledge = self.load_multiple_knowledges()
         self.intents = self.knowledge.get("intencoes", {})
         self.patterns = []
         self.pattern_to_intent = {}
         self._prepare_patterns()
-        self.vectorizer = TfidfVectorizer(ngram_range=(1,2), max_features=1000)
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self.vectorizer = TfidfVectorizer(**self.VECTORIZER_PARAMS)
         self.tfidf_matrix = self.vectorizer.fit_transform(self.patterns) if self.patterns else None
         self.entities = self.knowledge.get("entidades", {})
 
+    def _load_from_snapshot(self):
+        if not self.snapshot_path:
+            return False
+        try:
+            snapshot = read_snapshot(self.snapshot_path, self.fingerprint)
+        except Exception as e:
+            logger.error(f"Snapshot da base de conhecimento inválido, reconstruindo a partir dos JSONs: {e}")
+            return False
+        if snapshot is None:
+            logger.info("Nenhum snapshot compatível com as fontes atuais; reconstruindo a partir dos JSONs.")
+            return False
+        self.intents = snapshot["intents"]
+        self.entities = snapshot["entities"]
+        self.knowledge = {"intencoes": self.intents, "entidades": self.entities}
+        self.patterns = snapshot["patterns"]
+        self.pattern_to_intent = snapshot["pattern_to_intent"]
+        if snapshot["vectorizer"] is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            snapshot["vectorizer"] = TfidfVectorizer(**self.VECTORIZER_PARAMS)
+        self.vectorizer = snapshot["vectorizer"]
+        self.tfidf_matrix = snapshot["tfidf_matrix"]
+        logger.info(f"Base de conhecimento carregada do snapshot ({len(self.patterns)} padrões).")
+        return True
+
+    def compile(self, snapshot_path=None):
+        """
+        Grava o snapshot compilado da base atual (intenções, tabela padrão→intenção,
+        vocabulário do vetorizador e matriz TF-IDF) e retorna o diretório gerado.
+        """
+        return write_snapshot(self, snapshot_path or self.snapshot_path, self.fingerprint)
+
+    def _bump_version(self):
+        self.version = f"{self.fingerprint[:16]}-{uuid.uuid4().hex[:8]}"
+
     def load_knowledge(self, path):
         if not Path(path).is_file():
             raise FileNotFoundError(f"Arquivo {path} não encontrado.")
@@ -65,6 +153,13 @@ class KnowledgeBase:
         intent = self.intents.get(intent_name, {})
         return intent.get("respostas", [])
 
+    def find_exact_intent(self, user_text):
+        """Intenção do padrão idêntico ao texto (sem vetorização), ou None."""
+        return self.pattern_to_intent.get(user_text.lower().strip())
+
+    def get_all_responses(self):
+        return [r for details in self.intents.values() for r in details.get("respostas", [])]
+
     def find_patterns(self, intent_name):
         intent = self.intents.get(intent_name, {})
         return intent.get("padroes", [])
@@ -76,16 +171,71 @@ class KnowledgeBase:
                 self.patterns.append(pattern_lower)
                 self.pattern_to_intent[pattern_lower] = intent
 
+    def _build_index(self):
+        if self.tfidf_matrix is not None:
+            self.index.build(self.tfidf_matrix)
+        self.delta_matrix = None
+        self._publish_search_state()
+
+    def _publish_search_state(self):
+        # Leitores usam uma única referência (vetorizador, índice, delta, nº de linhas da base,
+        # padrões), então a troca feita por uma compactação ou por add_new_intent é atômica do
+        # ponto de vista das buscas. Quem troca esses atributos cria objetos novos em vez de
+        # alterar os publicados.
+        base_rows = self.tfidf_matrix.shape[0] if self.tfidf_matrix is not None else 0
+        self._search_state = (self.vectorizer, self.index if self.tfidf_matrix is not None else None,
+                              self.delta_matrix, base_rows, self.patterns)
+
+    def find_similar_patterns(self, user_text, k=5, threshold=0.0):
+        """
+        Retorna até `k` padrões mais similares ao texto, como pares (padrão, similaridade),
+        ordenados do mais similar para o menos similar.
+        """
+        return self.find_similar_patterns_batch([user_text], k, threshold)[0]
+
+    def find_similar_patterns_batch(self, user_texts, k=5, threshold=0.0):
+        """
+        Versão em lote de `find_similar_patterns`: uma única transformação TF-IDF e uma
+        única busca no índice para todos os textos.
+        """
+        vectorizer, index, delta, base_rows, patterns = self._search_state
+        if index is None or not patterns:
+            return [[] for _ in user_texts]
+        user_vecs = vectorizer.transform([t.lower() for t in user_texts])
+        found = index.search(user_vecs, k)
+        delta_scores = (delta @ user_vecs.T).toarray() if delta is not None else None
+        results = []
+        for row, (indices, scores) in enumerate(found):
+            if delta_scores is not None:
+                # Padrões adicionados desde a última compactação: busca exata no delta (pequeno)
+                indices = np.concatenate([indices, np.arange(base_rows, base_rows + delta_scores.shape[0])])
+                scores = np.concatenate([scores, delta_scores[:, row]])
+                order = np.argsort(-scores, kind="stable")[:k]
+                indices, scores = indices[order], scores[order]
+            results.append([(patterns[i], float(s)) for i, s in zip(indices, scores) if s > 0 and s >= threshold])
+        return results
+
+    def find_most_similar_patterns(self, user_texts, threshold=0.5):
+        """Para cada texto, o padrão mais similar acima do limiar (ou None)."""
+        return [m[0][0] if m else None for m in self.find_similar_patterns_batch(user_texts, k=1, threshold=threshold)]
+
     def find_most_similar_pattern(self, user_text, threshold=0.5):
-        if not self.tfidf_matrix or not self.patterns:
+        matches = self.find_similar_patterns(user_text, k=1, threshold=threshold)
+        return matches[0][0] if matches else None
+
+    def evaluate_index_recall(self, backend=None, k=5, sample_size=200, seed=42):
+        """
+        Mede o recall@k de um backend de índice contra a busca exata, usando uma amostra
+        dos próprios padrões como consultas.
+        """
+        if self.tfidf_matrix is None:
             return None
-        user_vec = self.vectorizer.transform([user_text.lower()])
-        similarities = cosine_similarity(user_vec, self.tfidf_matrix).flatten()
-        max_idx = np.argmax(similarities)
-        max_sim = similarities[max_idx]
-        if max_sim >= threshold:
-            return self.patterns[max_idx]
-        return None
+        rng = np.random.default_rng(seed)
+        rows = rng.choice(self.tfidf_matrix.shape[0], size=min(sample_size, self.tfidf_matrix.shape[0]), replace=False)
+        queries = self.tfidf_matrix[rows]
+        index = make_index(backend).build(self.tfidf_matrix) if backend else self.index
+        exact = make_index("exact").build(self.tfidf_matrix)
+        return recall_at_k(index, exact, queries, k)
 
     def get_response_by_pattern(self, pattern):
         intent = self.pattern_to_intent.get(pattern)
@@ -97,30 +247,147 @@ class KnowledgeBase:
         return self.patterns
 
     def add_new_intent(self, intent_name, patterns=None, responses=None):
-        if intent_name in self.intents:
-            return False
-        self.intents[intent_name] = {
-            "padroes": patterns or [],
-            "respostas": responses or []
-        }
-        # Atualiza padrões e vetorizador
-        for p in self.intents[intent_name]["padroes"]:
-            p_lower = p.lower()
-            self.patterns.append(p_lower)
-            self.pattern_to_intent[p_lower] = intent_name
-        if self.patterns:
-            self.tfidf_matrix = self.vectorizer.fit_transform(self.patterns)
+        with self._lock:
+            if intent_name in self.intents:
+                return False
+            self.intents[intent_name] = {
+                "padroes": patterns or [],
+                "respostas": responses or []
+            }
+            new_patterns = [p.lower() for p in self.intents[intent_name]["padroes"]]
+            for p_lower in new_patterns:
+                self.pattern_to_intent[p_lower] = intent_name
+            self._bump_version()
+            self._runtime_changes.append(("add_intent", intent_name, list(patterns or []), list(responses or [])))
+            if not new_patterns:
+                return True
+            # Lista nova: buscas em andamento seguem com a lista publicada junto do seu índice
+            all_patterns = self.patterns + new_patterns
+            if self.incremental and self.tfidf_matrix is not None:
+                self.patterns = all_patterns
+                self._append_rows(new_patterns)
+            else:
+                from sklearn.feature_extraction.text import TfidfVectorizer
+
+                # Vetorizador, matriz e índice novos, publicados juntos (como em `compact`)
+                vectorizer = TfidfVectorizer(**self.VECTORIZER_PARAMS)
+                matrix = vectorizer.fit_transform(all_patterns)
+                index = make_index(self.index_backend).build(matrix)
+                self.vectorizer, self.tfidf_matrix, self.index = vectorizer, matrix, index
+                self.patterns, self.delta_matrix = all_patterns, None
+                self._publish_search_state()
         return True
 
-    def update_intent_responses(self, intent_name, responses):
-        if intent_name not in self.intents:
+    def _append_rows(self, new_patterns):
+        """
+        Vetoriza apenas os padrões novos com o vocabulário/IDF atuais e os acumula na matriz
+        delta. Termos fora do vocabulário só passam a contar após a próxima compactação.
+        """
+        if new_patterns:
+            from scipy import sparse
+
+            rows = self.vectorizer.transform(new_patterns)
+            self.delta_matrix = rows if self.delta_matrix is None else sparse.vstack([self.delta_matrix, rows], format="csr")
+            self._publish_search_state()
+        self._ensure_compaction_thread()
+        if self.delta_matrix is not None and self.delta_matrix.shape[0] >= self.compaction_threshold:
+            threading.Thread(target=self.compact, name="kb-compaction-now", daemon=True).start()
+
+    def pending_rows(self):
+        """Quantidade de padrões ainda fora do índice principal (aguardando compactação)."""
+        delta = self._search_state[2]
+        return 0 if delta is None else delta.shape[0]
+
+    def compact(self):
+        """
+        Reajusta vocabulário/IDF sobre todos os padrões e reconstrói o índice principal.
+        O ajuste é feito fora do lock; só a troca final (e a vetorização dos padrões
+        adicionados durante o ajuste) acontece com o lock.
+
+        Returns:
+            bool: True se houve compactação.
+        """
+        if not self._compaction_lock.acquire(blocking=False):
             return False
-        self.intents[intent_name]["respostas"] = responses
+        try:
+            with self._lock:
+                if self.delta_matrix is None:
+                    return False
+                patterns = self.patterns
+            from sklearn.feature_extraction.text import TfidfVectorizer
+
+            vectorizer = TfidfVectorizer(**self.VECTORIZER_PARAMS)
+            matrix = vectorizer.fit_transform(patterns)
+            index = make_index(self.index_backend).build(matrix)
+            with self._lock:
+                self.vectorizer, self.tfidf_matrix, self.index = vectorizer, matrix, index
+                self._bump_version()
+                late = self.patterns[len(patterns):]
+                self.delta_matrix = vectorizer.transform(late) if late else None
+                self._publish_search_state()
+            logger.info(f"Índice da base de conhecimento compactado ({len(patterns)} padrões).")
+            return True
+        finally:
+            self._compaction_lock.release()
+
+    def _ensure_compaction_thread(self):
+        # Iniciada sob demanda (e reiniciada após fork) para não existir em processos sem escrita
+        if not self.compaction_interval or self.compaction_interval <= 0 or self._closed.is_set():
+            return
+        if self._compaction_thread is not None and self._compaction_pid == os.getpid():
+            return
+        self._compaction_pid = os.getpid()
+        self._compaction_thread = threading.Thread(target=self._compaction_loop, name="kb-compaction", daemon=True)
+        self._compaction_thread.start()
+
+    def _compaction_loop(self):
+        while not self._closed.wait(self.compaction_interval):
+            try:
+                self.compact()
+            except Exception as e:
+                logger.error(f"Erro na compactação da base de conhecimento: {e}")
+
+    def close(self):
+        """Encerra a compactação em segundo plano (ex.: base substituída por um hot-reload)."""
+        self._closed.set()
+
+    def update_intent_responses(self, intent_name, responses):
+        with self._lock:
+            if intent_name not in self.intents:
+                return False
+            self.intents[intent_name]["respostas"] = responses
+            self._bump_version()
+            self._runtime_changes.append(("update_responses", intent_name, list(responses)))
         return True
 
     def save_knowledge(self, json_path=None):
         path = Path(json_path) if json_path else self.data_paths[0]
-        to_save = {"intencoes": self.intents, "entidades": self.entities}
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(to_save, f, indent=4, ensure_ascii=False)
+        with self._lock:
+            to_save = {"intencoes": self.intents, "entidades": self.entities}
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(to_save, f, indent=4, ensure_ascii=False)
+            if path in self.data_paths:
+                # Já persistidas nas fontes: uma nova carga da base as inclui
+                self._runtime_changes.clear()
         return True
+
+    def runtime_changes(self, start=0):
+        """Alterações feitas por add_new_intent/update_intent_responses ainda não salvas, a partir de `start`."""
+        with self._lock:
+            return list(self._runtime_changes[start:])
+
+    def replay_changes(self, changes):
+        """
+        Reaplica alterações de outra base (ver `runtime_changes`). Intenções que já existem
+        nesta base (ex.: salvas em disco nesse meio-tempo) não são recriadas.
+
+        Returns:
+            list: nomes das intenções alteradas.
+        """
+        applied = []
+        for kind, intent_name, *args in changes:
+            if kind == "add_intent" and self.add_new_intent(intent_name, *args):
+                applied.append(intent_name)
+            elif kind == "update_responses" and self.update_intent_responses(intent_name, *args):
+                applied.append(intent_name)
+        return applied
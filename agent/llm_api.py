@@ -1,41 +1,375 @@
+import asyncio
+import json
 import logging
+import os
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional
+
+from agent.metrics import STAGE_SECONDS, LLM_RETRIES
+from config.config import (
+    LLM_API_URL, LLM_API_KEY, LLM_MODEL, LLM_MAX_TOKENS, LLM_CONTEXT_TURNS, LLM_TIMEOUT, LLM_CONNECT_TIMEOUT,
+    LLM_MAX_CONCURRENCY, LLM_MAX_CONNECTIONS, LLM_MAX_RETRIES, LLM_RETRY_BASE_DELAY,
+)
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_RESPONSE = "LLM não configurada ainda. Por favor, aguarde."
+SYSTEM_PROMPT = "Você é o Jarvis, um assistente prestativo. Responda em português, de forma clara e objetiva."
+
+# Status HTTP que valem nova tentativa (limite de taxa e falhas do servidor)
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class LLMError(Exception):
+    """Falha ao obter resposta da LLM (após as novas tentativas)."""
+
+
+class LLMTimeoutError(LLMError):
+    """O prazo da chamada acabou (fila de gerações, conexão ou geração)."""
+
+
+class _RetryableStatus(Exception):
+    def __init__(self, status_code: int, retry_after: Optional[float] = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
 
 class LLMAPI:
-    def __init__(self):
-        logging.info("LLMAPI inicializada (modo placeholder). Sem conexão com LLM externa.")
+    def __init__(self, base_url: str = LLM_API_URL, api_key: str = LLM_API_KEY, model: str = LLM_MODEL,
+                 timeout: float = LLM_TIMEOUT, connect_timeout: float = LLM_CONNECT_TIMEOUT,
+                 max_concurrency: int = LLM_MAX_CONCURRENCY, max_connections: int = LLM_MAX_CONNECTIONS,
+                 max_retries: int = LLM_MAX_RETRIES, retry_base_delay: float = LLM_RETRY_BASE_DELAY,
+                 max_tokens: int = LLM_MAX_TOKENS, context_turns: int = LLM_CONTEXT_TURNS):
+        """
+        Cliente assíncrono de uma API de chat no formato OpenAI (`POST <base_url>/chat/completions`).
+
+        As chamadas rodam em um event loop próprio, em uma thread dedicada, com um único
+        `httpx.AsyncClient` (pool de conexões persistente). Código assíncrono usa `acall_llm`/
+        `astream` sem bloquear o loop do chamador; código síncrono usa `call_llm`.
+
+        Args:
+            base_url (str): URL base da API (ex.: http://localhost:8081/v1). Vazio = modo placeholder.
+            api_key (str): enviada como `Authorization: Bearer`.
+            model (str): modelo pedido à API.
+            timeout (float): prazo total de cada chamada, em segundos, incluindo fila e novas tentativas.
+            connect_timeout (float): prazo para abrir uma conexão.
+            max_concurrency (int): gerações simultâneas; as demais aguardam (dentro do prazo).
+            max_connections (int): tamanho máximo do pool de conexões HTTP.
+            max_retries (int): novas tentativas em erros de conexão, 429 e 5xx (backoff exponencial com jitter).
+            retry_base_delay (float): espera base do backoff, em segundos.
+            max_tokens (int): limite de tokens gerados.
+            context_turns (int): interações anteriores do contexto enviadas junto com a mensagem.
+        """
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_connections = max(1, max_connections)
+        self.max_retries = max(0, max_retries)
+        self.retry_base_delay = retry_base_delay
+        self.max_tokens = max_tokens
+        self.context_turns = context_turns
+        self.configured = bool(self.base_url)
+        self._loop = None
+        self._loop_pid = None
+        self._client = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._in_flight = 0
+        self._calls = 0
+        self._failures = 0
+        self._timeouts = 0
+        self._retries = 0
+        self._last_error = None
+        if self.configured:
+            logging.info(f"LLMAPI configurada para {self.base_url} (modelo {model}, até {self.max_concurrency} gerações simultâneas).")
+        else:
+            logging.info("LLMAPI inicializada (modo placeholder). Sem conexão com LLM externa.")
+
+    # --- Event loop dedicado ------------------------------------------------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        # Criado no primeiro uso e recriado após fork (a thread do loop não sobrevive ao fork)
+        if self._loop is not None and self._loop_pid == os.getpid():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._loop_pid != os.getpid():
+                import httpx
+
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-client", daemon=True).start()
+
+                async def setup():
+                    limits = httpx.Limits(max_connections=self.max_connections,
+                                          max_keepalive_connections=self.max_connections)
+                    headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else {}
+                    self._client = httpx.AsyncClient(base_url=self.base_url, headers=headers, limits=limits,
+                                                     timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout))
+                    self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+                asyncio.run_coroutine_threadsafe(setup(), loop).result()
+                self._loop, self._loop_pid = loop, os.getpid()
+        return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    # --- Montagem da requisição ---------------------------------------------
+
+    def build_messages(self, prompt: str, context: Optional[List[Dict]] = None) -> List[Dict]:
+        messages = [{"role": "system", "content": SYSTEM_PROMPT}]
+        for turn in self.history(context):
+            messages.append({"role": "user", "content": turn.get("user", "")})
+            messages.append({"role": "assistant", "content": turn.get("agent", "")})
+        messages.append({"role": "user", "content": prompt})
+        return messages
+
+    def history(self, context: Optional[List[Dict]]) -> List[Dict]:
+        """Turnos de `context` enviados à LLM (os últimos `context_turns`)."""
+        return (context or [])[-self.context_turns:] if self.context_turns > 0 else []
+
+    def _payload(self, prompt, context, stream):
+        return {"model": self.model, "messages": self.build_messages(prompt, context),
+                "max_tokens": self.max_tokens, "stream": stream}
+
+    # --- Chamadas (executadas no loop dedicado) -----------------------------
+
+    def _record(self, error: Optional[Exception] = None) -> None:
+        with self._stats_lock:
+            self._calls += 1
+            if error is not None:
+                self._failures += 1
+                self._timeouts += isinstance(error, LLMTimeoutError)
+                self._last_error = str(error) or type(error).__name__
+            else:
+                self._last_error = None
+
+    async def _with_retries(self, attempt, deadline: float, can_retry=lambda: True):
+        """
+        Executa `attempt()` dentro do semáforo de gerações, com novas tentativas em falhas
+        transitórias até `max_retries` ou até o prazo acabar.
+        """
+        import httpx
+
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(0.0, deadline - loop.time()))
+        except asyncio.TimeoutError:
+            raise LLMTimeoutError("Prazo esgotado aguardando uma vaga para gerar.")
+        with self._stats_lock:
+            self._in_flight += 1
+        try:
+            for retry in range(self.max_retries + 1):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise LLMTimeoutError("Prazo da chamada à LLM esgotado.")
+                try:
+                    return await asyncio.wait_for(attempt(remaining), remaining)
+                except asyncio.TimeoutError:
+                    raise LLMTimeoutError("Prazo da chamada à LLM esgotado.")
+                except (httpx.TransportError, _RetryableStatus) as e:
+                    if retry >= self.max_retries or not can_retry():
+                        raise LLMError(f"Falha na chamada à LLM: {e}") from e
+                    # Backoff exponencial com jitter completo; respeita Retry-After, se houver
+                    delay = random.uniform(0, self.retry_base_delay * 2 ** retry)
+                    if isinstance(e, _RetryableStatus) and e.retry_after is not None:
+                        delay = max(delay, e.retry_after)
+                    if loop.time() + delay >= deadline:
+                        raise LLMTimeoutError(f"Sem tempo para nova tentativa após: {e}") from e
+                    with self._stats_lock:
+                        self._retries += 1
+                    LLM_RETRIES.inc()
+                    logger.warning(f"Falha transitória na LLM ({e}); nova tentativa em {delay:.2f}s.")
+                    await asyncio.sleep(delay)
+        finally:
+            with self._stats_lock:
+                self._in_flight -= 1
+            self._semaphore.release()
+
+    @staticmethod
+    def _check_status(response) -> None:
+        if response.status_code in RETRY_STATUS:
+            retry_after = response.headers.get("Retry-After")
+            try:
+                retry_after = float(retry_after) if retry_after is not None else None
+            except ValueError:
+                retry_after = None
+            raise _RetryableStatus(response.status_code, retry_after)
+        if response.status_code >= 400:
+            raise LLMError(f"LLM respondeu HTTP {response.status_code}: {response.text[:200]}")
+
+    async def _complete(self, prompt: str, context: Optional[List[Dict]]) -> str:
+        deadline = asyncio.get_running_loop().time() + self.timeout
+
+        async def attempt(remaining):
+            response = await self._client.post("/chat/completions", json=self._payload(prompt, context, False),
+                                               timeout=remaining)
+            self._check_status(response)
+            return response.json()["choices"][0]["message"]["content"]
+
+        try:
+            text = await self._with_retries(attempt, deadline)
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record()
+        return text
+
+    async def _stream(self, prompt: str, context: Optional[List[Dict]], emit) -> None:
+        """Chama `emit(texto)` a cada trecho recebido; só repete a chamada antes do primeiro trecho."""
+        deadline = asyncio.get_running_loop().time() + self.timeout
+        started = time.perf_counter()
+        received = False
+
+        async def attempt(remaining):
+            nonlocal received
+            async with self._client.stream("POST", "/chat/completions", json=self._payload(prompt, context, True),
+                                           timeout=remaining) as response:
+                if response.status_code >= 400:
+                    await response.aread()
+                    self._check_status(response)
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        if not received:
+                            STAGE_SECONDS.observe(time.perf_counter() - started, "llm_first_token")
+                            received = True
+                        emit(delta)
+
+        try:
+            await self._with_retries(attempt, deadline, can_retry=lambda: not received)
+        except Exception as e:
+            self._record(e)
+            raise
+        self._record()
+
+    # --- API pública --------------------------------------------------------
 
     def call_llm(self, prompt, context=None):
         """
-        Simula uma chamada para a LLM externa.
-        
+        Gera a resposta completa de forma síncrona (bloqueia a thread chamadora).
+
         Args:
             prompt (str): Texto a ser enviado para a LLM.
-            context (list|None): Histórico ou contexto da conversa (opcional).
-        
-        Returns:
-            str: Mensagem padrão informando que a LLM não está configurada.
+            context (list|None): Histórico da conversa ({"user", "agent"}); as últimas
+                `context_turns` interações são enviadas.
+
+        Raises:
+            LLMError: falha após as novas tentativas (LLMTimeoutError se o prazo acabar).
         """
-        logging.info("call_llm chamado, mas LLM não está configurada.")
-        return "LLM não configurada ainda. Por favor, aguarde."
+        if not self.configured:
+            return PLACEHOLDER_RESPONSE
+        future = self._submit(self._complete(prompt, context))
+        try:
+            return future.result()
+        finally:
+            future.cancel()
+
+    async def acall_llm(self, prompt, context=None):
+        """Versão assíncrona de `call_llm`: aguarda sem bloquear o event loop do chamador."""
+        if not self.configured:
+            return PLACEHOLDER_RESPONSE
+        future = self._submit(self._complete(prompt, context))
+        try:
+            return await asyncio.wrap_future(future)
+        finally:
+            future.cancel()
+
+    async def astream(self, prompt, context=None) -> AsyncIterator[str]:
+        """
+        Gera a resposta em trechos, à medida que chegam da API. Se o consumidor parar de
+        iterar (ex.: cliente desconectou), a geração é cancelada.
+        """
+        if not self.configured:
+            yield PLACEHOLDER_RESPONSE
+            return
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+        done = object()
+
+        def emit(item):
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        future = self._submit(self._stream(prompt, context, emit))
+        future.add_done_callback(lambda f: emit(done))
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            if not future.cancelled() and future.exception() is not None:
+                raise future.exception()
+        finally:
+            future.cancel()
 
     def test_connection(self):
         """
-        Simula teste de conexão com a LLM.
+        Verifica se a API responde (`GET <base_url>/models`).
 
         Returns:
-            bool: True sempre, já que não existe conexão real.
+            bool: True se a API respondeu com sucesso (sempre True no modo placeholder).
         """
-        logging.info("Teste de conexão com LLM (placeholder) executado com sucesso.")
-        return True
+        if not self.configured:
+            logging.info("Teste de conexão com LLM (placeholder) executado com sucesso.")
+            return True
+
+        async def probe():
+            response = await self._client.get("/models", timeout=self.connect_timeout + 1)
+            return response.status_code < 400
+
+        try:
+            return self._submit(probe()).result()
+        except Exception as e:
+            logger.error(f"Falha no teste de conexão com a LLM: {e}")
+            return False
 
     def get_status(self):
         """
-        Retorna status atual do serviço LLM.
+        Retorna status atual do serviço LLM, sem chamar a API: "placeholder", "ok" ou
+        "degraded" (a última chamada falhou).
 
         Returns:
-            dict: Estado do serviço, indicando que está em modo placeholder.
+            dict: Estado do serviço e contadores de chamadas.
         """
-        return {
-            "status": "placeholder",
-            "description": "LLMAPI não conectada a nenhum serviço externo."
-        }
+        if not self.configured:
+            return {
+                "status": "placeholder",
+                "description": "LLMAPI não conectada a nenhum serviço externo."
+            }
+        with self._stats_lock:
+            return {
+                "status": "degraded" if self._last_error else "ok",
+                "base_url": self.base_url,
+                "model": self.model,
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "calls": self._calls,
+                "failures": self._failures,
+                "timeouts": self._timeouts,
+                "retries": self._retries,
+                "last_error": self._last_error,
+            }
+
+    def close(self):
+        """Fecha o pool de conexões e encerra o loop dedicado."""
+        loop = self._loop
+        if loop is None or self._loop_pid != os.getpid():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._client.aclose(), loop).result(timeout=5)
+        except Exception as e:
+            logger.debug(f"Erro ao fechar o cliente da LLM: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
@@ -1,75 +1,280 @@
 import redis
+import atexit
 import json
 import logging
+import os
+import threading
+from collections import OrderedDict, deque
 from typing import List, Dict, Optional
-from config.config import REDIS_URL
+from agent.circuit_breaker import CircuitBreaker, CircuitOpenError
+from agent.metrics import REDIS_SECONDS, REDIS_ERRORS
+from config.config import (
+    REDIS_URL, MEMORY_SESSION_TTL,
+    MEMORY_WRITE_BEHIND, MEMORY_FLUSH_INTERVAL, MEMORY_FLUSH_BATCH_SIZE, MEMORY_MAX_BUFFER,
+    REDIS_MAX_CONNECTIONS, REDIS_POOL_TIMEOUT, REDIS_SOCKET_TIMEOUT, REDIS_CONNECT_TIMEOUT,
+    REDIS_HEALTH_CHECK_INTERVAL, REDIS_CIRCUIT_FAILURES, REDIS_CIRCUIT_RESET_TIMEOUT,
+    MEMORY_LOCAL_MAX_SESSIONS,
+)
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+
+class LocalHistoryStore:
+    def __init__(self, max_sessions: int = MEMORY_LOCAL_MAX_SESSIONS):
+        """
+        Cópia local (LRU, limitada em número de sessões) do histórico, usada quando o
+        Redis está indisponível.
+        """
+        self.max_sessions = max(1, max_sessions)
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _touch(self, key: str, items: deque) -> None:
+        self._sessions[key] = items
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def get(self, key: str) -> List[str]:
+        with self._lock:
+            items = self._sessions.get(key)
+            if items is None:
+                return []
+            self._sessions.move_to_end(key)
+            return list(items)
+
+    def put(self, key: str, items: List[str], limit: int = 50) -> None:
+        with self._lock:
+            self._touch(key, deque(items, maxlen=limit))
+
+    def append(self, key: str, entry: str, limit: int = 50) -> None:
+        with self._lock:
+            items = self._sessions.get(key)
+            if items is None or items.maxlen != limit:
+                items = deque(items or [], maxlen=limit)
+            items.append(entry)
+            self._touch(key, items)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._sessions.pop(key, None)
+
 class MemoryManager:
-    def __init__(self, session_key: str = "jarvis_memory", redis_url: Optional[str] = None):
+    def __init__(self, session_key: str = "jarvis_memory", redis_url: Optional[str] = None,
+                 session_ttl: int = MEMORY_SESSION_TTL, write_behind: bool = MEMORY_WRITE_BEHIND,
+                 flush_interval: float = MEMORY_FLUSH_INTERVAL, flush_batch_size: int = MEMORY_FLUSH_BATCH_SIZE,
+                 max_buffer: int = MEMORY_MAX_BUFFER, client=None):
         """
         Inicializa a conexão com Redis e define a chave de sessão para armazenar histórico.
-        
+        Cada sessão é uma lista Redis própria (`<session_key>:<session_id>`); sem session_id
+        usa-se a própria `session_key`.
+
         Args:
-            session_key (str): chave para armazenar o histórico no Redis.
+            session_key (str): chave (e prefixo das sessões) para armazenar o histórico no Redis.
             redis_url (str|None): URL para conexão com Redis, se None usa REDIS_URL do config.
+            session_ttl (int): expiração, em segundos, do histórico de cada sessão (0 desativa).
+            write_behind (bool): se True, `save_interaction` só enfileira em memória e uma thread
+                grava os lotes no Redis via pipeline.
+            flush_interval (float): intervalo máximo, em segundos, entre gravações em lote.
+            flush_batch_size (int): quantidade de interações pendentes que dispara uma gravação.
+            max_buffer (int): limite do buffer; ao estourar, as interações mais antigas são descartadas.
+            client: cliente já criado com a API do redis.Redis (ex.: Redis em memória dos benchmarks);
+                se informado, `redis_url` e o pool são ignorados.
+
+        A conexão usa um pool limitado (REDIS_MAX_CONNECTIONS) com timeouts curtos e um circuit
+        breaker. Com o circuito aberto, leituras e escritas usam um LocalHistoryStore em memória
+        e as escritas ficam no buffer até o Redis voltar (reconciliação).
         """
         redis_url = redis_url or REDIS_URL
+        self.session_key = session_key
+        self.session_ttl = session_ttl
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self.flush_batch_size = max(1, flush_batch_size)
+        self.max_buffer = max(self.flush_batch_size, max_buffer)
+        self._buffer = deque()
+        # Lote em gravação: continua visível para leituras até o pipeline confirmar
+        self._inflight = []
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flusher = None
+        self._flusher_pid = None
+        self._closed = False
+        self._flushed = 0
+        self._dropped = 0
+        self._flush_errors = 0
+        self.local = LocalHistoryStore()
+        self.breaker = CircuitBreaker("redis", REDIS_CIRCUIT_FAILURES, REDIS_CIRCUIT_RESET_TIMEOUT)
+        self.pool = None
+        if client is not None:
+            self.client = client
+        else:
+            self._connect(redis_url)
+        if self.client:
+            # O pipeline de gravação em lote (write-behind/reconciliação) não trata chaves no formato antigo
+            try:
+                self.execute(lambda: self._migrate_legacy(self.session_key), "migrate")
+            except Exception as e:
+                logger.warning(f"Não foi possível verificar o formato do histórico em '{session_key}': {e}")
+
+    def _connect(self, redis_url: str) -> None:
         try:
-            self.client = redis.from_url(redis_url)
-            self.session_key = session_key
-            logger.info(f"Conectado ao Redis em {redis_url}, usando chave '{session_key}'.")
+            self.pool = redis.BlockingConnectionPool.from_url(
+                redis_url,
+                max_connections=REDIS_MAX_CONNECTIONS,
+                timeout=REDIS_POOL_TIMEOUT,
+                socket_timeout=REDIS_SOCKET_TIMEOUT,
+                socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+                health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            )
+            self.client = redis.Redis(connection_pool=self.pool)
+            logger.info(f"Pool Redis configurado para {redis_url} (máx. {REDIS_MAX_CONNECTIONS} conexões), usando chave '{self.session_key}'.")
         except Exception as e:
             logger.error(f"Falha ao conectar ao Redis: {e}")
             self.client = None
 
-    def load_history(self) -> List[Dict]:
+    def execute(self, operation, name: str = "command"):
+        """
+        Executa uma operação no Redis passando pelo circuit breaker. `name` identifica a
+        operação nas métricas (duração e falhas).
+
+        Raises:
+            CircuitOpenError: se o circuito estiver aberto (a operação não é executada).
+        """
+        if not self.breaker.allow():
+            REDIS_ERRORS.inc(name, "circuit_open")
+            raise CircuitOpenError("Redis indisponível (circuito aberto).")
+        try:
+            with REDIS_SECONDS.time(name):
+                result = operation()
+        except (redis.ConnectionError, redis.TimeoutError):
+            REDIS_ERRORS.inc(name, "connection")
+            self.breaker.record_failure()
+            raise
+        except Exception:
+            # O servidor respondeu (erro de comando, não de conectividade)
+            REDIS_ERRORS.inc(name, "command")
+            self.breaker.record_success()
+            raise
+        if self.breaker.record_success():
+            self._on_recovered()
+        return result
+
+    def _on_recovered(self) -> None:
+        if self._buffer:
+            logger.info(f"Redis recuperado; reconciliando {len(self._buffer)} interações pendentes.")
+            threading.Thread(target=self.flush, name="memory-reconcile", daemon=True).start()
+
+    def _key(self, session_id: Optional[str] = None) -> str:
+        return f"{self.session_key}:{session_id}" if session_id else self.session_key
+
+    def _migrate_legacy(self, key: str) -> None:
+        """Converte o formato antigo (um único JSON em string) para lista Redis."""
+        if self.client.type(key) not in (b"string", "string"):
+            return
+        legacy = json.loads(self.client.get(key) or "[]")
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(key)
+        if legacy:
+            pipe.rpush(key, *[json.dumps(item) for item in legacy])
+        pipe.execute()
+        logger.info(f"Histórico em '{key}' migrado para lista Redis ({len(legacy)} interações).")
+
+    def _with_migration(self, key: str, operation):
+        try:
+            return operation()
+        except redis.ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+            self._migrate_legacy(key)
+            return operation()
+
+    def load_history(self, session_id: Optional[str] = None) -> List[Dict]:
         """
         Carrega o histórico de interações armazenadas no Redis.
 
+        Args:
+            session_id (str|None): sessão a consultar; None usa a sessão padrão.
+
         Returns:
             Lista de dicionários com as interações. Lista vazia se não há histórico ou erro.
         """
         if not self.client:
             logger.warning("Cliente Redis não está inicializado.")
             return []
+        key = self._key(session_id)
         try:
-            history_json = self.client.get(self.session_key)
-            if history_json:
-                return json.loads(history_json)
+            items = self.execute(lambda: self._with_migration(key, lambda: self.client.lrange(key, 0, -1)), "load_history")
         except Exception as e:
-            logger.error(f"Erro ao carregar histórico do Redis: {e}")
-        return []
+            self._log_failure("carregar histórico", e)
+            return [json.loads(item) for item in self.local.get(key)]
+        # Interações ainda no buffer de write-behind também fazem parte do histórico
+        items = [item.decode("utf-8") if isinstance(item, bytes) else item for item in items] + self._pending_for(key)
+        self.local.put(key, items, limit=max(len(items), 1))
+        return [json.loads(item) for item in items]
 
-    def save_interaction(self, user_input: str, agent_response: str, limit: int = 50) -> None:
+    def _log_failure(self, action: str, error: Exception) -> None:
+        if isinstance(error, CircuitOpenError):
+            logger.debug(f"Redis indisponível ao {action}; usando memória local.")
+        else:
+            logger.error(f"Erro ao {action} no Redis: {error}")
+
+    def save_interaction(self, user_input: str, agent_response: str, limit: int = 50,
+                         session_id: Optional[str] = None) -> None:
         """
         Salva uma nova interação adicionando ao histórico, respeitando limite máximo.
+        Usa RPUSH + LTRIM (+ EXPIRE) em um único pipeline transacional: O(1) e atômico.
+        Se ainda houver interações pendentes (queda do Redis), elas são gravadas antes.
 
         Args:
             user_input (str): Mensagem do usuário.
             agent_response (str): Resposta do agente.
             limit (int): Máximo de interações a manter no histórico.
+            session_id (str|None): sessão da interação; None usa a sessão padrão.
         """
         if not self.client:
             logger.warning("Cliente Redis não está inicializado. Interação não salva.")
             return
 
-        history = self.load_history()
-        history.append({"user": user_input, "agent": agent_response})
-        if len(history) > limit:
-            history = history[-limit:]
+        key = self._key(session_id)
+        entry = json.dumps({"user": user_input, "agent": agent_response})
+        self.local.append(key, entry, limit)
+        # Depois de `close` não há mais gravação em lote: grava na hora
+        if self.write_behind and self._enqueue(key, entry, limit):
+            return
+        # Interações de uma queda do Redis ainda pendentes vão antes desta, para manter a ordem
+        if self.pending_count():
+            self.flush()
+            if self.pending_count() and self._enqueue(key, entry, limit):
+                return
+
+        def push():
+            pipe = self.client.pipeline(transaction=True)
+            pipe.rpush(key, entry)
+            pipe.ltrim(key, -limit, -1)
+            if self.session_ttl:
+                pipe.expire(key, self.session_ttl)
+            return pipe.execute()
 
         try:
-            self.client.set(self.session_key, json.dumps(history))
-            logger.debug(f"Interação salva. Histórico atual com {len(history)} interações.")
+            self.execute(lambda: self._with_migration(key, push), "save_interaction")
+            logger.debug(f"Interação salva na chave '{key}'.")
         except Exception as e:
-            logger.error(f"Erro ao salvar histórico no Redis: {e}")
+            self._log_failure("salvar histórico", e)
+            # Fica no buffer e é gravada quando o Redis voltar
+            if not self._enqueue(key, entry, limit):
+                with self._buffer_lock:
+                    self._dropped += 1
+                logger.warning(f"Interação da chave '{key}' descartada: memória já encerrada.")
 
-    def clear_history(self) -> bool:
+    def clear_history(self, session_id: Optional[str] = None) -> bool:
         """
-        Limpa todo o histórico armazenado.
+        Limpa todo o histórico armazenado da sessão.
 
         Returns:
             bool: True se a limpeza foi bem sucedida, False caso contrário.
@@ -78,23 +283,184 @@ class MemoryManager:
             logger.warning("Cliente Redis não está inicializado. Não foi possível limpar histórico.")
             return False
 
+        key = self._key(session_id)
+        with self._buffer_lock:
+            self._buffer = deque(item for item in self._buffer if item[0] != key)
+        self.local.delete(key)
         try:
-            deleted = self.client.delete(self.session_key)
+            deleted = self.execute(lambda: self.client.delete(key), "clear_history")
             logger.info(f"Histórico apagado com sucesso, entradas removidas: {deleted}.")
             return True
         except Exception as e:
             logger.error(f"Erro ao apagar histórico do Redis: {e}")
             return False
 
-    def get_memory_size(self) -> int:
+    def get_memory_size(self, session_id: Optional[str] = None) -> int:
         """
         Retorna o número atual de interações salvas na memória.
 
         Returns:
             int: quantidade de interações. Zero se não houver memória ou erro.
         """
-        history = self.load_history()
-        return len(history)
+        if not self.client:
+            return 0
+        key = self._key(session_id)
+        try:
+            return int(self.execute(lambda: self._with_migration(key, lambda: self.client.llen(key)), "memory_size")) + len(self._pending_for(key))
+        except Exception as e:
+            self._log_failure("consultar tamanho do histórico", e)
+            return len(self.local.get(key))
+
+    # --- Write-behind -----------------------------------------------------
+
+    def _pending_for(self, key: str) -> List[str]:
+        # Lote em gravação (mais antigo) + buffer. Entre o Redis aplicar o pipeline e o flush
+        # confirmar, uma leitura pode ver a interação duas vezes, mas nunca deixa de vê-la.
+        with self._buffer_lock:
+            return [entry for k, entry, _ in self._inflight if k == key] + \
+                   [entry for k, entry, _ in self._buffer if k == key]
+
+    def _enqueue(self, key: str, entry: str, limit: int) -> bool:
+        """Coloca a interação no buffer. Returns: False se a memória já foi encerrada."""
+        self._ensure_flusher()
+        with self._buffer_lock:
+            if self._closed:
+                return False
+            self._buffer.append((key, entry, limit))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self._dropped += 1
+            size = len(self._buffer)
+        if size >= self.flush_batch_size:
+            self._flush_event.set()
+        return True
+
+    def _ensure_flusher(self) -> None:
+        # Thread criada no primeiro uso e recriada após fork (o buffer herdado pertence ao pai)
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        with self._buffer_lock:
+            if self._flusher is not None and self._flusher_pid == os.getpid():
+                return
+            if self._flusher_pid is not None:
+                self._buffer.clear()
+                self._inflight = []
+            self._flusher_pid = os.getpid()
+            self._flusher = threading.Thread(target=self._flush_loop, name="memory-flusher", daemon=True)
+            self._flusher.start()
+        atexit.register(self.close)
+
+    def _flush_loop(self) -> None:
+        while not self._closed:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Grava no Redis, em um único pipeline, todas as interações pendentes do buffer.
+        Em caso de erro, as interações voltam para o buffer (respeitando `max_buffer`).
+        Enquanto o pipeline não confirma, o lote segue visível em `load_history`.
+
+        Returns:
+            int: quantidade de interações gravadas.
+        """
+        with self._flush_lock:
+            return self._flush_batch()
+
+    def _flush_batch(self) -> int:
+        if not self.client:
+            return 0
+        with self._buffer_lock:
+            batch = list(self._buffer)
+            self._buffer.clear()
+            self._inflight = batch
+        if not batch:
+            return 0
+
+        grouped = OrderedDict()
+        for key, entry, limit in batch:
+            entries, _ = grouped.get(key, ([], limit))
+            entries.append(entry)
+            grouped[key] = (entries, limit)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key, (entries, limit) in grouped.items():
+                pipe.rpush(key, *entries)
+                pipe.ltrim(key, -limit, -1)
+                if self.session_ttl:
+                    pipe.expire(key, self.session_ttl)
+            self.execute(pipe.execute, "flush")
+        except Exception as e:
+            self._log_failure(f"gravar lote de histórico ({len(batch)} interações)", e)
+            with self._buffer_lock:
+                self._inflight = []
+                self._flush_errors += 1
+                self._buffer.extendleft(reversed(batch))
+                while len(self._buffer) > self.max_buffer:
+                    self._buffer.popleft()
+                    self._dropped += 1
+            return 0
+        with self._buffer_lock:
+            self._inflight = []
+            self._flushed += len(batch)
+        logger.debug(f"{len(batch)} interações gravadas em lote ({len(grouped)} sessões).")
+        return len(batch)
+
+    def pending_count(self) -> int:
+        """Quantidade de interações ainda não gravadas no Redis."""
+        return len(self._buffer) + len(self._inflight)
+
+    def get_write_stats(self) -> Dict:
+        return {
+            "write_behind": self.write_behind,
+            "unflushed": self.pending_count(),
+            "flushed": self._flushed,
+            "dropped": self._dropped,
+            "flush_errors": self._flush_errors,
+        }
+
+    def close(self) -> None:
+        """Encerra a thread de gravação e grava o que estiver pendente."""
+        with self._buffer_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._flush_event.set()
+        if self._buffer and self._flusher_pid == os.getpid():
+            self.flush()
+
+    def _pool_stats(self) -> Dict:
+        if self.pool is None:
+            return {}
+        try:
+            available = sum(1 for conn in list(self.pool.pool.queue) if conn is not None)
+            created = len(self.pool._connections)
+            return {"max_connections": self.pool.max_connections, "created": created,
+                    "in_use": created - available, "idle": available}
+        except Exception:
+            return {"max_connections": self.pool.max_connections}
+
+    def get_status(self) -> Dict:
+        """
+        Verifica o Redis (PING pelo circuit breaker) e retorna o estado da memória:
+        "ok", "degraded" (usando memória local) ou "down" (sem cliente Redis).
+        """
+        if not self.client:
+            status = "down"
+        else:
+            try:
+                self.execute(self.client.ping, "ping")
+                status = "ok"
+            except Exception:
+                status = "degraded"
+        return {
+            "status": status,
+            "circuit": self.breaker.get_status(),
+            "pool": self._pool_stats(),
+            "local_sessions": len(self.local),
+            "writes": self.get_write_stats(),
+        }
 
 if __name__ == "__main__":
     mm = MemoryManager()
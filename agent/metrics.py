@@ -0,0 +1,250 @@
+"""
+Métricas do processo no formato texto do Prometheus (exposition format 0.0.4), sem dependências.
+
+Contadores e histogramas são atualizados no caminho das requisições (um lock curto por
+métrica); valores que já existem em outros componentes (estatísticas do executor, do cache,
+do buffer do Redis) são lidos só na coleta, por callbacks registrados com `gauge_callback`.
+
+As métricas são por processo: no servidor multi-worker (agent.server) cada worker tem as
+suas, e no executor de processos as etapas do pipeline rodam nos filhos e não aparecem aqui.
+"""
+import bisect
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from config.config import METRICS_ENABLED
+
+# Limites (em segundos) dos buckets de latência: de 0,5 ms a 10 s
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    value = float(value)
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, description: str, labels: Tuple[str, ...] = ()):
+        self.registry = registry
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _check_labels(self, values: Tuple[str, ...]) -> Tuple[str, ...]:
+        if len(values) != len(self.label_names):
+            raise ValueError(f"{self.name} espera os rótulos {self.label_names}, recebeu {values}")
+        return values
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._check_labels(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(tuple(labels), 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}" for key, v in items]
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: "Histogram", labels: Tuple[str, ...]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> [contagem por bucket (não cumulativa, último = +Inf), soma, total]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, seconds: float, *labels: str) -> None:
+        if not self.registry.enabled:
+            return
+        key = self._check_labels(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def time(self, *labels: str):
+        """Context manager que observa a duração do bloco: `with STAGE_SECONDS.time("rerank"): ...`."""
+        if not self.registry.enabled:
+            return _NOOP_TIMER
+        return _Timer(self, labels)
+
+    def snapshot(self, *labels: str) -> Dict:
+        with self._lock:
+            series = self._series.get(tuple(labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": series[2], "sum": series[1]}
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*series[0]], series[1], series[2])) for key, series in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.label_names, key, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    def __init__(self, *args, callback: Callable[[], Dict], kind: str = "gauge", **kwargs):
+        """`callback` retorna {tupla de rótulos: valor} (ou um número, sem rótulos) no momento da coleta."""
+        super().__init__(*args, **kwargs)
+        self.callback = callback
+        self.kind = kind
+
+    def render(self) -> List[str]:
+        values = self.callback()
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(v)}"
+                for key, v in sorted(values.items()) if v is not None]
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        """
+        Registro de métricas do processo. Com `enabled=False`, contadores e timers não fazem
+        nada (custo de uma checagem de atributo) e a coleta só traz as métricas por callback.
+        """
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f"Métrica '{metric.name}' já registrada com outro tipo.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, description: str, labels: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(self, name, description, labels))
+
+    def histogram(self, name: str, description: str, labels: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, description, labels, buckets=buckets))
+
+    def gauge_callback(self, name: str, description: str, callback: Callable[[], Dict],
+                       labels: Tuple[str, ...] = (), kind: str = "gauge") -> GaugeCallback:
+        """Registra (ou substitui) uma métrica lida de `callback` na coleta."""
+        metric = GaugeCallback(self, name, description, labels, callback=callback, kind=kind)
+        with self._lock:
+            self._metrics[name] = metric
+        return metric
+
+    def render(self) -> str:
+        """Todas as métricas no formato texto do Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                samples = metric.render()
+            except Exception as e:
+                lines.append(f"# coleta de {metric.name} falhou: {_escape(e)}")
+                continue
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Etapas de AgentCore.get_response (detect_intent, knowledge_lookup, rerank, pattern_search, llm, ...)
+STAGE_SECONDS = metrics.histogram(
+    "jarvis_stage_duration_seconds", "Duração de cada etapa do pipeline de resposta.", ("stage",))
+# Caminho que produziu a resposta: cache, intent, pattern, llm ou startup
+RESPONSES = metrics.counter("jarvis_responses_total", "Respostas por caminho do pipeline.", ("path",))
+REQUEST_SECONDS = metrics.histogram(
+    "jarvis_http_request_duration_seconds", "Duração das requisições HTTP.", ("method", "route", "status"))
+REDIS_SECONDS = metrics.histogram(
+    "jarvis_redis_operation_duration_seconds", "Duração das operações no Redis.", ("operation",))
+REDIS_ERRORS = metrics.counter(
+    "jarvis_redis_errors_total", "Falhas de operações no Redis (conexão, circuito aberto ou comando).",
+    ("operation", "reason"))
+LLM_CALLS = metrics.counter("jarvis_llm_calls_total", "Chamadas à LLM por resultado.", ("outcome",))
+LLM_RETRIES = metrics.counter("jarvis_llm_retries_total", "Novas tentativas de chamadas à LLM após falhas transitórias.")
@@ -0,0 +1,128 @@
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from agent.batcher import EmbeddingBatcher
+from config.config import EMBEDDING_MODEL_NAME, EMBEDDING_DEVICE, EMBEDDING_BATCHING
+
+logger = logging.getLogger(__name__)
+
+
+class EncoderLoadError(Exception):
+    """O modelo de embeddings não pôde ser carregado (dependência ausente, pesos inválidos...)."""
+
+
+class SharedEncoder:
+    def __init__(self, model_name: str, device: Optional[str] = None):
+        """
+        Encapsula um modelo Sentence Transformers compartilhado pelo processo.
+        O modelo só é carregado no primeiro uso (ou em `warm_up`).
+
+        Args:
+            model_name (str): nome do modelo Sentence Transformers.
+            device (str|None): dispositivo ("cpu", "cuda", ...). None deixa a biblioteca escolher.
+        """
+        self.model_name = model_name
+        self.device = device
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """
+        Retorna o modelo carregado, carregando-o de forma thread-safe se necessário.
+
+        Raises:
+            EncoderLoadError: se o modelo não puder ser carregado.
+        """
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from sentence_transformers import SentenceTransformer
+                        logger.info(f"Carregando modelo de embeddings '{self.model_name}' (device={self.device or 'auto'}).")
+                        self._model = SentenceTransformer(self.model_name, device=self.device)
+                    except Exception as e:
+                        raise EncoderLoadError(f"Erro ao carregar o modelo de embeddings '{self.model_name}': {e}") from e
+        return self._model
+
+    def is_loaded(self) -> bool:
+        return self._model is not None
+
+    def encode(self, sentences, **kwargs):
+        """Repassa a chamada para `SentenceTransformer.encode` do modelo compartilhado."""
+        return self.model.encode(sentences, **kwargs)
+
+    def warm_up(self, sample: str = "olá") -> None:
+        """Carrega o modelo e executa um encode curto para inicializar os kernels."""
+        self.encode([sample])
+
+
+class ModelRegistry:
+    def __init__(self):
+        """Registro de encoders por (nome do modelo, dispositivo), um por processo."""
+        self._encoders: Dict[Tuple[str, Optional[str]], SharedEncoder] = {}
+        self._batchers: Dict[Tuple[str, Optional[str]], EmbeddingBatcher] = {}
+        self._lock = threading.Lock()
+
+    def get_encoder(self, model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = EMBEDDING_DEVICE) -> SharedEncoder:
+        """
+        Retorna o encoder compartilhado para o modelo/dispositivo, criando-o se necessário.
+
+        Args:
+            model_name (str): nome do modelo Sentence Transformers.
+            device (str|None): dispositivo de execução.
+
+        Returns:
+            SharedEncoder: instância única para a combinação pedida.
+        """
+        key = (model_name, device or None)
+        encoder = self._encoders.get(key)
+        if encoder is None:
+            with self._lock:
+                encoder = self._encoders.get(key)
+                if encoder is None:
+                    encoder = SharedEncoder(model_name, device or None)
+                    self._encoders[key] = encoder
+        return encoder
+
+    def get_batcher(self, model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = EMBEDDING_DEVICE) -> Optional[EmbeddingBatcher]:
+        """
+        Retorna o micro-batcher compartilhado do encoder, ou None se EMBEDDING_BATCHING estiver desligado.
+        """
+        if not EMBEDDING_BATCHING:
+            return None
+        key = (model_name, device or None)
+        batcher = self._batchers.get(key)
+        if batcher is None:
+            encoder = self.get_encoder(model_name, device)
+            with self._lock:
+                batcher = self._batchers.get(key)
+                if batcher is None:
+                    batcher = EmbeddingBatcher(encoder)
+                    self._batchers[key] = batcher
+        return batcher
+
+    def batcher_stats(self):
+        return {f"{name}@{device or 'auto'}": b.get_stats() for (name, device), b in self._batchers.items()}
+
+    def warm_up(self, model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = EMBEDDING_DEVICE) -> SharedEncoder:
+        """Carrega e aquece explicitamente o encoder indicado."""
+        encoder = self.get_encoder(model_name, device)
+        encoder.warm_up()
+        return encoder
+
+    def loaded_models(self):
+        """Lista os modelos já carregados em memória."""
+        return [f"{name}@{device or 'auto'}" for (name, device), enc in self._encoders.items() if enc.is_loaded()]
+
+
+registry = ModelRegistry()
+
+
+def get_encoder(model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = EMBEDDING_DEVICE) -> SharedEncoder:
+    return registry.get_encoder(model_name, device)
+
+
+def get_batcher(model_name: str = EMBEDDING_MODEL_NAME, device: Optional[str] = EMBEDDING_DEVICE) -> Optional[EmbeddingBatcher]:
+    return registry.get_batcher(model_name, device)
@@ -1,19 +1,36 @@
+import hashlib
 import pickle
 import os
 import numpy as np
-from sklearn.base import BaseEstimator
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sentence_transformers import SentenceTransformer
+from agent.model_registry import get_encoder, get_batcher
+from agent.intent_classifier import LinearIntentClassifier
+from agent.artifacts import MANIFEST_FILE, is_artifact_dir, load_artifacts, save_artifacts
+from config.config import INTENT_ENGINE
 
 class NLPProcessor:
-    def __init__(self, model_dir='../models'):
+    MODEL_FILES = {"svc": "model.pkl", "linear": "intent_linear"}
+
+    def __init__(self, model_dir='../models', engine=INTENT_ENGINE):
+        """
+        `engine` escolhe o classificador de intenções:
+        - "svc": model.pkl + vectorizer.pkl (pickle do scikit-learn).
+        - "linear": diretório intent_linear/ no formato de agent.artifacts (arrays NumPy +
+          manifesto JSON, sem pickle, pesos mapeados em memória e compartilhados entre
+          workers). O formato anterior (intent_linear.npz + vectorizer.pkl) ainda é lido.
+        """
+        if engine not in self.MODEL_FILES:
+            raise ValueError(f"Engine de intenções desconhecida: '{engine}'. Opções: {sorted(self.MODEL_FILES)}")
         script_dir = os.path.dirname(os.path.abspath(__file__))
-        self.model_path = os.path.join(script_dir, model_dir, 'model.pkl')
+        self.engine = engine
+        self.model_path = os.path.join(script_dir, model_dir, self.MODEL_FILES[engine])
         self.vectorizer_path = os.path.join(script_dir, model_dir, 'vectorizer.pkl')
-        self.model = self._load_pickle(self.model_path)
-        self.vectorizer = self._load_pickle(self.vectorizer_path)
-        # Embeddings model
-        self.embedding_model = SentenceTransformer('paraphrase-MiniLM-L6-v2')
+        if engine == "linear" and not is_artifact_dir(self.model_path) and os.path.exists(self.model_path + ".npz"):
+            self.model_path += ".npz"
+        self._load(self.model_path, self.vectorizer_path)
+        # Embeddings model (compartilhado pelo processo via registry, carregado sob demanda)
+        self.embedding_model = get_encoder()
+        # Micro-batcher que agrupa encodes de requisições concorrentes (None se desativado)
+        self.embedding_batcher = get_batcher()
 
     def _load_pickle(self, path):
         try:
@@ -23,8 +40,48 @@ class NLPProcessor:
             print(f"Erro ao carregar {path}")
             return None
 
+    def _load(self, model_path, vectorizer_path):
+        if is_artifact_dir(model_path):
+            try:
+                self.model, self.vectorizer = load_artifacts(model_path)
+            except Exception:
+                print(f"Erro ao carregar {model_path}")
+                self.model, self.vectorizer = None, None
+        else:
+            self.model = self._load_model(model_path)
+            self.vectorizer = self._load_pickle(vectorizer_path)
+        self.version = self._artifact_version()
+
+    def _load_model(self, path):
+        if str(path).endswith(".npz"):
+            try:
+                return LinearIntentClassifier.load(path)
+            except Exception:
+                print(f"Erro ao carregar {path}")
+                return None
+        return self._load_pickle(path)
+
+    def artifact_files(self):
+        """Arquivos que identificam os artefatos carregados (observados pelo hot-reload)."""
+        if is_artifact_dir(self.model_path):
+            return [os.path.join(self.model_path, MANIFEST_FILE)]
+        return [self.model_path, self.vectorizer_path]
+
+    def _artifact_version(self):
+        """Identifica os artefatos carregados pelo tamanho e data de modificação dos arquivos."""
+        digest = hashlib.sha1()
+        for path in self.artifact_files():
+            try:
+                stat = os.stat(path)
+                digest.update(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+            except OSError:
+                digest.update(f"{os.path.basename(path)}:ausente;".encode())
+        return digest.hexdigest()[:12]
+
     def is_ready(self):
-        return isinstance(self.model, BaseEstimator) and isinstance(self.vectorizer, TfidfVectorizer)
+        # Checagem por interface: evita importar o scikit-learn só para o isinstance
+        return (hasattr(self.model, "predict_proba") and hasattr(self.model, "classes_")
+                and hasattr(self.vectorizer, "transform"))
 
     def transform_text(self, text):
         if not self.vectorizer:
@@ -57,19 +114,69 @@ class NLPProcessor:
             key=lambda x: x["confidence"], reverse=True
         )
 
-    def update_model(self, model_path, vectorizer_path):
+    def predict_intent_batch(self, texts, confidence_threshold=0.75):
+        """
+        Versão vetorizada de `predict_intent`: uma única transformação esparsa e um único
+        `predict_proba` para todos os textos.
+        """
+        if not self.is_ready():
+            print("Modelos de NLP ausentes ou inválidos.")
+            return [None] * len(texts)
+        if not texts:
+            return []
+        probabilities = self.model.predict_proba(self.vectorizer.transform([t.lower() for t in texts]))
+        max_idx = np.argmax(probabilities, axis=1)
+        max_probability = probabilities[np.arange(len(texts)), max_idx]
+        results = []
+        for idx, prob in zip(max_idx, max_probability):
+            intent = self.model.classes_[idx] if prob >= confidence_threshold else "desconhecido"
+            results.append({"intent": intent, "confidence": float(prob)})
+        return results
+
+    def predict_all_batch(self, texts, top_k=None):
+        """
+        Versão vetorizada de `predict_all`. Para cada texto, as `top_k` intenções mais
+        prováveis (todas se None), em ordem decrescente de confiança.
+        """
+        if not self.is_ready():
+            print("Modelos de NLP ausentes ou inválidos.")
+            return [[] for _ in texts]
+        if not texts:
+            return []
+        probabilities = self.model.predict_proba(self.vectorizer.transform([t.lower() for t in texts]))
+        intents = self.model.classes_
+        k = len(intents) if top_k is None else min(top_k, len(intents))
+        order = np.argsort(-probabilities, axis=1, kind="stable")[:, :k]
+        return [
+            [{"intent": intents[i], "confidence": float(probabilities[row, i])} for i in order[row]]
+            for row in range(len(texts))
+        ]
+
+    def update_model(self, model_path, vectorizer_path=None):
+        """Carrega novos artefatos; `vectorizer_path` é ignorado para diretórios de artefatos."""
         self.model_path = model_path
-        self.vectorizer_path = vectorizer_path
-        self.model = self._load_pickle(self.model_path)
-        self.vectorizer = self._load_pickle(self.vectorizer_path)
+        if vectorizer_path is not None:
+            self.vectorizer_path = vectorizer_path
+        self._load(self.model_path, self.vectorizer_path)
 
     def save_model(self, model, vectorizer, model_path=None, vectorizer_path=None):
+        """
+        Grava e carrega os artefatos. Caminhos sem extensão (ex.: intent_linear) usam o formato
+        de agent.artifacts, que exige um classificador linear; os demais usam pickle/.npz.
+        """
         if model_path is None:
             model_path = self.model_path
+        if not os.path.splitext(model_path)[1]:
+            save_artifacts(model_path, model, vectorizer)
+            self.update_model(model_path)
+            return
         if vectorizer_path is None:
             vectorizer_path = self.vectorizer_path
-        with open(model_path, "wb") as f:
-            pickle.dump(model, f)
+        if isinstance(model, LinearIntentClassifier):
+            model.save(model_path)
+        else:
+            with open(model_path, "wb") as f:
+                pickle.dump(model, f)
         with open(vectorizer_path, "wb") as f:
             pickle.dump(vectorizer, f)
         self.update_model(model_path, vectorizer_path)
@@ -79,10 +186,19 @@ class NLPProcessor:
 
     def embed_text(self, text):
         """Retorna embedding de uma sentença com Sentence Transformers."""
+        if self.embedding_batcher:
+            import torch
+            return torch.from_numpy(self.embedding_batcher.encode_one(text))
         return self.embedding_model.encode(text, convert_to_tensor=True)
 
     def embed_texts(self, texts):
         """Retorna embeddings para várias sentenças."""
+        if self.embedding_batcher:
+            import torch
+            # Uma string isolada é uma sentença (como em `encode`), não uma sequência de caracteres
+            single = isinstance(texts, str)
+            embeddings = torch.from_numpy(self.embedding_batcher.encode([texts] if single else list(texts)))
+            return embeddings[0] if single else embeddings
         return self.embedding_model.encode(texts, convert_to_tensor=True)
 
 if __name__ == '__main__':
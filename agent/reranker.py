@@ -1,29 +1,106 @@
 import logging
-from sentence_transformers import SentenceTransformer, util
-import torch
+from pathlib import Path
+from typing import Iterable, Optional
+import numpy as np
+from agent.model_registry import EncoderLoadError, get_encoder, get_batcher
+from agent.embedding_store import EmbeddingStore
+from config.config import EMBEDDING_MODEL_NAME, RESPONSE_EMBEDDINGS_PATH
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class Reranker:
-    def __init__(self, model_name: str = 'paraphrase-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = EMBEDDING_MODEL_NAME, store_path: Optional[str] = RESPONSE_EMBEDDINGS_PATH):
         """
         Inicializa o modelo de reranking baseado em embeddings.
 
         Args:
             model_name (str): nome do modelo Sentence Transformers para embeddings.
+            store_path (str|None): caminho base (sem extensão) do cache de embeddings de respostas
+                em disco. Vazio/None mantém o cache apenas em memória.
+
+        O modelo só é carregado no primeiro encode; se a carga falhar, o reranking é
+        desativado nesse momento (ver `disable`).
         """
         try:
-            self.model = SentenceTransformer(model_name)
-            logger.info(f"Modelo '{model_name}' carregado com sucesso para reranking.")
+            self.model = get_encoder(model_name)
+            self.batcher = get_batcher(model_name)
+            logger.info(f"Modelo '{model_name}' registrado para reranking (compartilhado com NLPProcessor).")
         except Exception as e:
             logger.error(f"Erro ao carregar modelo para reranking: {e}")
             self.model = None
+            self.batcher = None
+        self.model_name = model_name
+        self.store_path = Path(store_path) if store_path else None
+        self.store = self._load_store()
+
+    def disable(self) -> None:
+        """Desativa o reranking (modelo indisponível): as listas de candidatas seguem sem ordenação."""
+        self.model = None
+        self.batcher = None
+
+    def _disable_on_load_error(self, error: EncoderLoadError) -> None:
+        logger.error(f"Modelo de reranking indisponível; reranking desativado: {error}")
+        self.disable()
+
+    def _load_store(self) -> EmbeddingStore:
+        if self.store_path and self.store_path.with_suffix(".npy").is_file():
+            try:
+                store = EmbeddingStore.load(self.store_path)
+                if store.model_name != self.model_name:
+                    # Vetores de outro modelo (ou de um cache sem metadados): recalculados do zero
+                    logger.warning(f"Cache de embeddings de respostas em {self.store_path} gerado por "
+                                   f"'{store.model_name}', não por '{self.model_name}'; descartado.")
+                else:
+                    logger.info(f"Cache de embeddings de respostas carregado de {self.store_path} ({len(store)} entradas).")
+                    return store
+            except Exception as e:
+                logger.error(f"Erro ao carregar cache de embeddings de respostas: {e}")
+        return EmbeddingStore(model_name=self.model_name)
+
+    def _check_dimension(self, dim: int) -> None:
+        # Mesmo nome com pesos de outra dimensão (ex.: modelo local substituído): descarta o store
+        if self.store.dim is not None and len(self.store) and self.store.dim != dim:
+            logger.warning(f"Cache de embeddings de respostas com dimensão {self.store.dim}, "
+                           f"mas o modelo gera {dim}; descartado.")
+            self.store = EmbeddingStore(model_name=self.model_name)
+
+    def precompute(self, responses: Iterable[str]) -> int:
+        """
+        Calcula em lote os embeddings das respostas ainda não cacheadas (por exemplo, todas
+        as respostas da base de conhecimento) e persiste o cache se houver caminho configurado.
+
+        Returns:
+            int: quantidade de embeddings novos calculados.
+        """
+        if not self.model:
+            return 0
+        try:
+            added = self.store.encode_missing(self.model, responses)
+        except EncoderLoadError as e:
+            self._disable_on_load_error(e)
+            return 0
+        except Exception as e:
+            logger.error(f"Erro ao pré-calcular embeddings de respostas: {e}")
+            return 0
+        if added:
+            logger.info(f"{added} embeddings de respostas pré-calculados ({len(self.store)} no cache).")
+            if self.store_path:
+                self.store.save(self.store_path)
+        return added
+
+    def _encode_question(self, question: str) -> np.ndarray:
+        if self.batcher:
+            question_emb = np.asarray(self.batcher.encode_one(question), dtype=np.float32)
+        else:
+            question_emb = np.asarray(self.model.encode([question], convert_to_numpy=True)[0], dtype=np.float32)
+        return question_emb / max(float(np.linalg.norm(question_emb)), 1e-12)
 
     def rank_best_response(self, question: str, responses: list) -> str:
         """
         Dado uma pergunta e uma lista de respostas candidatas, retorna a resposta
         mais semanticamente similar usando embeddings e similaridade do cosseno.
+        Os embeddings das respostas vêm do cache; só a pergunta é codificada.
 
         Args:
             question (str): texto da pergunta do usuário.
@@ -41,17 +118,63 @@ class Reranker:
             return None
 
         try:
-            question_emb = self.model.encode(question, convert_to_tensor=True)
-            responses_emb = self.model.encode(responses, convert_to_tensor=True)
-            scores = util.pytorch_cos_sim(question_emb, responses_emb)[0]
-            best_idx = torch.argmax(scores).item()
-            best_score = scores[best_idx].item()
+            question_emb = self._encode_question(question)
+            self._check_dimension(question_emb.size)
+            store = self.store
+            response_embs = store.embeddings_for(responses)
+            if response_embs is None:
+                # Respostas fora da base (ou adicionadas em tempo de execução): codifica só as novas
+                store.encode_missing(self.model, responses)
+                response_embs = store.embeddings_for(responses)
+            scores = response_embs @ question_emb
+            best_idx = int(np.argmax(scores))
+            best_score = float(scores[best_idx])
             logger.info(f"Melhor score reranking: {best_score:.4f} para resposta índice {best_idx}")
             return responses[best_idx]
+        except EncoderLoadError as e:
+            self._disable_on_load_error(e)
+            return responses[0]
         except Exception as e:
             logger.error(f"Erro durante reranking: {e}")
             return responses[0]  # fallback simples
 
+    def rank_best_responses(self, questions: list, responses_lists: list) -> list:
+        """
+        Versão em lote de `rank_best_response`: codifica todas as perguntas em um único
+        `encode` e escolhe a melhor resposta de cada lista de candidatas.
+
+        Args:
+            questions (list[str]): perguntas dos usuários.
+            responses_lists (list[list[str]]): candidatas de cada pergunta.
+
+        Returns:
+            list[str|None]: melhor resposta de cada pergunta (None para listas vazias).
+        """
+        if not questions:
+            return []
+        if not self.model:
+            return [responses[0] if responses else None for responses in responses_lists]
+        try:
+            question_embs = np.asarray(self.model.encode(list(questions), batch_size=64, convert_to_numpy=True), dtype=np.float32)
+            self._check_dimension(question_embs.shape[1])
+            store = self.store
+            store.encode_missing(self.model, (r for responses in responses_lists for r in responses))
+            question_embs /= np.maximum(np.linalg.norm(question_embs, axis=1, keepdims=True), 1e-12)
+            results = []
+            for question_emb, responses in zip(question_embs, responses_lists):
+                if not responses:
+                    results.append(None)
+                    continue
+                scores = store.embeddings_for(responses) @ question_emb
+                results.append(responses[int(np.argmax(scores))])
+            return results
+        except EncoderLoadError as e:
+            self._disable_on_load_error(e)
+            return [responses[0] if responses else None for responses in responses_lists]
+        except Exception as e:
+            logger.error(f"Erro durante reranking em lote: {e}")
+            return [responses[0] if responses else None for responses in responses_lists]
+
 if __name__ == "__main__":
     reranker = Reranker()
 
@@ -0,0 +1,123 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from config.config import CACHE_EXPIRATION, RESPONSE_CACHE_SIZE
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normaliza a entrada para a chave do cache: minúsculas, sem pontuação e espaços repetidos."""
+    return _SPACES.sub(" ", _PUNCTUATION.sub(" ", text.lower())).strip()
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE, ttl: int = CACHE_EXPIRATION,
+                 memory=None, prefix: str = "jarvis:response_cache"):
+        """
+        Cache de respostas em dois níveis: LRU em memória do processo e, opcionalmente,
+        Redis compartilhado entre workers (com TTL).
+
+        As chaves combinam a versão da base/modelos com o texto normalizado, então qualquer
+        alteração da base muda o espaço de chaves. As entradas da versão anterior não são
+        apagadas na troca: requisições ainda na versão antiga (durante uma recarga ou
+        compactação) continuam acertando, e as que deixam de ser usadas saem pelo LRU.
+
+        Args:
+            max_entries (int): capacidade do LRU local.
+            ttl (int): expiração das entradas, em segundos.
+            memory (MemoryManager|None): fornece o cliente Redis e o circuit breaker do nível
+                compartilhado; None mantém apenas o nível local.
+            prefix (str): prefixo das chaves no Redis.
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.memory = memory if memory is not None and memory.client else None
+        self.prefix = prefix
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits_local = 0
+        self._hits_shared = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _key(self, text: str, version: str) -> str:
+        digest = hashlib.sha1(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{version}:{digest}"
+
+    def get(self, text: str, version: str) -> Optional[str]:
+        """Retorna a resposta cacheada para o texto na versão indicada, ou None."""
+        key = self._key(text, version)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._hits_local += 1
+                    return response
+                del self._entries[key]
+
+        if self.memory is not None:
+            try:
+                value = self.memory.execute(lambda: self.memory.client.get(f"{self.prefix}:{key}"), "cache_get")
+            except Exception as e:
+                logger.debug(f"Cache compartilhado indisponível: {e}")
+                value = None
+            if value is not None:
+                response = value.decode("utf-8") if isinstance(value, bytes) else value
+                self._store_local(key, response)
+                with self._lock:
+                    self._hits_shared += 1
+                return response
+
+        with self._lock:
+            self._misses += 1
+        return None
+
+    def set(self, text: str, version: str, response: str) -> None:
+        """Armazena a resposta nos dois níveis."""
+        key = self._key(text, version)
+        self._store_local(key, response)
+        if self.memory is not None:
+            try:
+                self.memory.execute(lambda: self.memory.client.set(f"{self.prefix}:{key}", response, ex=self.ttl or None),
+                                    "cache_set")
+            except Exception as e:
+                logger.debug(f"Falha ao gravar no cache compartilhado: {e}")
+
+    def _store_local(self, key: str, response: str) -> None:
+        with self._lock:
+            self._entries[key] = (response, time.monotonic() + (self.ttl or float("inf")))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self) -> None:
+        """Esvazia o nível local (o compartilhado só muda de espaço de chaves com a versão)."""
+        with self._lock:
+            self._entries.clear()
+            self._invalidations += 1
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            hits = self._hits_local + self._hits_shared
+            total = hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits_local": self._hits_local,
+                "hits_shared": self._hits_shared,
+                "misses": self._misses,
+                "hit_ratio": hits / total if total else 0.0,
+                "invalidations": self._invalidations,
+                "shared": self.memory is not None,
+            }
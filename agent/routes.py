@@ -1,12 +1,21 @@
 from fastapi import FastAPI, HTTPException, Depends, Request, status
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field, ValidationError
-from typing import Optional
-from agent.core import AgentCore
+from typing import List, Optional
+from agent.core import AgentCore, NotReadyError
+from agent.executor import InferenceExecutor, QueueFullError
+from agent.hot_reload import HotReloader, ReloadInProgressError
+from agent.metrics import metrics, REQUEST_SECONDS, CONTENT_TYPE
+from agent.model_registry import registry
+from agent.server import memory_usage, broadcast_reload
+import json
+import os
 import time
 import logging
-from config.config import API_KEY
-from fastapi.responses import JSONResponse
+from config.config import API_KEY, INFERENCE_RETRY_AFTER, CHAT_BATCH_MAX_ITEMS, HOT_RELOAD_WATCH
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.routing import Match
 
 app = FastAPI(title="Jarvis Chatbot API", version="1.0")
 
@@ -20,18 +29,92 @@ app.add_middleware(
 )
 
 agent = AgentCore()
+executor = InferenceExecutor(agent)
+reloader = HotReloader(agent)
+# Workers de processo herdam o estado via fork: recria o pool após cada troca
+reloader.on_swap(lambda state: executor.recycle())
 start_time = time.time()
 logger = logging.getLogger("uvicorn.error")
 
 
+def _cache_requests():
+    stats = agent.cache.get_stats() if agent.cache else None
+    if stats is None:
+        return None
+    return {("hit_local",): stats["hits_local"], ("hit_shared",): stats["hits_shared"], ("miss",): stats["misses"]}
+
+
+def _semantic_cache_requests():
+    stats = agent.semantic_cache.get_stats() if agent.semantic_cache else None
+    if stats is None:
+        return None
+    return {("hit",): stats["hits"], ("miss",): stats["misses"], ("skipped",): stats["skipped"]}
+
+
+def _process_memory():
+    usage = memory_usage()
+    return {(kind,): usage[f"{kind}_kb"] * 1024 for kind in ("rss", "pss", "private_dirty") if f"{kind}_kb" in usage}
+
+
+# Valores mantidos pelos próprios componentes, lidos apenas quando /metrics é coletado
+metrics.gauge_callback("jarvis_ready", "1 quando todos os componentes do agente estão carregados.",
+                       lambda: int(agent.is_ready()))
+metrics.gauge_callback("jarvis_uptime_seconds", "Tempo desde o início do processo.", lambda: time.time() - start_time)
+metrics.gauge_callback("jarvis_inference_queue_depth", "Chamadas aguardando um worker de inferência.",
+                       lambda: executor.get_stats()["queue_depth"])
+metrics.gauge_callback("jarvis_inference_rejected_total", "Chamadas rejeitadas por fila cheia.",
+                       lambda: executor.get_stats()["rejected"], kind="counter")
+metrics.gauge_callback("jarvis_response_cache_requests_total", "Consultas ao cache de respostas por resultado.",
+                       _cache_requests, labels=("result",), kind="counter")
+metrics.gauge_callback("jarvis_semantic_cache_requests_total", "Consultas ao cache semântico da LLM por resultado.",
+                       _semantic_cache_requests, labels=("result",), kind="counter")
+metrics.gauge_callback("jarvis_semantic_cache_entries", "Respostas da LLM no cache semântico do processo.",
+                       lambda: len(agent.semantic_cache) if agent.semantic_cache else None)
+metrics.gauge_callback("jarvis_memory_unflushed", "Interações ainda não gravadas no Redis.",
+                       lambda: agent.memory.pending_count())
+metrics.gauge_callback("jarvis_memory_dropped_total", "Interações descartadas por estouro do buffer.",
+                       lambda: agent.memory.get_write_stats()["dropped"], kind="counter")
+metrics.gauge_callback("jarvis_redis_circuit_open", "1 quando o circuit breaker do Redis está aberto.",
+                       lambda: int(agent.memory.breaker.state == "open"))
+metrics.gauge_callback("jarvis_model_reloads_total", "Recargas de modelos por resultado.",
+                       lambda: {("ok",): reloader.get_status()["reloads"], ("failed",): reloader.get_status()["failures"]},
+                       labels=("outcome",), kind="counter")
+metrics.gauge_callback("jarvis_process_memory_bytes", "Memória do processo (RSS, PSS e privada).",
+                       _process_memory, labels=("kind",))
+
+
+@app.on_event("startup")
+async def warm_up_models():
+    agent.warm_up()
+    if HOT_RELOAD_WATCH:
+        reloader.start_watching()
+
+
+@app.on_event("shutdown")
+async def shutdown_executor():
+    reloader.stop()
+    executor.shutdown(wait=False)
+    agent.close()
+
+
 class ChatRequest(BaseModel):
     text: str = Field(..., min_length=1, description="Texto enviado pelo usuário")
+    session_id: Optional[str] = Field(None, max_length=128, description="Identificador da sessão do usuário (histórico isolado)")
 
 
 class ChatResponse(BaseModel):
     response: str
 
 
+class ChatBatchRequest(BaseModel):
+    texts: List[str] = Field(..., min_items=1, max_items=CHAT_BATCH_MAX_ITEMS, description="Mensagens enviadas pelo usuário")
+    session_id: Optional[str] = Field(None, max_length=128, description="Identificador da sessão do usuário (histórico isolado)")
+
+
+class ChatBatchResponse(BaseModel):
+    responses: List[str]
+
+
 def verify_api_key(request: Request):
     api_key = request.headers.get("X-API-KEY")
     if not api_key or api_key != API_KEY:
@@ -43,6 +126,57 @@ def verify_api_key(request: Request):
     return True
 
 
+def ensure_ready_for_executor():
+    # Workers de processo são criados por fork e não herdam a thread de carga em andamento
+    if executor.kind == "process" and not agent.is_ready():
+        raise NotReadyError("Agente ainda inicializando.")
+
+
+async def prepare_response(user_text, session_id):
+    """
+    Parte síncrona do pipeline no executor de inferência. No modo "process" o filho só
+    calcula a resposta da base; o contexto (e a memória) é gravado neste processo.
+    """
+    ensure_ready_for_executor()
+    if executor.kind == "thread":
+        return await executor.run("prepare_response", user_text, session_id)
+    response = await executor.run("answer_from_knowledge", user_text)
+    if response is not None:
+        await run_in_threadpool(agent.save_context, user_text, response, session_id)
+    return response
+
+
+async def get_responses(texts, session_id):
+    """Pipeline completo de um lote; como em `prepare_response`, o estado fica neste processo."""
+    ensure_ready_for_executor()
+    if executor.kind == "thread":
+        return await executor.run("get_responses", texts, session_id)
+    responses = await executor.run("answer_batch_from_knowledge", texts)
+    for i, text in enumerate(texts):
+        if responses[i] is None:
+            responses[i] = await agent.ask_llm_async(text, session_id)
+        await run_in_threadpool(agent.save_context, text, responses[i], session_id)
+    return responses
+
+
+def raise_not_ready():
+    logger.warning("Requisição recebida antes do fim da inicialização; rejeitada com 503.")
+    raise HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servidor iniciando. Tente novamente em instantes.",
+        headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+    )
+
+
+def route_template(request: Request) -> str:
+    """Caminho declarado da rota (ex.: /chat), para não criar uma série de métricas por URL."""
+    for route in app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     logger.info(f"Request: {request.method} {request.url}")
@@ -50,24 +184,68 @@ async def log_requests(request: Request, call_next):
     try:
         response = await call_next(request)
     except Exception as exc:
+        REQUEST_SECONDS.observe(time.time() - start, request.method, route_template(request), "500")
         logger.error(f"Exception handling request: {exc}")
         raise
-    process_time = (time.time() - start) * 1000
-    logger.info(f"Response status: {response.status_code} completed in {process_time:.2f}ms")
+    elapsed = time.time() - start
+    REQUEST_SECONDS.observe(elapsed, request.method, route_template(request), str(response.status_code))
+    logger.info(f"Response status: {response.status_code} completed in {elapsed * 1000:.2f}ms")
     return response
 
 
 @app.get("/health", dependencies=[Depends(verify_api_key)], tags=["Status"])
 async def health_check():
     uptime = time.time() - start_time
+    # PING passa pelo circuit breaker; roda fora do loop para não bloquear com timeouts
+    memory = await run_in_threadpool(agent.memory.get_status)
     return {
         "status": "running",
+        "ready": agent.is_ready(),
+        "startup": agent.get_readiness(),
         "uptime_seconds": int(uptime),
-        "memory_status": "ok",
-        "llm_api_status": "ok"
+        "memory_status": memory["status"],
+        "memory": memory,
+        "llm_api_status": agent.llm.get_status()["status"],
+        "inference": executor.get_stats(),
+        "embedding_batching": registry.batcher_stats(),
+        "response_cache": agent.cache.get_stats() if agent.cache else None,
+        "semantic_cache": agent.semantic_cache.get_stats() if agent.semantic_cache else None,
+        "models": reloader.get_status(),
+        "process": memory_usage()
     }
 
 
+@app.get("/metrics", dependencies=[Depends(verify_api_key)], tags=["Status"])
+async def metrics_endpoint():
+    """Métricas do processo no formato texto do Prometheus."""
+    # Alguns callbacks leem /proc e tomam locks: fora do event loop
+    body = await run_in_threadpool(metrics.render)
+    return Response(content=body, media_type=CONTENT_TYPE)
+
+
+@app.post("/admin/reload", dependencies=[Depends(verify_api_key)], tags=["Admin"])
+async def reload_models():
+    """
+    Recarrega modelos de intenção e base de conhecimento a partir do disco, sem reiniciar.
+    No servidor multi-worker, este worker recarrega agora e os demais em seguida, por sinal
+    do mestre (`broadcast`); o estado retornado é o deste worker (`pid`).
+    """
+    try:
+        result = await run_in_threadpool(reloader.reload, "admin")
+    except ReloadInProgressError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Já existe uma recarga de modelos em andamento."
+        )
+    except Exception as e:
+        logger.error(f"Erro ao recarregar modelos: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Falha ao recarregar os modelos; a versão anterior continua em uso."
+        )
+    return {**result, "pid": os.getpid(), "broadcast": broadcast_reload()}
+
+
 @app.post("/chat", response_model=ChatResponse, dependencies=[Depends(verify_api_key)], tags=["Chat"])
 async def chat_endpoint(chat_req: ChatRequest):
     user_text = chat_req.text.strip()
@@ -77,8 +255,21 @@ async def chat_endpoint(chat_req: ChatRequest):
             detail="O campo 'text' não pode estar vazio."
         )
     try:
-        response_text = agent.get_response(user_text)
+        response_text = await prepare_response(user_text, chat_req.session_id)
+        if response_text is None:
+            # A geração da LLM é aguardada no event loop, sem ocupar um worker de inferência
+            response_text = await agent.ask_llm_async(user_text, chat_req.session_id)
+            await run_in_threadpool(agent.save_context, user_text, response_text, chat_req.session_id)
         return ChatResponse(response=response_text)
+    except NotReadyError:
+        raise_not_ready()
+    except QueueFullError:
+        logger.warning("Fila de inferência cheia; requisição rejeitada com 503.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
     except Exception as e:
         logger.error(f"Erro ao processar mensagem: {e}")
         raise HTTPException(
@@ -87,6 +278,94 @@ async def chat_endpoint(chat_req: ChatRequest):
         )
 
 
+def sse_event(data: dict, event: Optional[str] = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/chat/stream", dependencies=[Depends(verify_api_key)], tags=["Chat"])
+async def chat_stream_endpoint(chat_req: ChatRequest):
+    """
+    Variante de /chat em Server-Sent Events: eventos `data: {"delta": ...}` à medida que a
+    resposta é gerada e um evento final `done` com a resposta completa. Respostas da base de
+    conhecimento chegam em um único `delta`.
+    """
+    user_text = chat_req.text.strip()
+    if not user_text:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="O campo 'text' não pode estar vazio."
+        )
+    # Fila cheia e inicialização são tratadas antes de abrir o stream, com os mesmos códigos de /chat
+    try:
+        prepared = await prepare_response(user_text, chat_req.session_id)
+    except NotReadyError:
+        raise_not_ready()
+    except QueueFullError:
+        logger.warning("Fila de inferência cheia; requisição rejeitada com 503.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except Exception as e:
+        logger.error(f"Erro ao processar mensagem: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno ao processar a solicitação."
+        )
+
+    async def events():
+        if prepared is not None:
+            yield sse_event({"delta": prepared})
+            yield sse_event({"response": prepared}, event="done")
+            return
+        parts = []
+        try:
+            async for delta in agent.stream_llm(user_text, chat_req.session_id):
+                parts.append(delta)
+                yield sse_event({"delta": delta})
+        except Exception as e:
+            logger.error(f"Erro durante o streaming da LLM: {e}")
+            yield sse_event({"detail": "Erro ao gerar a resposta."}, event="error")
+            return
+        response_text = "".join(parts)
+        await run_in_threadpool(agent.save_context, user_text, response_text, chat_req.session_id)
+        yield sse_event({"response": response_text}, event="done")
+
+    # Sem buffer em proxies (nginx) para que cada trecho chegue ao cliente assim que gerado
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.post("/chat/batch", response_model=ChatBatchResponse, dependencies=[Depends(verify_api_key)], tags=["Chat"])
+async def chat_batch_endpoint(batch_req: ChatBatchRequest):
+    texts = [text.strip() for text in batch_req.texts]
+    if not all(texts):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Nenhum item de 'texts' pode estar vazio."
+        )
+    try:
+        responses = await get_responses(texts, batch_req.session_id)
+        return ChatBatchResponse(responses=responses)
+    except NotReadyError:
+        raise_not_ready()
+    except QueueFullError:
+        logger.warning("Fila de inferência cheia; lote rejeitado com 503.")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado. Tente novamente em instantes.",
+            headers={"Retry-After": str(INFERENCE_RETRY_AFTER)},
+        )
+    except Exception as e:
+        logger.error(f"Erro ao processar lote de mensagens: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Erro interno ao processar a solicitação."
+        )
+
+
 @app.exception_handler(ValidationError)
 async def validation_exception_handler(request: Request, exc: ValidationError):
     return JSONResponse(
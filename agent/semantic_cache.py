@@ -0,0 +1,284 @@
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from agent.response_cache import normalize_text
+from config.config import (
+    SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL, SEMANTIC_CACHE_MAX_ENTRIES, SEMANTIC_CACHE_SYNC_INTERVAL,
+    EMBEDDING_MODEL_NAME,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _to_vector(embedding) -> np.ndarray:
+    """Converte o embedding (tensor do PyTorch ou array) em vetor float32 de norma 1."""
+    if hasattr(embedding, "detach"):
+        embedding = embedding.detach().cpu().numpy()
+    vector = np.asarray(embedding, dtype=np.float32).ravel()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def context_key(turns) -> str:
+    """
+    Chave do histórico enviado à LLM: hash dos turnos normalizados (como no cache de
+    respostas). Sem histórico, a chave é vazia.
+    """
+    if not turns:
+        return ""
+    text = "\n".join(f"{normalize_text(turn.get('user', ''))}\t{normalize_text(turn.get('agent', ''))}"
+                     for turn in turns)
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class SemanticCache:
+    def __init__(self, embed: Callable, threshold: float = SEMANTIC_CACHE_THRESHOLD, ttl: int = SEMANTIC_CACHE_TTL,
+                 max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES, memory=None,
+                 sync_interval: float = SEMANTIC_CACHE_SYNC_INTERVAL,
+                 prefix: str = f"jarvis:semantic_cache:{EMBEDDING_MODEL_NAME}"):
+        """
+        Cache semântico das respostas da LLM: uma mensagem cujo embedding tenha similaridade
+        de cosseno >= `threshold` com uma pergunta já respondida pela LLM recebe a mesma
+        resposta, sem nova geração (paráfrases da mesma dúvida).
+
+        Os embeddings ficam em uma matriz pré-alocada (`max_entries` linhas, normalizadas), e a
+        busca é um único produto matriz-vetor. Entradas expiram após `ttl` segundos; com a
+        capacidade esgotada, a usada há mais tempo é substituída (LRU).
+
+        Cada entrada guarda também a chave do histórico enviado à LLM (`context_key`): uma
+        resposta só é servida para a mesma chave, então o que foi gerado com o contexto de
+        uma conversa não vaza para outra com histórico diferente. Fica na frente apenas do
+        fallback para a LLM, depois da base de conhecimento.
+
+        Args:
+            embed (callable): texto -> embedding (ex.: NLPProcessor.embed_text).
+            threshold (float): similaridade mínima para considerar um acerto.
+            ttl (int): expiração das entradas, em segundos (0 desativa).
+            max_entries (int): capacidade do cache.
+            memory (MemoryManager|None): fornece o cliente Redis e o circuit breaker para
+                compartilhar as entradas entre workers; None mantém o cache só no processo.
+                As entradas vão para um stream do Redis limitado a `max_entries` (XADD MAXLEN),
+                e cada worker lê o que foi acrescentado desde o último ID visto (XREAD).
+            sync_interval (float): intervalo, em segundos, da leitura das entradas gravadas por
+                outros workers no Redis.
+            prefix (str): prefixo das chaves no Redis (inclui o modelo de embeddings).
+        """
+        self.embed = embed
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.memory = memory if memory is not None and memory.client else None
+        self.sync_interval = sync_interval
+        self.prefix = prefix
+        self._matrix = None
+        self._ids = [None] * self.max_entries
+        self._responses = [None] * self.max_entries
+        self._contexts = np.full(self.max_entries, None, dtype=object)
+        self._expires = np.full(self.max_entries, -np.inf)
+        self._slots = OrderedDict()  # id -> linha da matriz, da menos para a mais recente
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._lock = threading.Lock()
+        self._sync_thread = None
+        self._sync_pid = None
+        self._last_stream_id = "0-0"
+        self._hits = 0
+        self._misses = 0
+        self._skipped = 0
+        self._evictions = 0
+        self._synced = 0
+
+    @property
+    def _stream_key(self) -> str:
+        return f"{self.prefix}:stream"
+
+    def __len__(self):
+        return len(self._slots)
+
+    def record_skip(self) -> None:
+        """Conta uma chamada à LLM que não pode usar o cache (ex.: LLM não configurada)."""
+        with self._lock:
+            self._skipped += 1
+
+    # --- Busca e inserção locais ---------------------------------------------
+
+    def lookup(self, text: str, context: str = "") -> Tuple[Optional[str], np.ndarray]:
+        """
+        Procura uma resposta para uma pergunta semelhante feita com o mesmo histórico
+        (`context`, de `context_key`).
+
+        Returns:
+            tuple: (resposta ou None, embedding da pergunta, reaproveitável em `add`)
+        """
+        self._ensure_sync()
+        vector = _to_vector(self.embed(text))
+        now = time.time()
+        with self._lock:
+            if self._matrix is not None and self._slots and self._matrix.shape[1] == vector.size:
+                scores = self._matrix @ vector
+                scores[self._expires <= now] = -np.inf
+                scores[self._contexts != context] = -np.inf
+                slot = int(np.argmax(scores))
+                if scores[slot] >= self.threshold:
+                    self._slots.move_to_end(self._ids[slot])
+                    self._hits += 1
+                    return self._responses[slot], vector
+            self._misses += 1
+        return None, vector
+
+    def _insert(self, entry_id: str, vector: np.ndarray, response: str, expires_at: float, context: str) -> None:
+        with self._lock:
+            if entry_id in self._slots:
+                return
+            if self._matrix is None or self._matrix.shape[1] != vector.size:
+                # Alocada no primeiro uso, quando a dimensão dos embeddings é conhecida
+                self._reset(vector.size)
+            if not self._free:
+                self._purge_expired(time.time())
+            if not self._free:
+                _, slot = self._slots.popitem(last=False)
+                self._evictions += 1
+            else:
+                slot = self._free.pop()
+            self._matrix[slot] = vector
+            self._ids[slot] = entry_id
+            self._responses[slot] = response
+            self._contexts[slot] = context
+            self._expires[slot] = expires_at
+            self._slots[entry_id] = slot
+
+    def _reset(self, dim: int) -> None:
+        self._matrix = np.zeros((self.max_entries, dim), dtype=np.float32)
+        self._slots.clear()
+        self._expires[:] = -np.inf
+        self._contexts[:] = None
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def _purge_expired(self, now: float) -> None:
+        for entry_id, slot in list(self._slots.items()):
+            if self._expires[slot] <= now:
+                del self._slots[entry_id]
+                self._expires[slot] = -np.inf
+                self._responses[slot] = None
+                self._contexts[slot] = None
+                self._free.append(slot)
+
+    def add(self, text: str, response: str, vector: Optional[np.ndarray] = None, context: str = "") -> None:
+        """Guarda a resposta da LLM para `text` com o histórico `context` (e a publica no Redis, se compartilhado)."""
+        vector = vector if vector is not None else _to_vector(self.embed(text))
+        entry_id = uuid.uuid4().hex
+        expires_at = time.time() + self.ttl if self.ttl else np.inf
+        self._insert(entry_id, vector, response, expires_at, context)
+        if self.memory is not None:
+            self._publish(entry_id, text, response, vector, expires_at, context)
+
+    def clear(self) -> None:
+        with self._lock:
+            if self._matrix is not None:
+                self._reset(self._matrix.shape[1])
+
+    # --- Compartilhamento via Redis ------------------------------------------
+
+    def _publish(self, entry_id, text, response, vector, expires_at, context) -> None:
+        # Stream podado por tamanho a cada gravação: nenhuma chave fica para trás, mesmo sem TTL.
+        # O Redis atribui IDs crescentes na ordem de chegada, então XREAD a partir do último ID
+        # visto não perde entradas de workers concorrentes (a expiração vai no payload).
+        payload = json.dumps({"id": entry_id, "text": text, "response": response, "context": context,
+                              "expires_at": expires_at if self.ttl else None,
+                              "vector": base64.b64encode(vector.astype(np.float32).tobytes()).decode("ascii")},
+                             ensure_ascii=False)
+
+        def publish():
+            pipe = self.memory.client.pipeline(transaction=False)
+            pipe.xadd(self._stream_key, {"entry": payload}, maxlen=self.max_entries, approximate=False)
+            if self.ttl:
+                # Sem gravações por um TTL inteiro, todas as entradas já expiraram
+                pipe.expire(self._stream_key, self.ttl)
+            return pipe.execute()
+
+        try:
+            self.memory.execute(publish, "semantic_cache_publish")
+        except Exception as e:
+            logger.debug(f"Falha ao publicar no cache semântico compartilhado: {e}")
+
+    def sync(self) -> int:
+        """
+        Copia para o processo as entradas gravadas no Redis (por qualquer worker) desde a
+        última sincronização.
+
+        Returns:
+            int: quantidade de entradas novas.
+        """
+        if self.memory is None:
+            return 0
+        last_id = self._last_stream_id
+        try:
+            streams = self.memory.execute(
+                lambda: self.memory.client.xread({self._stream_key: last_id}, count=self.max_entries),
+                "semantic_cache_sync")
+        except Exception as e:
+            logger.debug(f"Cache semântico compartilhado indisponível: {e}")
+            return 0
+
+        added = 0
+        now = time.time()
+        for _, messages in streams or []:
+            for message_id, fields in messages:
+                last_id = message_id.decode("utf-8") if isinstance(message_id, bytes) else message_id
+                entry = json.loads(fields.get(b"entry", fields.get("entry")))
+                expires_at = entry.get("expires_at")
+                if (expires_at is not None and expires_at <= now) or entry["id"] in self._slots:
+                    continue
+                vector = np.frombuffer(base64.b64decode(entry["vector"]), dtype=np.float32)
+                self._insert(entry["id"], vector, entry["response"], np.inf if expires_at is None else expires_at,
+                             entry.get("context", ""))
+                added += 1
+        self._last_stream_id = last_id
+        self._synced += added
+        return added
+
+    def _ensure_sync(self) -> None:
+        # Thread criada no primeiro uso e recriada após fork
+        if self.memory is None or not self.sync_interval:
+            return
+        if self._sync_thread is not None and self._sync_pid == os.getpid():
+            return
+        with self._lock:
+            if self._sync_thread is not None and self._sync_pid == os.getpid():
+                return
+            self._sync_pid = os.getpid()
+            self._sync_thread = threading.Thread(target=self._sync_loop, name="semantic-cache-sync", daemon=True)
+            self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar o cache semântico: {e}")
+            time.sleep(self.sync_interval)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            total = self._hits + self._misses
+            return {
+                "entries": len(self._slots),
+                "max_entries": self.max_entries,
+                "threshold": self.threshold,
+                "hits": self._hits,
+                "misses": self._misses,
+                "skipped": self._skipped,
+                "hit_ratio": self._hits / total if total else 0.0,
+                "evictions": self._evictions,
+                "synced_from_shared": self._synced,
+                "shared": self.memory is not None,
+            }
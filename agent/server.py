@@ -0,0 +1,273 @@
+"""
+Servidor multi-worker com pré-carga (estilo `preload_app` do gunicorn).
+
+O processo mestre importa agent.routes, o que constrói o AgentCore com a base de
+conhecimento, os classificadores e o modelo de embeddings. Depois congela o heap
+(`gc.freeze`) e cria os workers via fork. Os workers compartilham essas páginas por
+copy-on-write; os arrays grandes (matriz TF-IDF do snapshot, embeddings das respostas e
+pesos da engine linear) já são mapeados de arquivos, então nem chegam a ser copiados.
+Cada worker roda um uvicorn no mesmo socket de escuta.
+
+Recarga de modelos: `POST /admin/reload` recarrega o worker que recebeu a requisição e envia
+SIGHUP ao mestre, que repassa o sinal aos demais workers e recarrega o próprio estado (usado
+pelos workers recriados). `kill -HUP <pid do mestre>` recarrega todos.
+
+Uso:
+    python -m agent.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, Optional
+
+from config.config import (
+    SERVER_HOST, SERVER_PORT, SERVER_WORKERS, SERVER_TORCH_THREADS, SERVER_MEMORY_REPORT_INTERVAL, LOG_LEVEL,
+)
+
+logger = logging.getLogger("jarvis.server")
+
+# Definido nos workers do PreforkServer: pid do mestre, que repassa as recargas
+_master_pid: Optional[int] = None
+# O worker que pediu a recarga já recarregou: ignora a cópia do sinal que o mestre devolve
+_skip_broadcast = threading.Event()
+
+_SMAPS_FIELDS = {"Rss": "rss_kb", "Pss": "pss_kb", "Shared_Clean": "shared_clean_kb",
+                 "Shared_Dirty": "shared_dirty_kb", "Private_Clean": "private_clean_kb",
+                 "Private_Dirty": "private_dirty_kb"}
+
+
+def memory_usage(pid: Optional[int] = None) -> Dict:
+    """
+    Uso de memória do processo (Linux: /proc/<pid>/smaps_rollup). O PSS divide as páginas
+    compartilhadas entre os processos que as mapeiam, então a soma do PSS dos workers é o
+    custo real do conjunto; o Private_Dirty é o que cada worker deixou de compartilhar.
+    """
+    pid = pid or os.getpid()
+    usage = {"pid": pid}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in _SMAPS_FIELDS:
+                    usage[_SMAPS_FIELDS[name]] = int(value.split()[0])
+    except OSError:
+        # Fora do Linux: apenas o pico de RSS do próprio processo
+        try:
+            import resource
+            if pid == os.getpid():
+                usage["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        except ImportError:
+            pass
+    return usage
+
+
+def _set_torch_threads(n: int) -> None:
+    try:
+        import torch
+        torch.set_num_threads(max(1, n))
+    except ImportError:
+        pass
+
+
+def broadcast_reload() -> bool:
+    """
+    Pede ao mestre que recarregue os demais workers (o atual já recarregou).
+
+    Returns:
+        bool: False fora do PreforkServer (processo único: não há outros workers).
+    """
+    if _master_pid is None:
+        return False
+    _skip_broadcast.set()
+    os.kill(_master_pid, signal.SIGHUP)
+    return True
+
+
+def _reload_state(reason: str) -> None:
+    from agent import routes
+    from agent.hot_reload import ReloadInProgressError
+
+    try:
+        routes.reloader.reload(reason)
+    except ReloadInProgressError as e:
+        logger.warning(f"Recarga ({reason}) ignorada em pid {os.getpid()}: {e}")
+    except Exception:
+        pass  # Já registrado pelo HotReloader; a versão anterior continua em uso
+
+
+def _on_worker_reload_signal(signum, frame) -> None:
+    if _skip_broadcast.is_set():
+        _skip_broadcast.clear()
+        return
+    # Fora do handler: a recarga leva segundos e o worker segue atendendo com a versão atual
+    threading.Thread(target=_reload_state, args=("broadcast",), name="worker-reload", daemon=True).start()
+
+
+def _bind_socket(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+class PreforkServer:
+    def __init__(self, host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = SERVER_WORKERS,
+                 torch_threads: int = SERVER_TORCH_THREADS, report_interval: float = SERVER_MEMORY_REPORT_INTERVAL):
+        """
+        Args:
+            host, port: endereço do socket compartilhado pelos workers.
+            workers (int): quantidade de processos uvicorn.
+            torch_threads (int): threads intra-op do PyTorch por worker (1 worker por núcleo → 1).
+            report_interval (float): intervalo, em segundos, do relatório de memória dos workers (0 desliga).
+        """
+        self.host = host
+        self.port = port
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads
+        self.report_interval = report_interval
+        self.app = None
+        self.sock = None
+        self.children: Dict[int, int] = {}  # pid -> índice do worker
+        self._stopping = False
+        self._reload_requested = False
+
+    def preload(self) -> None:
+        """Carrega todo o estado somente leitura no mestre, antes do fork."""
+        # Com 1 thread o pool do OpenMP não é criado no mestre, e os filhos podem criar o próprio
+        _set_torch_threads(1)
+        start = time.perf_counter()
+        from agent import routes
+        from agent.model_registry import registry
+
+        # Threads não sobrevivem ao fork: a carga em etapas precisa terminar no mestre
+        routes.agent.wait_until_ready(timeout=None)
+        # Carrega os pesos do modelo de embeddings sem executá-lo; o aquecimento roda em cada worker
+        registry.get_encoder().model
+        self.app = routes.app
+        gc.collect()
+        # Objetos já existentes saem das coletas: o GC não escreve nos cabeçalhos e as páginas continuam compartilhadas
+        gc.freeze()
+        logger.info(f"Estado pré-carregado em {time.perf_counter() - start:.1f}s; "
+                    f"mestre com {memory_usage().get('rss_kb', 0) / 1024:.0f} MB de RSS.")
+
+    def _run_worker(self, index: int) -> None:
+        import uvicorn
+
+        global _master_pid
+        _master_pid = os.getppid()
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGHUP, _on_worker_reload_signal)
+        _set_torch_threads(self.torch_threads)
+        config = uvicorn.Config(self.app, log_level=LOG_LEVEL.lower(), lifespan="on")
+        server = uvicorn.Server(config)
+        logger.info(f"Worker {index} iniciado (pid {os.getpid()}).")
+        server.run(sockets=[self.sock])
+
+    def _spawn(self, index: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                self._run_worker(index)
+            except BaseException as e:
+                logger.error(f"Worker {index} encerrado com erro: {e}")
+                code = 1
+            finally:
+                os._exit(code)
+        self.children[pid] = index
+
+    def report_memory(self) -> Dict:
+        """Uso de memória do mestre e de cada worker, com o total de PSS do conjunto."""
+        workers = [dict(memory_usage(pid), worker=index) for pid, index in sorted(self.children.items(), key=lambda i: i[1])]
+        master = memory_usage()
+        total_pss = master.get("pss_kb", 0) + sum(w.get("pss_kb", 0) for w in workers)
+        for w in workers:
+            logger.info(f"worker {w['worker']} (pid {w['pid']}): RSS {w.get('rss_kb', 0) / 1024:.0f} MB, "
+                        f"PSS {w.get('pss_kb', 0) / 1024:.0f} MB, privado {w.get('private_dirty_kb', 0) / 1024:.0f} MB")
+        logger.info(f"Total (mestre + {len(workers)} workers): PSS {total_pss / 1024:.0f} MB")
+        return {"master": master, "workers": workers, "total_pss_kb": total_pss}
+
+    def _handle_signal(self, signum, frame):
+        self._stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _request_reload(self, signum, frame):
+        self._reload_requested = True
+
+    def broadcast_reload(self) -> None:
+        """Repassa a recarga a todos os workers e recarrega o estado do mestre."""
+        logger.info(f"Recarga de modelos repassada a {len(self.children)} workers.")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGHUP)
+            except ProcessLookupError:
+                pass
+        # Workers recriados depois de uma falha partem do estado do mestre
+        _reload_state("broadcast")
+        gc.collect()
+        gc.freeze()
+
+    def serve(self) -> None:
+        if self.app is None:
+            self.preload()
+        self.sock = _bind_socket(self.host, self.port)
+        signal.signal(signal.SIGTERM, self._handle_signal)
+        signal.signal(signal.SIGINT, self._handle_signal)
+        signal.signal(signal.SIGHUP, self._request_reload)
+        for index in range(self.workers):
+            self._spawn(index)
+        logger.info(f"{self.workers} workers atendendo em http://{self.host}:{self.port}")
+
+        last_report = time.monotonic()
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid:
+                index = self.children.pop(pid, None)
+                if index is not None and not self._stopping:
+                    logger.warning(f"Worker {index} (pid {pid}) terminou com status {status}; recriando.")
+                    time.sleep(1)  # evita um laço de forks se o worker falhar logo ao iniciar
+                    self._spawn(index)
+                continue
+            if self._reload_requested:
+                self._reload_requested = False
+                self.broadcast_reload()
+                continue
+            if self.report_interval and time.monotonic() - last_report >= self.report_interval:
+                self.report_memory()
+                last_report = time.monotonic()
+            time.sleep(0.5)
+        self.sock.close()
+        logger.info("Servidor encerrado.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    parser.add_argument("--torch-threads", type=int, default=SERVER_TORCH_THREADS)
+    parser.add_argument("--report-interval", type=float, default=SERVER_MEMORY_REPORT_INTERVAL)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=LOG_LEVEL, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+    PreforkServer(args.host, args.port, args.workers, args.torch_threads, args.report_interval).serve()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
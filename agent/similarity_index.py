@@ -0,0 +1,158 @@
+import logging
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SearchResult = Tuple[np.ndarray, np.ndarray]
+
+
+def _top_k(indices: np.ndarray, scores: np.ndarray, k: int) -> SearchResult:
+    """Seleciona os k maiores scores (positivos), em ordem decrescente."""
+    mask = scores > 0
+    indices, scores = indices[mask], scores[mask]
+    if len(scores) > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        indices, scores = indices[part], scores[part]
+    order = np.argsort(-scores, kind="stable")
+    return indices[order], scores[order]
+
+
+class SimilarityIndex:
+    """
+    Interface dos índices de similaridade sobre a matriz TF-IDF (linhas normalizadas em L2,
+    portanto o produto escalar é a similaridade do cosseno).
+    """
+    name = "base"
+
+    def __init__(self):
+        self.matrix = None
+
+    def __len__(self):
+        return 0 if self.matrix is None else self.matrix.shape[0]
+
+    def build(self, matrix) -> "SimilarityIndex":
+        raise NotImplementedError
+
+    def search(self, queries, k: int = 1) -> List[SearchResult]:
+        """
+        Busca os k vizinhos mais próximos de cada linha de `queries`.
+
+        Returns:
+            list[(np.ndarray, np.ndarray)]: para cada consulta, índices das linhas e scores,
+            ordenados do mais similar para o menos similar.
+        """
+        raise NotImplementedError
+
+    def top_k(self, query, k: int = 1) -> SearchResult:
+        """Atalho de `search` para uma única consulta (matriz esparsa 1 x n_termos)."""
+        return self.search(query, k)[0]
+
+
+class ExactIndex(SimilarityIndex):
+    """Busca exata: um único produto esparso consulta x padrões e seleção parcial do top-k."""
+    name = "exact"
+
+    def build(self, matrix):
+        self.matrix = matrix.tocsr()
+        self._matrix_t = self.matrix.T  # CSC, sem cópia dos dados
+        return self
+
+    def search(self, queries, k=1):
+        if self.matrix is None:
+            return [(np.empty(0, dtype=np.int64), np.empty(0))] * queries.shape[0]
+        scores = (queries.tocsr() @ self._matrix_t).tocsr()
+        results = []
+        for i in range(scores.shape[0]):
+            start, end = scores.indptr[i], scores.indptr[i + 1]
+            results.append(_top_k(scores.indices[start:end].astype(np.int64), scores.data[start:end], k))
+        return results
+
+
+class InvertedIndex(SimilarityIndex):
+    """
+    Busca aproximada por índice invertido sobre os termos TF-IDF.
+
+    Cada termo guarda apenas as `max_postings` ocorrências de maior peso, e cada consulta
+    usa no máximo `max_query_terms` termos (os de maior peso). Os candidatos encontrados
+    são então re-pontuados de forma exata.
+    """
+    name = "inverted"
+
+    def __init__(self, max_postings: int = 2000, max_query_terms: int = 16):
+        super().__init__()
+        self.max_postings = max_postings
+        self.max_query_terms = max_query_terms
+
+    def build(self, matrix):
+        self.matrix = matrix.tocsr()
+        csc = self.matrix.tocsc()
+        ptr, docs = [0], []
+        for term in range(csc.shape[1]):
+            start, end = csc.indptr[term], csc.indptr[term + 1]
+            rows, vals = csc.indices[start:end], csc.data[start:end]
+            if len(vals) > self.max_postings:
+                keep = np.argpartition(-vals, self.max_postings - 1)[:self.max_postings]
+                rows, vals = rows[keep], vals[keep]
+            docs.append(rows)
+            ptr.append(ptr[-1] + len(rows))
+        self._ptr = np.asarray(ptr, dtype=np.int64)
+        self._docs = np.concatenate(docs).astype(np.int64) if docs else np.empty(0, dtype=np.int64)
+        logger.info(f"Índice invertido construído: {csc.shape[1]} termos, {len(self._docs)} postings.")
+        return self
+
+    def _candidates(self, terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        if len(terms) > self.max_query_terms:
+            keep = np.argpartition(-weights, self.max_query_terms - 1)[:self.max_query_terms]
+            terms = terms[keep]
+        chunks = [self._docs[self._ptr[t]:self._ptr[t + 1]] for t in terms]
+        if not chunks:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(chunks))
+
+    def search(self, queries, k=1):
+        queries = queries.tocsr()
+        results = []
+        for i in range(queries.shape[0]):
+            if self.matrix is None:
+                results.append((np.empty(0, dtype=np.int64), np.empty(0)))
+                continue
+            start, end = queries.indptr[i], queries.indptr[i + 1]
+            candidates = self._candidates(queries.indices[start:end], queries.data[start:end])
+            if len(candidates) == 0:
+                results.append((candidates, np.empty(0)))
+                continue
+            scores = (self.matrix[candidates] @ queries[i].T).toarray().ravel()
+            results.append(_top_k(candidates, scores, k))
+        return results
+
+
+INDEX_BACKENDS: Dict[str, type] = {
+    ExactIndex.name: ExactIndex,
+    InvertedIndex.name: InvertedIndex,
+}
+
+
+def make_index(backend: str = "exact", **kwargs) -> SimilarityIndex:
+    """Cria um índice pelo nome do backend ("exact" ou "inverted")."""
+    try:
+        return INDEX_BACKENDS[backend](**kwargs)
+    except KeyError:
+        raise ValueError(f"Backend de índice desconhecido: '{backend}'. Opções: {sorted(INDEX_BACKENDS)}")
+
+
+def recall_at_k(index: SimilarityIndex, reference: SimilarityIndex, queries, k: int = 1) -> float:
+    """
+    Mede o recall@k de `index` em relação a `reference` (normalmente o ExactIndex).
+
+    Returns:
+        float: fração média dos k vizinhos exatos que o índice também retornou.
+    """
+    found = index.search(queries, k)
+    expected = reference.search(queries, k)
+    recalls = []
+    for (got, _), (exp, _) in zip(found, expected):
+        if len(exp):
+            recalls.append(len(np.intersect1d(got, exp)) / len(exp))
+    return float(np.mean(recalls)) if recalls else 1.0
@@ -0,0 +1,35 @@
+from typing import TYPE_CHECKING, Dict, List, Tuple
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+# Parâmetros do TfidfVectorizer que afetam `transform` e precisam ser preservados
+TFIDF_PARAMS = ("ngram_range", "lowercase", "analyzer", "norm", "use_idf", "smooth_idf", "sublinear_tf", "max_features")
+
+
+def export_tfidf_vectorizer(vectorizer: "TfidfVectorizer") -> Tuple[Dict, List[str], np.ndarray]:
+    """
+    Decompõe um TfidfVectorizer treinado em dados simples (sem pickle).
+
+    Returns:
+        tuple: (parâmetros JSON-serializáveis, termos ordenados pelo índice da coluna, vetor IDF).
+    """
+    params = {name: getattr(vectorizer, name) for name in TFIDF_PARAMS}
+    params["ngram_range"] = list(params["ngram_range"])
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, idx in vectorizer.vocabulary_.items():
+        terms[idx] = term
+    return params, terms, np.asarray(vectorizer.idf_, dtype=np.float64)
+
+
+def load_tfidf_vectorizer(params: Dict, terms: List[str], idf: np.ndarray) -> "TfidfVectorizer":
+    """Reconstrói um TfidfVectorizer pronto para `transform` a partir de `export_tfidf_vectorizer`."""
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    kwargs = {name: params[name] for name in TFIDF_PARAMS if name in params and name != "max_features"}
+    kwargs["ngram_range"] = tuple(kwargs.get("ngram_range", (1, 1)))
+    vectorizer = TfidfVectorizer(vocabulary={term: i for i, term in enumerate(terms)}, **kwargs)
+    vectorizer.idf_ = np.asarray(idf, dtype=np.float64)
+    return vectorizer
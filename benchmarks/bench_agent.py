@@ -0,0 +1,481 @@
+"""
+Benchmark de ponta a ponta de AgentCore.get_response, separado por caminho do pipeline:
+
+- intent: intenção reconhecida pelo classificador + rerank das respostas;
+- pattern: classificador sem confiança, resposta pelo padrão mais semelhante (TF-IDF) + rerank;
+- llm: nada na base, fallback para a LLM (stub com latência configurável).
+
+Para cada tamanho, uma base sintética (de 1 mil a 1 milhão de padrões) e um classificador
+linear do mesmo formato do treinado (classes x termos) são gerados em um diretório
+temporário. Cada tamanho roda em um subprocesso próprio, para que o tempo de inicialização e
+o pico de RSS não se misturem, com um Redis em memória no lugar do servidor.
+
+Relata p50/p95/p99, vazão (sequencial e com `--concurrency` threads), pico de RSS e tempo de
+inicialização (com a duração de cada etapa) em JSON. Com `--baseline`, compara o resultado com
+um JSON gravado antes e termina com código 1 se houver regressão acima da tolerância.
+
+Uso:
+    python -m benchmarks.bench_agent [--sizes 1000,10000,100000,1000000] [--requests 300] [--output atual.json]
+    python -m benchmarks.bench_agent --baseline base.json [--tolerance 0.15]
+    python -m benchmarks.bench_agent --current atual.json --baseline base.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from benchmarks.import_time import REQUIRED_ENV  # noqa: E402
+
+for _name, _value in REQUIRED_ENV.items():
+    os.environ.setdefault(_name, _value)
+
+import numpy as np  # noqa: E402
+
+PATHS = ("intent", "pattern", "llm")
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+# Palavras comuns a todas as intenções: entram na base (TF-IDF dos padrões), mas não no classificador
+SHARED_WORDS = ["como", "qual", "quero", "saber", "sobre", "me", "fale", "pode", "ajudar", "com",
+                "preciso", "de", "informação", "explique"]
+WORDS_PER_INTENT = 12
+PATTERNS_PER_INTENT = 50
+MIN_INTENTS, MAX_INTENTS = 20, 1000
+# Uma em cada HOLDOUT_EVERY intenções fica fora do classificador: suas mensagens seguem pelo caminho "pattern"
+HOLDOUT_EVERY = 10
+# Escala dos centroides: com cossenos em [0, 1], deixa o softmax confiante no acerto
+CENTROID_SCALE = 50.0
+
+
+class FakeRedis:
+    """Subconjunto em memória da API do redis-py usado por MemoryManager e ResponseCache (sem TTL)."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _encode(value):
+        return value.encode("utf-8") if isinstance(value, str) else value
+
+    @staticmethod
+    def _range(items, start, end):
+        n = len(items)
+        start = max(start + n if start < 0 else start, 0)
+        end = end + n if end < 0 else end
+        return items[start:end + 1] if end >= start else []
+
+    def ping(self):
+        return True
+
+    def type(self, key):
+        with self._lock:
+            value = self._data.get(key)
+        if value is None:
+            return b"none"
+        return b"list" if isinstance(value, list) else b"string"
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+        return value if isinstance(value, bytes) else None
+
+    def set(self, key, value, ex=None):
+        with self._lock:
+            self._data[key] = self._encode(value)
+        return True
+
+    def delete(self, *keys):
+        with self._lock:
+            return sum(self._data.pop(key, None) is not None for key in keys)
+
+    def expire(self, key, seconds):
+        with self._lock:
+            return key in self._data
+
+    def rpush(self, key, *values):
+        with self._lock:
+            items = self._data.setdefault(key, [])
+            items.extend(self._encode(v) for v in values)
+            return len(items)
+
+    def ltrim(self, key, start, end):
+        with self._lock:
+            if key in self._data:
+                self._data[key] = self._range(self._data[key], start, end)
+        return True
+
+    def lrange(self, key, start, end):
+        with self._lock:
+            return list(self._range(self._data.get(key, []), start, end))
+
+    def llen(self, key):
+        with self._lock:
+            return len(self._data.get(key, []))
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self._commands = []
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        # Executa tudo sob o lock do cliente, como um MULTI/EXEC
+        with self.client._lock:
+            results = [method(*args, **kwargs) for method, args, kwargs in self._commands]
+        self._commands = []
+        return results
+
+
+class StubLLM:
+    """LLM falsa com latência fixa, para medir o custo do caminho de fallback sem rede."""
+
+    def __init__(self, latency_ms=0.0):
+        self.latency = latency_ms / 1000
+
+    def call_llm(self, prompt, context=None):
+        if self.latency:
+            time.sleep(self.latency)
+        return "Resposta da LLM (stub)."
+
+    def get_status(self):
+        return {"status": "stub"}
+
+    def close(self):
+        pass
+
+
+def synthetic_knowledge(n_patterns, seed=42):
+    """
+    Gera uma base com ~`n_patterns` padrões. Cada intenção tem vocabulário próprio
+    (WORDS_PER_INTENT termos) misturado a palavras comuns, e três respostas.
+
+    Returns:
+        tuple: (intenções no formato da base, nomes das intenções usadas no classificador)
+    """
+    rng = random.Random(seed)
+    n_intents = min(MAX_INTENTS, max(MIN_INTENTS, n_patterns // PATTERNS_PER_INTENT))
+    intents, trained = {}, []
+    for i in range(n_intents):
+        name = f"tema_{i}"
+        words = [f"t{i}w{k}" for k in range(WORDS_PER_INTENT)]
+        count = n_patterns // n_intents + (1 if i < n_patterns % n_intents else 0)
+        patterns = set()
+        for _ in range(count * 3):
+            if len(patterns) >= count:
+                break
+            patterns.add(" ".join(rng.sample(SHARED_WORDS, 2) + rng.sample(words, rng.randint(2, 4))))
+        intents[name] = {
+            "padroes": sorted(patterns),
+            "respostas": [f"Resposta {r + 1} sobre o tema {i}: " + " ".join(words[r:r + 4]) for r in range(3)],
+        }
+        if i % HOLDOUT_EVERY != HOLDOUT_EVERY - 1:
+            trained.append(name)
+    return intents, trained
+
+
+def build_intent_model(intents, trained, model_dir):
+    """
+    Grava em `model_dir/intent_linear` um classificador de centroides TF-IDF (LinearIntentClassifier).
+    O custo de inferência depende só do formato (classes x termos), igual ao do modelo treinado,
+    e a construção é O(padrões), viável até 1 milhão de padrões.
+    """
+    from scipy import sparse
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from agent.artifacts import save_artifacts
+    from agent.intent_classifier import LinearIntentClassifier
+
+    texts = [p for name in trained for p in intents[name]["padroes"]]
+    rows = np.repeat(np.arange(len(trained)), [len(intents[name]["padroes"]) for name in trained])
+    vectorizer = TfidfVectorizer(stop_words=SHARED_WORDS)
+    X = vectorizer.fit_transform(texts)
+    membership = sparse.csr_matrix((np.ones(len(rows)), (rows, np.arange(len(rows)))), shape=(len(trained), len(rows)))
+    centroids = np.asarray((membership @ X).todense(), dtype=np.float32)
+    centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+    model = LinearIntentClassifier(centroids * CENTROID_SCALE, np.zeros(len(trained)), trained)
+    save_artifacts(os.path.join(model_dir, "intent_linear"), model, vectorizer)
+
+
+def make_queries(intents, trained, count, seed=42):
+    """Mensagens candidatas de cada caminho (conferidas depois contra o agente real)."""
+    rng = random.Random(seed)
+    trained_set = set(trained)
+    held_out = [name for name in intents if name not in trained_set]
+    queries = {
+        "intent": [rng.choice(intents[rng.choice(trained)]["padroes"]) for _ in range(count)],
+        "pattern": [rng.choice(intents[rng.choice(held_out)]["padroes"]) for _ in range(count)],
+        # Só termos fora do vocabulário: palavras comuns bastariam para casar com algum padrão
+        "llm": [" ".join(f"desconhecido{rng.randrange(10 ** 6)}" for _ in range(rng.randint(3, 5)))
+                for _ in range(count)],
+    }
+    return queries
+
+
+def resolve_path(agent, text):
+    """Caminho que `get_response` seguirá para `text` (mesmas regras de AgentCore._resolve_from_knowledge)."""
+    state = agent.state
+    prediction = state.nlp.predict_intent(text, confidence_threshold=0.6)
+    intent = prediction["intent"] if prediction and prediction["intent"] != "desconhecido" else None
+    if intent and state.kb.find_responses(intent):
+        return "intent"
+    pattern = state.kb.find_most_similar_pattern(text, threshold=0.5)
+    if pattern and state.kb.get_response_by_pattern(pattern):
+        return "pattern"
+    return "llm"
+
+
+def summarize(timings_ms):
+    timings = np.asarray(timings_ms)
+    return {
+        "n": int(timings.size),
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(timings.mean()),
+        "max_ms": float(timings.max()),
+        "throughput_rps": float(timings.size / (timings.sum() / 1000)),
+    }
+
+
+def timed_call(agent, text, session_id):
+    start = time.perf_counter()
+    agent.get_response(text, session_id=session_id)
+    return (time.perf_counter() - start) * 1000
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return None
+
+
+def run_size(n_patterns, requests, warmup, concurrency, sessions, llm_latency_ms, seed):
+    """Executa o benchmark de um tamanho de base no processo atual e retorna o resultado."""
+    # Os logs por requisição (INFO) distorceriam as medidas
+    logging.disable(logging.INFO)
+    from agent.core import AgentCore
+    from agent.memory import MemoryManager
+    from agent.reranker import Reranker
+
+    with tempfile.TemporaryDirectory(prefix="bench_agent_") as workdir:
+        start = time.perf_counter()
+        intents, trained = synthetic_knowledge(n_patterns, seed)
+        kb_path = os.path.join(workdir, "knowledge.json")
+        with open(kb_path, "w", encoding="utf-8") as f:
+            json.dump({"content": {"intencoes": intents, "entidades": {}}}, f, ensure_ascii=False)
+        build_intent_model(intents, trained, workdir)
+        generation_s = time.perf_counter() - start
+        rss_before_agent = peak_rss_mb()
+
+        start = time.perf_counter()
+        agent = AgentCore(staged=False, knowledge_files=[kb_path], kb_snapshot_path=None, model_dir=workdir,
+                          engine="linear", memory=MemoryManager(client=FakeRedis()), llm=StubLLM(llm_latency_ms),
+                          reranker=Reranker(store_path=None))
+        startup_s = time.perf_counter() - start
+        # Mede o pipeline, não os caches de respostas
+        agent.cache = None
+        agent.semantic_cache = None
+
+        candidates = make_queries(intents, trained, max(requests, warmup), seed)
+        queries, path_check = {}, {}
+        for path in PATHS:
+            matching = [q for q in candidates[path] if resolve_path(agent, q) == path]
+            path_check[path] = {"candidates": len(candidates[path]), "matching": len(matching)}
+            if matching:
+                queries[path] = (matching * (requests // len(matching) + 1))[:requests]
+
+        latency = {}
+        for path, texts in queries.items():
+            for text in texts[:warmup]:
+                agent.get_response(text, session_id="aquecimento")
+            latency[path] = summarize([timed_call(agent, text, f"bench-{i % sessions}") for i, text in enumerate(texts)])
+
+        mixed = [text for texts in zip(*queries.values()) for text in texts]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            timings = list(pool.map(lambda item: timed_call(agent, item[1], f"bench-{item[0] % sessions}"),
+                                    enumerate(mixed)))
+        elapsed = time.perf_counter() - start
+        concurrent = dict(summarize(timings), throughput_rps=len(mixed) / elapsed, concurrency=concurrency)
+
+        result = {
+            "size": n_patterns,
+            "patterns": len(agent.kb.get_all_patterns()),
+            "intents": len(intents),
+            "classifier_intents": len(trained),
+            "generation_s": generation_s,
+            "startup_s": startup_s,
+            "startup_components": agent.get_readiness()["components"],
+            "peak_rss_mb": peak_rss_mb(),
+            "peak_rss_before_agent_mb": rss_before_agent,
+            "path_check": path_check,
+            "latency": latency,
+            "concurrent": concurrent,
+        }
+        agent.close()
+        return result
+
+
+def run_in_subprocess(size, args):
+    command = [sys.executable, "-m", "benchmarks.bench_agent", "--run-size", str(size),
+               "--requests", str(args.requests), "--warmup", str(args.warmup),
+               "--concurrency", str(args.concurrency), "--sessions", str(args.sessions),
+               "--llm-latency-ms", str(args.llm_latency_ms), "--seed", str(args.seed)]
+    proc = subprocess.run(command, cwd=ROOT, capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        tail = proc.stderr.strip().splitlines()[-5:]
+        print(f"  falhou (código {proc.returncode}): {' | '.join(tail)}")
+        return {"size": size, "error": tail}
+    return json.loads(lines[-1])
+
+
+def print_result(result):
+    if "error" in result:
+        return
+    print(f"  {result['patterns']} padrões / {result['intents']} intenções: startup {result['startup_s']:.2f}s, "
+          f"pico de RSS {result['peak_rss_mb']:.0f} MB")
+    for path, stats in result["latency"].items():
+        print(f"  {path:>8}: p50={stats['p50_ms']:.2f}ms p95={stats['p95_ms']:.2f}ms p99={stats['p99_ms']:.2f}ms "
+              f"{stats['throughput_rps']:.0f} req/s")
+    for path, check in result["path_check"].items():
+        if check["matching"] < check["candidates"]:
+            print(f"  aviso: {check['candidates'] - check['matching']} mensagens de '{path}' seguiram outro caminho")
+    concurrent = result["concurrent"]
+    print(f"  {concurrent['concurrency']} threads: {concurrent['throughput_rps']:.0f} req/s, p99={concurrent['p99_ms']:.2f}ms")
+
+
+# Métricas comparadas: (caminho da chave, maior é melhor)
+COMPARED_METRICS = [
+    *[(("latency", path, stat), False) for path in PATHS for stat in ("p50_ms", "p95_ms", "p99_ms")],
+    *[(("latency", path, "throughput_rps"), True) for path in PATHS],
+    (("concurrent", "throughput_rps"), True),
+    (("concurrent", "p99_ms"), False),
+    (("startup_s",), False),
+    (("peak_rss_mb",), False),
+]
+
+
+def _lookup(result, keys):
+    for key in keys:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def compare(current, baseline, tolerance=0.15, min_delta_ms=0.5):
+    """
+    Compara dois resultados por tamanho de base. Uma métrica regride se piorar mais que
+    `tolerance` (fração) e, nas latências, também mais que `min_delta_ms` em valor absoluto.
+
+    Returns:
+        list: regressões encontradas (dicionários com tamanho, métrica, valores e variação).
+    """
+    baseline_by_size = {r["size"]: r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    for result in current["results"]:
+        reference = baseline_by_size.get(result["size"])
+        if reference is None or "error" in result:
+            continue
+        for keys, higher_is_better in COMPARED_METRICS:
+            new, old = _lookup(result, keys), _lookup(reference, keys)
+            if new is None or not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            if worse <= tolerance:
+                continue
+            if keys[-1].endswith("_ms") and abs(new - old) < min_delta_ms:
+                continue
+            regressions.append({"size": result["size"], "metric": ".".join(keys), "baseline": old,
+                                "current": new, "change": change})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="quantidades de padrões das bases sintéticas, separadas por vírgula")
+    parser.add_argument("--requests", type=int, default=300, help="mensagens medidas por caminho")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sessions", type=int, default=100, help="sessões distintas usadas nas mensagens")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="latência simulada da LLM")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="arquivo JSON para gravar os resultados")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--current", help="usa este JSON como resultado atual em vez de executar")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="piora relativa tolerada na comparação")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="diferença mínima de latência para regressão")
+    parser.add_argument("--run-size", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_size:
+        result = run_size(args.run_size, args.requests, args.warmup, args.concurrency, args.sessions,
+                          args.llm_latency_ms, args.seed)
+        print(json.dumps(result))
+        return
+
+    if args.current:
+        with open(args.current, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    else:
+        results = []
+        for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+            print(f"Base sintética com {size} padrões...")
+            result = run_in_subprocess(size, args)
+            print_result(result)
+            results.append(result)
+        report = {"created_at": time.time(), "python": sys.version.split()[0],
+                  "config": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "current", "run_size")},
+                  "results": results}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+
+    # Um caminho sem mensagens some do relatório e da comparação: falha em vez de omiti-lo
+    uncovered = [(r["size"], path) for r in report["results"] if "error" not in r
+                 for path, check in r["path_check"].items() if not check["matching"]]
+    for size, path in uncovered:
+        print(f"ERRO [{size}] nenhuma mensagem seguiu o caminho '{path}'; resultado incompleto.")
+    if uncovered:
+        sys.exit(1)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        for r in regressions:
+            print(f"REGRESSÃO [{r['size']}] {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} ({r['change']:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"Sem regressões acima de {args.tolerance:.0%} em relação a {args.baseline}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Mede o custo de import e de inicialização do serviço, em subprocessos limpos:
+
+- perfil `python -X importtime` do módulo (padrão: agent.routes), com os pacotes de maior
+  tempo cumulativo e quais dependências pesadas (torch, sklearn, ...) foram importadas;
+- tempo até a aplicação existir (o servidor já pode aceitar conexões) e até o agente ficar
+  pronto, com STAGED_STARTUP=true.
+
+Uso:
+    python -m benchmarks.import_time [--module agent.routes] [--top 15] [--budget-ms 1000] [--output resultado.json]
+
+Com --budget-ms, termina com código 1 se o tempo até aceitar tráfego passar do limite.
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+HEAVY_PACKAGES = ("torch", "sentence_transformers", "transformers", "sklearn", "scipy", "redis", "fastapi")
+
+# Variáveis obrigatórias do config; valores fictícios bastam para importar (o Redis cai no fallback local)
+REQUIRED_ENV = {
+    "API_KEY": "benchmark",
+    "REDIS_URL": "redis://127.0.0.1:6379/0",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+}
+
+_IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$")
+
+STARTUP_SNIPPET = """
+import json, time
+start = time.perf_counter()
+import {module} as target
+imported = time.perf_counter() - start
+ready, error = None, None
+agent = getattr(target, "agent", None)
+if agent is not None:
+    try:
+        agent.wait_until_ready(timeout=None)
+        ready = time.perf_counter() - start
+    except Exception as e:
+        error = str(e)
+print(json.dumps({{"import_s": imported, "ready_s": ready, "error": error,
+                  "readiness": agent.get_readiness() if agent is not None else None}}))
+"""
+
+
+def _env():
+    env = dict(os.environ)
+    for name, value in REQUIRED_ENV.items():
+        env.setdefault(name, value)
+    env.setdefault("STAGED_STARTUP", "true")
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    return env
+
+
+def import_profile(module, top=15):
+    """Executa `-X importtime` e agrega o tempo cumulativo por módulo importado."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True)
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({"module": name, "self_ms": int(self_us) / 1000,
+                            "cumulative_ms": int(cumulative_us) / 1000, "depth": (len(indent) - 1) // 2})
+    top_level = [e for e in entries if e["depth"] == 0]
+    imported = {e["module"].split(".")[0] for e in entries}
+    return {
+        "module": module,
+        "returncode": proc.returncode,
+        "total_ms": sum(e["cumulative_ms"] for e in top_level),
+        "top": sorted(top_level, key=lambda e: e["cumulative_ms"], reverse=True)[:top],
+        "heavy_imported": {name: name in imported for name in HEAVY_PACKAGES},
+        "stderr_tail": None if proc.returncode == 0 else proc.stderr.strip().splitlines()[-5:],
+    }
+
+
+def startup_time(module):
+    """Tempo até o import do módulo terminar e até o agente (se houver) ficar pronto."""
+    proc = subprocess.run([sys.executable, "-c", STARTUP_SNIPPET.format(module=module)],
+                          cwd=ROOT, env=_env(), capture_output=True, text=True)
+    lines = proc.stdout.strip().splitlines()
+    if proc.returncode != 0 or not lines:
+        return {"error": proc.stderr.strip().splitlines()[-5:] if proc.stderr else "sem saída"}
+    return json.loads(lines[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="agent.routes")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget-ms", type=float, default=None,
+                        help="falha (código 1) se o import do módulo passar deste tempo")
+    parser.add_argument("--output", help="arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    profile = import_profile(args.module, args.top)
+    print(f"import {args.module}: {profile['total_ms']:.0f} ms (-X importtime)")
+    for entry in profile["top"]:
+        print(f"  {entry['cumulative_ms']:>9.1f} ms  {entry['module']}")
+    print("dependências pesadas importadas: " +
+          ", ".join(f"{name}={'sim' if hit else 'não'}" for name, hit in profile["heavy_imported"].items()))
+
+    startup = startup_time(args.module)
+    if startup.get("import_s") is not None:
+        print(f"aceita tráfego após {startup['import_s'] * 1000:.0f} ms")
+    if startup.get("ready_s") is not None:
+        print(f"agente pronto após {startup['ready_s'] * 1000:.0f} ms")
+    if startup.get("error"):
+        print(f"erro na inicialização: {startup['error']}")
+
+    report = {"profile": profile, "startup": startup}
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+
+    if args.budget_ms is not None:
+        accepted_ms = (startup.get("import_s") or float("inf")) * 1000
+        if accepted_ms > args.budget_ms:
+            print(f"ACIMA DO ORÇAMENTO: {accepted_ms:.0f} ms > {args.budget_ms:.0f} ms")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Compara o classificador de intenções atual (models/model.pkl, SVC calibrado) com a engine
+linear (LinearIntentClassifier): acurácia, tempo de treino, latência por mensagem e tempo de
+carga dos artefatos (pickle vs. formato de agent.artifacts).
+
+Uso:
+    python -m benchmarks.intent_classifier [--output resultado.json] [--skip-svc-training]
+"""
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import train_test_split
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from train import build_classifier, load_training_data  # noqa: E402
+from agent.intent_classifier import LinearIntentClassifier  # noqa: E402
+from agent.artifacts import load_artifacts, save_artifacts  # noqa: E402
+
+
+def measure_load_ms(load, repeats=5):
+    """Menor tempo de carga entre `repeats` execuções, em ms (cache do SO já aquecido)."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        load()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def _load_pickles(*paths):
+    for path in paths:
+        with open(path, "rb") as f:
+            pickle.load(f)
+
+
+def measure_latency(model, vectorizer, texts, repeats=1):
+    """Latência de uma predição por mensagem (transform + predict_proba), em ms."""
+    timings = []
+    for _ in range(repeats):
+        for text in texts:
+            start = time.perf_counter()
+            model.predict_proba(vectorizer.transform([text.lower()]))
+            timings.append((time.perf_counter() - start) * 1000)
+    timings = np.asarray(timings)
+    return {
+        "p50_ms": float(np.percentile(timings, 50)),
+        "p95_ms": float(np.percentile(timings, 95)),
+        "p99_ms": float(np.percentile(timings, 99)),
+        "mean_ms": float(timings.mean()),
+    }
+
+
+def evaluate(name, model, vectorizer, texts, labels, latency_sample, train_time=None):
+    predictions = model.predict(vectorizer.transform([t.lower() for t in texts]))
+    result = {
+        "engine": name,
+        "accuracy": float(accuracy_score(labels, predictions)),
+        "macro_f1": float(f1_score(labels, predictions, average="macro", zero_division=0)),
+        "train_time_s": train_time,
+        "latency": measure_latency(model, vectorizer, latency_sample),
+    }
+    print(f"{name:>16}: acc={result['accuracy']:.4f} f1={result['macro_f1']:.4f} "
+          f"train={train_time if train_time is None else round(train_time, 2)}s "
+          f"p99={result['latency']['p99_ms']:.3f}ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    default_data = os.path.join(ROOT, "data", "augmented_knowledge.jsonl")
+    if not os.path.exists(default_data):
+        default_data = os.path.join(ROOT, "data", "augmented_knowledge.json")
+    parser.add_argument("--data", default=default_data)
+    parser.add_argument("--models-dir", default=os.path.join(ROOT, "models"))
+    parser.add_argument("--latency-samples", type=int, default=1000)
+    parser.add_argument("--skip-svc-training", action="store_true",
+                        help="não retreina o SVC (só avalia o model.pkl existente)")
+    parser.add_argument("--output", help="arquivo JSON para gravar os resultados")
+    args = parser.parse_args()
+
+    texts, labels = load_training_data(args.data)
+    if not texts:
+        sys.exit(f"Nenhum dado de treino em {args.data}")
+    X_text_train, X_text_test, y_train, y_test = train_test_split(
+        texts, labels, test_size=0.25, random_state=42, stratify=labels
+    )
+    latency_sample = X_text_test[:args.latency_samples]
+    results = []
+
+    # Modelo atual em produção (vetorizador e classificador já treinados)
+    model_path = os.path.join(args.models_dir, "model.pkl")
+    vectorizer_path = os.path.join(args.models_dir, "vectorizer.pkl")
+    if os.path.exists(model_path) and os.path.exists(vectorizer_path):
+        with open(model_path, "rb") as f:
+            current_model = pickle.load(f)
+        with open(vectorizer_path, "rb") as f:
+            current_vectorizer = pickle.load(f)
+        results.append(evaluate("model.pkl", current_model, current_vectorizer, X_text_test, y_test, latency_sample))
+        results[-1]["load_ms"] = measure_load_ms(lambda: _load_pickles(model_path, vectorizer_path))
+        print(f"{'model.pkl':>16}: carga (pickle) {results[-1]['load_ms']:.2f}ms")
+
+    vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=5000)
+    X_train = vectorizer.fit_transform(X_text_train)
+
+    engines = ["linear"] if args.skip_svc_training else ["svc", "linear"]
+    for engine in engines:
+        clf = build_classifier(engine)
+        start = time.perf_counter()
+        clf.fit(X_train, y_train)
+        train_time = time.perf_counter() - start
+        model = LinearIntentClassifier.from_estimator(clf) if engine == "linear" else clf
+        results.append(evaluate(engine, model, vectorizer, X_text_test, y_test, latency_sample, train_time))
+        if engine == "linear":
+            with tempfile.TemporaryDirectory() as tmp:
+                directory = save_artifacts(os.path.join(tmp, "intent_linear"), model, vectorizer)
+                results[-1]["load_ms"] = measure_load_ms(lambda: load_artifacts(directory))
+            print(f"{engine:>16}: carga (artefatos) {results[-1]['load_ms']:.2f}ms")
+
+    report = {
+        "data": os.path.basename(args.data),
+        "n_train": len(X_text_train),
+        "n_test": len(X_text_test),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Resultados gravados em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
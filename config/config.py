@@ -62,3 +62,100 @@ DEFAULT_LANGUAGE: str = get_env_var("DEFAULT_LANGUAGE", default="pt")
 ENABLE_CACHING: bool = get_env_var("ENABLE_CACHING", default="false", var_type=bool)
 
 CACHE_EXPIRATION: int = get_env_var("CACHE_EXPIRATION", default="3600", var_type=int)
+
+EMBEDDING_MODEL_NAME: str = get_env_var("EMBEDDING_MODEL_NAME", default="paraphrase-MiniLM-L6-v2")
+EMBEDDING_DEVICE: str = get_env_var("EMBEDDING_DEVICE", default="")
+RESPONSE_EMBEDDINGS_PATH: str = get_env_var("RESPONSE_EMBEDDINGS_PATH", default="models/response_embeddings")
+
+SIMILARITY_INDEX_BACKEND: str = get_env_var("SIMILARITY_INDEX_BACKEND", default="exact")
+
+KB_SNAPSHOT_PATH: str = get_env_var("KB_SNAPSHOT_PATH", default="models/kb_snapshot")
+
+# Arquivos que compõem a base de conhecimento do agente (na ordem de mesclagem)
+KNOWLEDGE_FILES = [
+    "data/knowledge_data_large.json",
+    "data/knowledge_data_large1.json",
+    "data/knowledge_data_large2.json",
+    "data/knowledge_data_large3.json",
+    "data/knowledge_data_large4.json",
+    "data/knowledge_data_large5.json",
+    "data/knowledge_data_large6.json",
+    "data/knowledge_data_large7.json",
+    "data/knowledge_data_large8.json",
+    "data/knowledge_data_large9.json",
+    "data/knowledge_data_large10.json",
+    "data/knowledge_data.json",
+]
+
+KB_INCREMENTAL_INDEX: bool = get_env_var("KB_INCREMENTAL_INDEX", default="true", var_type=bool)
+KB_COMPACTION_INTERVAL: int = get_env_var("KB_COMPACTION_INTERVAL", default="300", var_type=int)
+KB_COMPACTION_THRESHOLD: int = get_env_var("KB_COMPACTION_THRESHOLD", default="5000", var_type=int)
+
+INFERENCE_EXECUTOR: str = get_env_var("INFERENCE_EXECUTOR", default="thread")
+INFERENCE_WORKERS: int = get_env_var("INFERENCE_WORKERS", default=str(os.cpu_count() or 1), var_type=int)
+INFERENCE_QUEUE_SIZE: int = get_env_var("INFERENCE_QUEUE_SIZE", default="64", var_type=int)
+INFERENCE_RETRY_AFTER: int = get_env_var("INFERENCE_RETRY_AFTER", default="1", var_type=int)
+
+EMBEDDING_BATCHING: bool = get_env_var("EMBEDDING_BATCHING", default="true", var_type=bool)
+EMBEDDING_BATCH_MAX_SIZE: int = get_env_var("EMBEDDING_BATCH_MAX_SIZE", default="32", var_type=int)
+EMBEDDING_BATCH_MAX_LATENCY_MS: float = get_env_var("EMBEDDING_BATCH_MAX_LATENCY_MS", default="5", var_type=float)
+EMBEDDING_BATCH_TIMEOUT: float = get_env_var("EMBEDDING_BATCH_TIMEOUT", default="10", var_type=float)
+
+MEMORY_SESSION_TTL: int = get_env_var("MEMORY_SESSION_TTL", default="86400", var_type=int)
+MEMORY_MAX_CACHED_SESSIONS: int = get_env_var("MEMORY_MAX_CACHED_SESSIONS", default="1000", var_type=int)
+MEMORY_WRITE_BEHIND: bool = get_env_var("MEMORY_WRITE_BEHIND", default="false", var_type=bool)
+MEMORY_FLUSH_INTERVAL: float = get_env_var("MEMORY_FLUSH_INTERVAL", default="0.5", var_type=float)
+MEMORY_FLUSH_BATCH_SIZE: int = get_env_var("MEMORY_FLUSH_BATCH_SIZE", default="100", var_type=int)
+MEMORY_MAX_BUFFER: int = get_env_var("MEMORY_MAX_BUFFER", default="10000", var_type=int)
+
+REDIS_MAX_CONNECTIONS: int = get_env_var("REDIS_MAX_CONNECTIONS", default="50", var_type=int)
+REDIS_POOL_TIMEOUT: float = get_env_var("REDIS_POOL_TIMEOUT", default="1.0", var_type=float)
+REDIS_SOCKET_TIMEOUT: float = get_env_var("REDIS_SOCKET_TIMEOUT", default="0.5", var_type=float)
+REDIS_CONNECT_TIMEOUT: float = get_env_var("REDIS_CONNECT_TIMEOUT", default="0.5", var_type=float)
+REDIS_HEALTH_CHECK_INTERVAL: int = get_env_var("REDIS_HEALTH_CHECK_INTERVAL", default="30", var_type=int)
+REDIS_CIRCUIT_FAILURES: int = get_env_var("REDIS_CIRCUIT_FAILURES", default="3", var_type=int)
+REDIS_CIRCUIT_RESET_TIMEOUT: float = get_env_var("REDIS_CIRCUIT_RESET_TIMEOUT", default="10", var_type=float)
+MEMORY_LOCAL_MAX_SESSIONS: int = get_env_var("MEMORY_LOCAL_MAX_SESSIONS", default="1000", var_type=int)
+
+RESPONSE_CACHE_SIZE: int = get_env_var("RESPONSE_CACHE_SIZE", default="10000", var_type=int)
+RESPONSE_CACHE_SHARED: bool = get_env_var("RESPONSE_CACHE_SHARED", default="true", var_type=bool)
+
+CHAT_BATCH_MAX_ITEMS: int = get_env_var("CHAT_BATCH_MAX_ITEMS", default="256", var_type=int)
+
+INTENT_ENGINE: str = get_env_var("INTENT_ENGINE", default="svc")
+
+HOT_RELOAD_WATCH: bool = get_env_var("HOT_RELOAD_WATCH", default="false", var_type=bool)
+HOT_RELOAD_INTERVAL: float = get_env_var("HOT_RELOAD_INTERVAL", default="5", var_type=float)
+
+SERVER_HOST: str = get_env_var("SERVER_HOST", default="0.0.0.0")
+SERVER_PORT: int = get_env_var("SERVER_PORT", default="8000", var_type=int)
+SERVER_WORKERS: int = get_env_var("SERVER_WORKERS", default=str(os.cpu_count() or 1), var_type=int)
+SERVER_TORCH_THREADS: int = get_env_var("SERVER_TORCH_THREADS", default="1", var_type=int)
+SERVER_MEMORY_REPORT_INTERVAL: float = get_env_var("SERVER_MEMORY_REPORT_INTERVAL", default="60", var_type=float)
+
+STAGED_STARTUP: bool = get_env_var("STAGED_STARTUP", default="false", var_type=bool)
+STARTUP_WAIT_TIMEOUT: float = get_env_var("STARTUP_WAIT_TIMEOUT", default="30", var_type=float)
+
+METRICS_ENABLED: bool = get_env_var("METRICS_ENABLED", default="true", var_type=bool)
+
+# Cliente da LLM (API no formato OpenAI: POST <LLM_API_URL>/chat/completions). Sem URL, modo placeholder.
+LLM_API_URL: str = get_env_var("LLM_API_URL", default="")
+LLM_API_KEY: str = get_env_var("LLM_API_KEY", default="")
+LLM_MODEL: str = get_env_var("LLM_MODEL", default="gpt-4o-mini")
+LLM_MAX_TOKENS: int = get_env_var("LLM_MAX_TOKENS", default="512", var_type=int)
+LLM_CONTEXT_TURNS: int = get_env_var("LLM_CONTEXT_TURNS", default="10", var_type=int)
+LLM_TIMEOUT: float = get_env_var("LLM_TIMEOUT", default="30", var_type=float)
+LLM_CONNECT_TIMEOUT: float = get_env_var("LLM_CONNECT_TIMEOUT", default="2", var_type=float)
+LLM_MAX_CONCURRENCY: int = get_env_var("LLM_MAX_CONCURRENCY", default="8", var_type=int)
+LLM_MAX_CONNECTIONS: int = get_env_var("LLM_MAX_CONNECTIONS", default="20", var_type=int)
+LLM_MAX_RETRIES: int = get_env_var("LLM_MAX_RETRIES", default="2", var_type=int)
+LLM_RETRY_BASE_DELAY: float = get_env_var("LLM_RETRY_BASE_DELAY", default="0.25", var_type=float)
+
+SEMANTIC_CACHE_ENABLED: bool = get_env_var("SEMANTIC_CACHE_ENABLED", default="false", var_type=bool)
+SEMANTIC_CACHE_THRESHOLD: float = get_env_var("SEMANTIC_CACHE_THRESHOLD", default="0.92", var_type=float)
+SEMANTIC_CACHE_TTL: int = get_env_var("SEMANTIC_CACHE_TTL", default="86400", var_type=int)
+SEMANTIC_CACHE_MAX_ENTRIES: int = get_env_var("SEMANTIC_CACHE_MAX_ENTRIES", default="10000", var_type=int)
+SEMANTIC_CACHE_SHARED: bool = get_env_var("SEMANTIC_CACHE_SHARED", default="true", var_type=bool)
+SEMANTIC_CACHE_SYNC_INTERVAL: float = get_env_var("SEMANTIC_CACHE_SYNC_INTERVAL", default="5", var_type=float)
+# "history": entradas separadas pelo histórico enviado à LLM; "ignore": só a mensagem conta
+SEMANTIC_CACHE_CONTEXT: str = get_env_var("SEMANTIC_CACHE_CONTEXT", default="history")
@@ -0,0 +1,154 @@
+"""
+Servidor local que imita uma API de chat no formato OpenAI, para testar o LLMAPI sem um
+provedor real. Só usa a biblioteca padrão.
+
+- POST /v1/chat/completions: resposta completa ou, com "stream": true, Server-Sent Events
+  (`data: {"choices": [{"delta": {"content": ...}}]}` ... `data: [DONE]`);
+- GET /v1/models: lista com o modelo fictício.
+
+A latência até o primeiro token, o intervalo entre tokens e falhas (HTTP 429/503, para
+exercitar as novas tentativas: uma taxa aleatória ou as N primeiras requisições) são
+configuráveis.
+
+Uso:
+    python scripts/llm_stub_server.py [--port 8081] [--first-token-ms 200] [--token-ms 20] [--error-rate 0.1]
+                                      [--fail-first 2]
+    LLM_API_URL=http://127.0.0.1:8081/v1 uvicorn agent.routes:app
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+MODEL = "jarvis-stub"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive: o cliente reaproveita as conexões do pool
+    options = None
+
+    def log_message(self, format, *args):
+        if self.options.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/v1/models":
+            self._send_json(200, {"object": "list", "data": [{"id": MODEL, "object": "model"}]})
+        else:
+            self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self._send_json(400, {"error": {"message": "invalid json"}})
+            return
+        if self.path.rstrip("/") != "/v1/chat/completions":
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+        if self.should_fail():
+            status = random.choice([429, 503])
+            self._send_json(status, {"error": {"message": "falha simulada"}}, {"Retry-After": "0"})
+            return
+
+        prompt = next((m["content"] for m in reversed(request.get("messages", [])) if m.get("role") == "user"), "")
+        tokens = self.answer(prompt, request.get("max_tokens") or 512)
+        time.sleep(self.options.first_token_ms / 1000)
+        if request.get("stream"):
+            self.stream(tokens, request.get("model", MODEL))
+        else:
+            time.sleep(self.options.token_ms * max(0, len(tokens) - 1) / 1000)
+            self._send_json(200, {
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "model": request.get("model", MODEL),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": "stop"}],
+            })
+
+    def should_fail(self):
+        with self.server.lock:
+            self.server.requests += 1
+            if self.server.failures_left > 0:
+                self.server.failures_left -= 1
+                return True
+        return random.random() < self.options.error_rate
+
+    def answer(self, prompt, max_tokens):
+        words = f"Resposta simulada para: {prompt}. " + " ".join(["lorem"] * self.options.extra_words)
+        tokens = [w + " " for w in words.split()]
+        return tokens[:max_tokens]
+
+    def stream(self, tokens, model):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        try:
+            for i, token in enumerate(tokens):
+                if i:
+                    time.sleep(self.options.token_ms / 1000)
+                chunk = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                         "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]}
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # cliente cancelou a geração
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--first-token-ms", type=float, default=200, help="latência até o primeiro token")
+    parser.add_argument("--token-ms", type=float, default=20, help="intervalo entre tokens")
+    parser.add_argument("--extra-words", type=int, default=20, help="palavras adicionadas a cada resposta")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fração de requisições com 429/503")
+    parser.add_argument("--fail-first", type=int, default=0, help="as N primeiras requisições falham com 429/503")
+    parser.add_argument("--verbose", action="store_true")
+    return parser
+
+
+def make_server(options):
+    """Cria o servidor (ainda parado) com as opções de `build_parser`; porta 0 escolhe uma livre."""
+    handler = type("BoundStubHandler", (StubHandler,), {"options": options})
+    server = ThreadingHTTPServer((options.host, options.port), handler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.failures_left = options.fail_first
+    server.requests = 0
+    return server
+
+
+def main():
+    options = build_parser().parse_args()
+    server = make_server(options)
+    print(f"Stub da LLM em http://{options.host}:{server.server_address[1]}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,96 +1,181 @@
 # src/augment_data.py
 
+import argparse
 import json
 import os
 import random
 import glob
+import threading
+import time
+from multiprocessing import Pool
 from sinonimos import synonyms
 
 # Palavras de parada comuns em português
 STOP_WORDS = set([
-    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na', 
+    'a', 'o', 'as', 'os', 'um', 'uma', 'de', 'da', 'do', 'das', 'dos', 'em', 'no', 'na',
     'nos', 'nas', 'por', 'para', 'com', 'sem', 'sob', 'sobre', 'se', 'ser', 'sendo',
     'ter', 'tem', 'tendo', 'que', 'qual', 'quem', 'como', 'onde', 'quando', 'porque',
     'eu', 'você', 'ele', 'ela', 'nós', 'vocês', 'eles', 'elas', 'me', 'te', 'lhe'
 ])
 
+# Tabela de sinônimos pré-calculada, compartilhada com os workers (herdada via fork/initializer)
+_SYNONYM_TABLE = {}
+
+
+def _init_worker(table):
+    global _SYNONYM_TABLE
+    _SYNONYM_TABLE = table
+
+
+def lookup_synonyms(word):
+    """Consulta a tabela pré-calculada; palavras fora dela caem na busca direta."""
+    key = word.lower()
+    if key in _SYNONYM_TABLE:
+        return _SYNONYM_TABLE[key]
+    return synonyms(word)
+
+
 def synonym_replacement(sentence, n=1):
     """Substitui 'n' palavras na frase por seus sinônimos."""
     words = sentence.split()
     new_words = words.copy()
-    
-    # Encontra palavras que não são de parada e que têm sinônimos
-    replaceable_words_indices = [i for i, word in enumerate(words) if word.lower() not in STOP_WORDS and synonyms(word)]
-    
-    if not replaceable_words_indices:
+
+    # Encontra palavras que não são de parada e que têm sinônimos (uma única consulta por palavra)
+    candidates = {}
+    for i, word in enumerate(words):
+        if word.lower() not in STOP_WORDS:
+            syns = lookup_synonyms(word)
+            if syns:
+                candidates[i] = syns
+
+    if not candidates:
         return None
 
     # Escolhe 'n' palavras aleatórias para substituir
-    words_to_replace_indices = random.sample(replaceable_words_indices, min(n, len(replaceable_words_indices)))
-    
+    words_to_replace_indices = random.sample(list(candidates), min(n, len(candidates)))
+
     for index in words_to_replace_indices:
-        word_to_replace = words[index]
-        syns = synonyms(word_to_replace)
-        if syns:
-            synonym = random.choice(syns)
-            new_words[index] = synonym
-            
+        new_words[index] = random.choice(candidates[index])
+
     return ' '.join(new_words)
 
-def augment_data(input_dir, output_file, augment_factor=2):
+
+def iter_intent_chunks(json_files, chunk_size=500):
+    """
+    Lê os arquivos um de cada vez e gera blocos (intenção, padrões) de até `chunk_size` padrões.
+    Aceita JSON no formato da base ({"content": {"intencoes": ...}}) e JSON Lines
+    ({"intencao": ..., "padroes": [...]} por linha), este último lido em streaming.
+    """
+    for file_path in json_files:
+        if file_path.endswith('.jsonl'):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        patterns = record.get("padroes", [])
+                        for start in range(0, len(patterns), chunk_size):
+                            yield record["intencao"], patterns[start:start + chunk_size]
+            continue
+        with open(file_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        intents = data.get("content", {}).get("intencoes", {})
+        for intent, details in intents.items():
+            patterns = details.get("padroes", [])
+            for start in range(0, len(patterns), chunk_size):
+                yield intent, patterns[start:start + chunk_size]
+
+
+def _lookup_word(word):
+    return word, synonyms(word)
+
+
+def build_synonym_table(json_files, pool, chunk_size=500):
+    """Primeira passada: coleta o vocabulário do corpus e busca os sinônimos em paralelo."""
+    vocabulary = set()
+    for _, patterns in iter_intent_chunks(json_files, chunk_size):
+        for pattern in patterns:
+            vocabulary.update(w.lower() for w in pattern.split() if w.lower() not in STOP_WORDS)
+    # Palavras sem sinônimos também entram (lista vazia) para não repetir a busca nos workers
+    return dict(pool.imap_unordered(_lookup_word, sorted(vocabulary), chunksize=256))
+
+
+def augment_chunk(task):
+    """Gera as variações de um bloco de padrões (executado nos workers)."""
+    intent, patterns, augment_factor = task
+    new_patterns = set(patterns)  # Usa um set para evitar duplicatas
+    for pattern in patterns:
+        # Gera novas frases a partir do padrão original
+        for _ in range(augment_factor):
+            new_sentence = synonym_replacement(pattern, n=1)  # Troca 1 palavra
+            if new_sentence and new_sentence != pattern:
+                new_patterns.add(new_sentence)
+    return intent, len(patterns), sorted(new_patterns)
+
+
+def augment_data(input_dir, output_file, augment_factor=2, workers=None, chunk_size=500, max_pending=None):
     """
-    Lê todos os JSONs de um diretório, aumenta os dados e salva em um único arquivo.
-    
+    Lê todos os JSONs de um diretório, aumenta os dados em paralelo e grava o resultado
+    incrementalmente em JSON Lines (uma linha {"intencao", "padroes"} por bloco).
+
     Args:
         input_dir (str): Diretório contendo os arquivos JSON originais.
-        output_file (str): Arquivo JSON de saída com os dados aumentados.
+        output_file (str): Arquivo JSON Lines de saída com os dados aumentados.
         augment_factor (int): Quantas novas frases gerar para cada frase original.
+        workers (int|None): processos de trabalho (padrão: todos os núcleos).
+        chunk_size (int): padrões por bloco enviado a um worker.
+        max_pending (int|None): blocos em processamento/aguardando escrita; limita a memória.
     """
-    json_files = glob.glob(os.path.join(input_dir, '*.json'))
+    output_path = os.path.abspath(output_file)
+    json_files = sorted(
+        p for p in glob.glob(os.path.join(input_dir, '*.json')) + glob.glob(os.path.join(input_dir, '*.jsonl'))
+        if os.path.abspath(p) != output_path and not os.path.basename(p).startswith('augmented_')
+    )
     if not json_files:
         print(f"Nenhum arquivo JSON encontrado em '{input_dir}'")
         return
 
-    augmented_data = {"content": {"intencoes": {}}}
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    start = time.time()
 
-    for file_path in json_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        intents = data.get("content", {}).get("intencoes", {})
-        for intent, details in intents.items():
-            patterns = details.get("padroes", [])
-            
-            # Garante que a intenção exista no novo JSON
-            if intent not in augmented_data["content"]["intencoes"]:
-                augmented_data["content"]["intencoes"][intent] = {"padroes": []}
-            
-            new_patterns = set(patterns) # Usa um set para evitar duplicatas
-
-            # Adiciona os padrões originais
-            for pattern in patterns:
-                new_patterns.add(pattern)
-                
-                # Gera novas frases a partir do padrão original
-                for _ in range(augment_factor):
-                    new_sentence = synonym_replacement(pattern, n=1) # Troca 1 palavra
-                    if new_sentence and new_sentence != pattern:
-                        new_patterns.add(new_sentence)
-
-            augmented_data["content"]["intencoes"][intent]["padroes"].extend(list(new_patterns))
-
-    # Salva o arquivo JSON aumentado
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(augmented_data, f, ensure_ascii=False, indent=2)
-        
-    print(f"Dados aumentados e salvos em '{output_file}'")
+    with Pool(processes=workers) as pool:
+        table = build_synonym_table(json_files, pool, chunk_size)
+    print(f"Tabela de sinônimos com {len(table)} palavras calculada em {time.time() - start:.1f}s")
+
+    # O semáforo limita quantos blocos o alimentador do pool lê à frente da escrita
+    slots = threading.Semaphore(max_pending)
+
+    def bounded_tasks():
+        for intent, patterns in iter_intent_chunks(json_files, chunk_size):
+            slots.acquire()
+            yield intent, patterns, augment_factor
+
+    total_in, total_out = 0, 0
+    with Pool(processes=workers, initializer=_init_worker, initargs=(table,)) as pool, \
+            open(output_file, 'w', encoding='utf-8') as out:
+        for intent, n_in, new_patterns in pool.imap(augment_chunk, bounded_tasks()):
+            slots.release()
+            out.write(json.dumps({"intencao": intent, "padroes": new_patterns}, ensure_ascii=False) + "\n")
+            total_in += n_in
+            total_out += len(new_patterns)
+
+    elapsed = time.time() - start
+    print(f"Dados aumentados e salvos em '{output_file}': {total_in} padrões -> {total_out} "
+          f"em {elapsed:.1f}s ({total_in / max(elapsed, 1e-9):.0f} padrões/s)")
 
 if __name__ == "__main__":
     script_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(script_dir, '..', 'data')
-    
+
+    parser = argparse.ArgumentParser(description="Aumenta os dados de treino com sinônimos (paralelo, streaming).")
+    parser.add_argument("--input-dir", default=data_dir)
     # Define o arquivo de saída para os dados aumentados
-    augmented_file_path = os.path.join(data_dir, 'augmented_knowledge.json')
-    
+    parser.add_argument("--output", default=os.path.join(data_dir, 'augmented_knowledge.jsonl'))
+    parser.add_argument("--factor", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    args = parser.parse_args()
+
     # Executa o aumento de dados
-    augment_data(input_dir=data_dir, output_file=augmented_file_path, augment_factor=3)
\ No newline at end of file
+    augment_data(input_dir=args.input_dir, output_file=args.output, augment_factor=args.factor,
+                 workers=args.workers, chunk_size=args.chunk_size)
@@ -0,0 +1,217 @@
+"""
+Busca de hiperparâmetros do classificador de intenções com validação cruzada estratificada.
+
+Cada tarefa paralela ajusta um TfidfVectorizer por (configuração do vetorizador, fold) e o
+reaproveita em todos os classificadores daquela configuração. Para cada ensaio são medidos
+macro-F1, acurácia, tempo de treino e latência de inferência por mensagem. Os resultados
+vão para um arquivo JSON Lines, para escolher o modelo pelo compromisso latência/acurácia.
+
+Uso:
+    python src/hyperparam_search.py [--folds 5] [--n-iter 10] [--n-jobs -1] [--output logs/hyperparam_search.jsonl]
+    python src/train.py --search [--max-latency-ms 2]
+"""
+import argparse
+import itertools
+import json
+import logging
+import os
+import random
+import time
+
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.metrics import accuracy_score, f1_score
+from sklearn.model_selection import StratifiedKFold
+
+from train import build_classifier, load_augmented_data
+from agent.intent_classifier import LinearIntentClassifier
+
+# Espaço de busca: configurações do vetorizador x classificadores (engine, hiperparâmetros)
+VECTORIZER_GRID = {
+    "ngram_range": [(1, 1), (1, 2)],
+    "max_features": [2000, 5000, 20000],
+    "sublinear_tf": [False, True],
+}
+CLASSIFIER_GRID = [
+    ("linear", {"C": 1.0}),
+    ("linear", {"C": 10.0}),
+    ("linear", {"C": 30.0}),
+    ("svc", {"C": 1.0}),
+]
+
+
+def expand_grid(grid):
+    """Produto cartesiano de um dicionário parâmetro -> valores."""
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def trial_name(engine, vectorizer_params, classifier_params):
+    vec = ",".join(f"{k}={v}" for k, v in sorted(vectorizer_params.items()))
+    clf = ",".join(f"{k}={v}" for k, v in sorted(classifier_params.items()))
+    return f"{engine}[{clf}]|tfidf[{vec}]"
+
+
+def _latency_ms(model, vectorizer, texts):
+    """Latência de uma predição por mensagem (transform + predict_proba), como no NLPProcessor."""
+    timings = np.empty(len(texts))
+    for i, text in enumerate(texts):
+        start = time.perf_counter()
+        model.predict_proba(vectorizer.transform([text]))
+        timings[i] = (time.perf_counter() - start) * 1000
+    return timings
+
+
+def run_fold(texts, labels, train_idx, test_idx, vectorizer_params, classifiers, fold, latency_samples):
+    """
+    Ajusta o vetorizador uma vez para o fold e avalia todos os classificadores sobre ele.
+
+    Returns:
+        list[dict]: um registro por ensaio (classificador) neste fold.
+    """
+    vectorizer = TfidfVectorizer(**vectorizer_params)
+    start = time.perf_counter()
+    X_train = vectorizer.fit_transform([texts[i] for i in train_idx])
+    vectorizer_time = time.perf_counter() - start
+    X_test = vectorizer.transform([texts[i] for i in test_idx])
+    y_train = [labels[i] for i in train_idx]
+    y_test = [labels[i] for i in test_idx]
+    latency_texts = [texts[i] for i in test_idx[:latency_samples]]
+
+    records = []
+    for engine, classifier_params in classifiers:
+        clf = build_classifier(engine, **classifier_params)
+        start = time.perf_counter()
+        clf.fit(X_train, y_train)
+        train_time = time.perf_counter() - start
+        # Mede a latência no formato usado em produção pela engine
+        model = LinearIntentClassifier.from_estimator(clf) if engine == "linear" else clf
+        predictions = model.predict(X_test)
+        latency = _latency_ms(model, vectorizer, latency_texts)
+        records.append({
+            "trial": trial_name(engine, vectorizer_params, classifier_params),
+            "engine": engine,
+            "vectorizer_params": vectorizer_params,
+            "classifier_params": classifier_params,
+            "fold": fold,
+            "macro_f1": float(f1_score(y_test, predictions, average="macro", zero_division=0)),
+            "accuracy": float(accuracy_score(y_test, predictions)),
+            "train_time_s": train_time,
+            "vectorizer_time_s": vectorizer_time,
+            "latency_p50_ms": float(np.percentile(latency, 50)),
+            "latency_p95_ms": float(np.percentile(latency, 95)),
+        })
+    return records
+
+
+def summarize(records):
+    """Agrega os registros por ensaio (média e desvio entre folds) e marca a fronteira de Pareto."""
+    by_trial = {}
+    for record in records:
+        by_trial.setdefault(record["trial"], []).append(record)
+
+    summaries = []
+    for trial, rows in by_trial.items():
+        f1 = np.array([r["macro_f1"] for r in rows])
+        summaries.append({
+            "trial": trial,
+            "engine": rows[0]["engine"],
+            "vectorizer_params": rows[0]["vectorizer_params"],
+            "classifier_params": rows[0]["classifier_params"],
+            "folds": len(rows),
+            "macro_f1": float(f1.mean()),
+            "macro_f1_std": float(f1.std()),
+            "accuracy": float(np.mean([r["accuracy"] for r in rows])),
+            "train_time_s": float(np.mean([r["train_time_s"] + r["vectorizer_time_s"] for r in rows])),
+            "latency_p50_ms": float(np.mean([r["latency_p50_ms"] for r in rows])),
+            "latency_p95_ms": float(np.mean([r["latency_p95_ms"] for r in rows])),
+        })
+
+    # Um ensaio está na fronteira se nenhum outro é ao mesmo tempo mais preciso e mais rápido
+    for s in summaries:
+        s["pareto"] = not any(
+            o["macro_f1"] >= s["macro_f1"] and o["latency_p95_ms"] <= s["latency_p95_ms"]
+            and (o["macro_f1"] > s["macro_f1"] or o["latency_p95_ms"] < s["latency_p95_ms"])
+            for o in summaries
+        )
+    summaries.sort(key=lambda s: (-s["macro_f1"], s["latency_p95_ms"]))
+    return summaries
+
+
+def select_best(summaries, max_latency_ms=None):
+    """Melhor macro-F1 entre os ensaios com latência p95 dentro do limite (None se nenhum atender)."""
+    eligible = [s for s in summaries if max_latency_ms is None or s["latency_p95_ms"] <= max_latency_ms]
+    return eligible[0] if eligible else None
+
+
+def run_search(texts, labels, n_splits=5, n_iter=None, n_jobs=-1, results_path=None,
+               vectorizer_grid=None, classifier_grid=None, latency_samples=200, seed=42):
+    """
+    Executa a busca e grava os resultados em `results_path` (JSON Lines).
+
+    Args:
+        texts, labels: dados de treino.
+        n_splits (int): folds da validação cruzada estratificada.
+        n_iter (int|None): amostra aleatoriamente N combinações; None avalia a grade completa.
+        n_jobs (int): processos do joblib (-1 = todos os núcleos).
+        results_path (str|None): arquivo de saída; cada linha é um ensaio em um fold
+            ("type": "fold") ou o resumo de um ensaio ("type": "summary").
+
+    Returns:
+        list[dict]: resumos ordenados por macro-F1 (desc) e latência p95.
+    """
+    vectorizer_configs = expand_grid(vectorizer_grid or VECTORIZER_GRID)
+    classifiers = classifier_grid or CLASSIFIER_GRID
+    combos = [(v, c) for v in range(len(vectorizer_configs)) for c in range(len(classifiers))]
+    if n_iter is not None and n_iter < len(combos):
+        combos = random.Random(seed).sample(combos, n_iter)
+
+    # Agrupa os classificadores por configuração de vetorizador: um ajuste do TF-IDF por (config, fold)
+    grouped = {}
+    for v, c in combos:
+        grouped.setdefault(v, []).append(classifiers[c])
+
+    folds = list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(texts, labels))
+    logging.info(f"Busca: {len(combos)} ensaios x {n_splits} folds ({len(grouped) * n_splits} ajustes de vetorizador).")
+
+    start = time.perf_counter()
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(run_fold)(texts, labels, train_idx, test_idx, vectorizer_configs[v], grouped[v], fold, latency_samples)
+        for v in grouped for fold, (train_idx, test_idx) in enumerate(folds)
+    )
+    records = [record for fold_records in results for record in fold_records]
+    summaries = summarize(records)
+    logging.info(f"Busca concluída em {time.perf_counter() - start:.1f}s.")
+
+    if results_path:
+        os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+        with open(results_path, "w", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps({"type": "fold", **record}) + "\n")
+            for summary in summaries:
+                f.write(json.dumps({"type": "summary", **summary}) + "\n")
+        logging.info(f"Resultados gravados em '{results_path}'.")
+
+    print(f"\n{'macro-F1':>9} {'±':>6} {'p95 ms':>8} {'treino s':>9}  ensaio")
+    for s in summaries:
+        marker = "*" if s["pareto"] else " "
+        print(f"{s['macro_f1']:>9.4f} {s['macro_f1_std']:>6.3f} {s['latency_p95_ms']:>8.3f} "
+              f"{s['train_time_s']:>9.2f} {marker}{s['trial']}")
+    print("(* = fronteira de Pareto latência/acurácia)\n")
+    return summaries
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, default=None)
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--output", default=os.path.join(script_dir, '..', 'logs', 'hyperparam_search.jsonl'))
+    args = parser.parse_args()
+
+    texts, labels = load_augmented_data(os.path.join(script_dir, '..', 'data'))
+    if texts:
+        run_search(texts, labels, n_splits=args.folds, n_iter=args.n_iter, n_jobs=args.n_jobs,
+                   results_path=args.output)
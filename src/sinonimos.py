@@ -1,45 +1,145 @@
 # src/sinonimos.py
 
-from nltk.corpus import wordnet
-import nltk
+import argparse
 import logging
+import os
+import threading
+import time
 
 # Configuração básica de logging para feedback ao usuário
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Baixe o WordNet se ainda não tiver feito.
-# Isso precisa ser feito apenas uma vez.
-try:
-    wordnet.ensure_loaded()
-except LookupError:
-    logging.info("Recursos do WordNet não encontrados. Baixando...")
-    nltk.download('wordnet', quiet=True)
-    logging.info("Download do WordNet concluído.")
+# Léxico pré-calculado (uma linha "palavra<TAB>sinônimo1|sinônimo2|..." por palavra, ordenado)
+LEXICON_PATH = os.environ.get(
+    "SINONIMOS_LEXICON",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models', 'sinonimos_por.tsv'),
+)
+
+_lexicon = None
+_lexicon_lock = threading.Lock()
+_wordnet = None
+
+
+def _load_wordnet():
+    """Importa o WordNet sob demanda (baixando-o se necessário). Só usado no build ou sem léxico."""
+    global _wordnet
+    if _wordnet is None:
+        import nltk
+        from nltk.corpus import wordnet
+
+        # Baixe o WordNet se ainda não tiver feito.
+        # Isso precisa ser feito apenas uma vez.
+        try:
+            wordnet.ensure_loaded()
+        except LookupError:
+            logging.info("Recursos do WordNet não encontrados. Baixando...")
+            nltk.download('wordnet', quiet=True)
+            nltk.download('omw-1.4', quiet=True)
+            logging.info("Download do WordNet concluído.")
+        _wordnet = wordnet
+    return _wordnet
+
+
+def load_lexicon(path=LEXICON_PATH):
+    """
+    Carrega o léxico TSV em um dicionário palavra -> sinônimos.
+
+    Returns:
+        dict|None: o léxico, ou None se o arquivo não existir.
+    """
+    if not os.path.exists(path):
+        return None
+    lexicon = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            word, _, syns = line.rstrip('\n').partition('\t')
+            if word:
+                lexicon[word] = syns.split('|') if syns else []
+    return lexicon
+
+
+def _get_lexicon():
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                lexicon = load_lexicon()
+                if lexicon is None:
+                    logging.warning(f"Léxico de sinônimos '{LEXICON_PATH}' não encontrado; usando o WordNet "
+                                    f"(lento). Gere-o com 'python src/sinonimos.py --build'.")
+                    lexicon = {}
+                _lexicon = lexicon
+    return _lexicon
+
+
+def _wordnet_synonyms(word, lang='por'):
+    syns = set()
+    for synset in _load_wordnet().synsets(word.lower(), lang=lang):
+        for lema in synset.lemmas(lang=lang):
+            # Adiciona o sinônimo, substituindo underscores por espaços
+            syns.add(lema.name().replace('_', ' '))
+    return list(syns)
+
 
 def synonyms(word, lang='por'):
     """
     Retorna uma lista de sinônimos para a palavra dada.
 
+    Em português a consulta é feita no léxico pré-calculado (sem importar o NLTK); o WordNet
+    só é usado para outros idiomas ou quando o léxico ainda não foi gerado.
+
     Args:
         word (str): A palavra para a qual buscar sinônimos.
         lang (str): O idioma (por padrão, 'por' para português).
-    
+
     Returns:
-        list: Uma lista de sinônimos únicos em minúsculas.
+        list: Uma lista de sinônimos únicos.
     """
-    syns = set()
-    for synset in wordnet.synsets(word.lower(), lang=lang):
+    if lang == 'por':
+        lexicon = _get_lexicon()
+        if lexicon:
+            return list(lexicon.get(word.lower(), ()))
+    return _wordnet_synonyms(word, lang)
+
+
+def build_lexicon(path=LEXICON_PATH, lang='por'):
+    """
+    Extrai do WordNet o grafo de lemas do idioma e grava o léxico TSV ordenado.
+    A saída equivale a chamar `synonyms` com o WordNet para cada lema do idioma.
+    """
+    wordnet = _load_wordnet()
+    start = time.time()
+    graph = {}
+    for synset in wordnet.all_synsets():
+        names = [lema.name().replace('_', ' ') for lema in synset.lemmas(lang=lang)]
         for lema in synset.lemmas(lang=lang):
-            # Adiciona o sinônimo, substituindo underscores por espaços
-            syns.add(lema.name().replace('_', ' '))
-    return list(syns)
+            graph.setdefault(lema.name().lower(), set()).update(names)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for word in sorted(graph):
+            # '|' e tabulações não aparecem nos lemas do WordNet; filtra por garantia
+            syns = sorted(s for s in graph[word] if '|' not in s and '\t' not in s)
+            f.write(f"{word}\t{'|'.join(syns)}\n")
+    os.replace(tmp_path, path)
+    logging.info(f"Léxico com {len(graph)} palavras gravado em '{path}' em {time.time() - start:.1f}s.")
+
 
 # Exemplo de uso
 if __name__ == '__main__':
-    palavra = "casa"
-    lista_sinonimos = synonyms(palavra)
-    print(f"Sinônimos para '{palavra}': {lista_sinonimos}")
+    parser = argparse.ArgumentParser(description="Sinônimos em português (léxico pré-calculado do WordNet).")
+    parser.add_argument("--build", action="store_true", help="gera o léxico a partir do WordNet/OMW")
+    parser.add_argument("--output", default=LEXICON_PATH)
+    args = parser.parse_args()
+
+    if args.build:
+        build_lexicon(args.output)
+    else:
+        palavra = "casa"
+        lista_sinonimos = synonyms(palavra)
+        print(f"Sinônimos para '{palavra}': {lista_sinonimos}")
 
-    palavra2 = "triste"
-    lista_sinonimos2 = synonyms(palavra2)
-    print(f"Sinônimos para '{palavra2}': {lista_sinonimos2}")
\ No newline at end of file
+        palavra2 = "triste"
+        lista_sinonimos2 = synonyms(palavra2)
+        print(f"Sinônimos para '{palavra2}': {lista_sinonimos2}")
@@ -0,0 +1,220 @@
+"""
+Treino out-of-core do classificador de intenções para corpora maiores que a memória.
+
+Os exemplos são lidos em streaming (JSON Lines linha a linha, ou o JSON da base via `ijson`
+quando instalado), embaralhados em um buffer de tamanho fixo, vetorizados com um
+HashingVectorizer (sem vocabulário a manter) e usados em `SGDClassifier.partial_fit`, bloco
+a bloco. A memória fica limitada pelo buffer, pelo bloco e pela amostra de validação,
+independente do tamanho do corpus.
+
+O resultado só é gravado para a engine linear (models/intent_linear/, INTENT_ENGINE=linear):
+o SGD não é o SVC que a engine padrão espera em model.pkl. A confiança da engine linear é o
+softmax das pontuações do SGD, e não as probabilidades calibradas do SVC; o limiar fixo de
+AgentCore.detect_intent (0.6) passa a cortar em outro ponto. A validação registra quantos
+exemplos ficam acima dele (`coverage_at_threshold`) e a acurácia desses exemplos, para
+conferir o efeito antes de publicar o modelo.
+
+Uso:
+    python src/stream_train.py [--data data/augmented_knowledge.jsonl] [--epochs 3]
+    python src/train.py --stream
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import time
+import zlib
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+import numpy as np
+from sklearn.metrics import accuracy_score, f1_score
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from agent.intent_classifier import LinearIntentClassifier
+from agent.artifacts import save_artifacts
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+HASHING_PARAMS = {"ngram_range": (1, 2), "n_features": 2 ** 18, "alternate_sign": False, "norm": "l2"}
+# Limiar de confiança usado por AgentCore.detect_intent
+INTENT_CONFIDENCE_THRESHOLD = 0.6
+
+
+def iter_training_rows(file_path):
+    """
+    Gera pares (texto, intenção) sem carregar o arquivo inteiro.
+    - .jsonl: uma linha {"intencao": ..., "padroes": [...]} por vez.
+    - .json: com `ijson`, uma intenção por vez de content.intencoes; sem ele, cai no json.load.
+    """
+    if file_path.endswith('.jsonl'):
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    for pattern in record.get("padroes", []):
+                        yield pattern.lower(), record["intencao"]
+        return
+
+    try:
+        import ijson
+    except ImportError:
+        logging.warning("'ijson' não instalado: o JSON será carregado inteiro. Use JSON Lines ou 'pip install ijson'.")
+        with open(file_path, 'r', encoding='utf-8') as f:
+            intents = json.load(f).get("content", {}).get("intencoes", {}).items()
+            for intent, details in intents:
+                for pattern in details.get("padroes", []):
+                    yield pattern.lower(), intent
+        return
+
+    with open(file_path, 'rb') as f:
+        for intent, details in ijson.kvitems(f, 'content.intencoes'):
+            for pattern in details.get("padroes", []):
+                yield pattern.lower(), intent
+
+
+def shuffle_buffer(rows, size, seed=42):
+    """Embaralhamento aproximado com memória fixa: mantém `size` linhas e emite uma aleatória a cada entrada."""
+    rng = random.Random(seed)
+    buffer = []
+    for row in rows:
+        if len(buffer) < size:
+            buffer.append(row)
+            continue
+        i = rng.randrange(size)
+        yield buffer[i]
+        buffer[i] = row
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def iter_batches(rows, batch_size):
+    texts, labels = [], []
+    for text, label in rows:
+        texts.append(text)
+        labels.append(label)
+        if len(texts) >= batch_size:
+            yield texts, labels
+            texts, labels = [], []
+    if texts:
+        yield texts, labels
+
+
+def is_holdout(text, holdout_ratio):
+    """Separação determinística por hash do texto: o mesmo exemplo cai sempre do mesmo lado."""
+    return holdout_ratio > 0 and zlib.crc32(text.encode('utf-8')) % 1000 < holdout_ratio * 1000
+
+
+def _split_holdout(rows, holdout_ratio, holdout_texts=None, holdout_labels=None, max_holdout=0):
+    """Filtra os exemplos de validação, guardando até `max_holdout` deles nas listas dadas."""
+    for text, label in rows:
+        if is_holdout(text, holdout_ratio):
+            if holdout_texts is not None and len(holdout_texts) < max_holdout:
+                holdout_texts.append(text)
+                holdout_labels.append(label)
+        else:
+            yield text, label
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    except ImportError:
+        return float('nan')
+
+
+def stream_train(file_path, models_dir, engine="linear", epochs=3, batch_size=2000, buffer_size=50000,
+                 holdout_ratio=0.05, max_holdout=20000, alpha=1e-5, report_every=10.0):
+    """
+    Treina o classificador em streaming e salva o vetorizador + o modelo da engine.
+
+    Args:
+        file_path (str): corpus aumentado (.jsonl ou .json).
+        models_dir (str): diretório de saída dos modelos.
+        engine (str): só "linear" (models/intent_linear/, agent.artifacts, sem pickle).
+        epochs (int): passadas sobre o corpus.
+        batch_size (int): exemplos por `partial_fit`.
+        buffer_size (int): tamanho do buffer de embaralhamento.
+        holdout_ratio (float): fração dos exemplos reservada para validação (por hash do texto).
+        max_holdout (int): teto de exemplos de validação mantidos em memória.
+        alpha (float): regularização do SGD.
+        report_every (float): intervalo, em segundos, dos relatórios de progresso.
+    """
+    if engine != "linear":
+        raise ValueError(f"O treino em streaming só gera a engine linear (recebido: '{engine}').")
+    # Primeira passada: partial_fit precisa conhecer todas as classes de antemão
+    start = time.perf_counter()
+    classes = sorted({label for _, label in iter_training_rows(file_path)})
+    if not classes:
+        logging.error(f"Nenhum exemplo encontrado em '{file_path}'.")
+        return None
+    logging.info(f"{len(classes)} intenções encontradas em {time.perf_counter() - start:.1f}s.")
+
+    vectorizer = HashingVectorizer(**HASHING_PARAMS)
+    clf = SGDClassifier(loss="log_loss", alpha=alpha, random_state=42)
+    holdout_texts, holdout_labels = [], []
+
+    total_rows = 0
+    start = time.perf_counter()
+    last_report = start
+    for epoch in range(epochs):
+        # A validação é coletada na primeira passada, sem reler o arquivo
+        collect = epoch == 0
+        rows = _split_holdout(iter_training_rows(file_path), holdout_ratio,
+                              holdout_texts if collect else None, holdout_labels if collect else None, max_holdout)
+        for texts, labels in iter_batches(shuffle_buffer(rows, buffer_size, seed=42 + epoch), batch_size):
+            clf.partial_fit(vectorizer.transform(texts), labels, classes=classes)
+            total_rows += len(texts)
+            now = time.perf_counter()
+            if now - last_report >= report_every:
+                logging.info(f"época {epoch + 1}/{epochs}: {total_rows} exemplos, "
+                             f"{total_rows / (now - start):.0f} exemplos/s, RSS máx {_peak_rss_mb():.0f} MB")
+                last_report = now
+
+    elapsed = time.perf_counter() - start
+    logging.info(f"Treino concluído: {total_rows} exemplos em {elapsed:.1f}s "
+                 f"({total_rows / max(elapsed, 1e-9):.0f} exemplos/s), RSS máx {_peak_rss_mb():.0f} MB.")
+
+    metrics = {"rows": total_rows, "rows_per_s": total_rows / max(elapsed, 1e-9), "train_time_s": elapsed}
+    model = LinearIntentClassifier.from_estimator(clf)
+    if holdout_texts:
+        X_holdout = vectorizer.transform(holdout_texts)
+        predictions = clf.predict(X_holdout)
+        metrics["accuracy"] = float(accuracy_score(holdout_labels, predictions))
+        metrics["macro_f1"] = float(f1_score(holdout_labels, predictions, average="macro", zero_division=0))
+        # Mesma confiança que o NLPProcessor verá em produção (softmax da engine linear)
+        probabilities = model.predict_proba(X_holdout)
+        confident = probabilities.max(axis=1) >= INTENT_CONFIDENCE_THRESHOLD
+        metrics["coverage_at_threshold"] = float(confident.mean())
+        metrics["accuracy_at_threshold"] = (
+            float(accuracy_score(np.asarray(holdout_labels)[confident], model.classes_[probabilities[confident].argmax(axis=1)]))
+            if confident.any() else None
+        )
+        logging.info(f"Validação ({len(holdout_texts)} exemplos): acurácia={metrics['accuracy']:.3f} "
+                     f"macro-F1={metrics['macro_f1']:.3f}")
+        logging.info(f"Com o limiar {INTENT_CONFIDENCE_THRESHOLD}: {metrics['coverage_at_threshold']:.1%} dos exemplos "
+                     f"respondidos pela intenção (acurácia {metrics['accuracy_at_threshold'] or 0:.3f}); "
+                     f"os demais seguem para a busca de padrões/LLM.")
+
+    os.makedirs(models_dir, exist_ok=True)
+    save_artifacts(os.path.join(models_dir, "intent_linear"), model, vectorizer)
+    logging.info("Modelos treinados e salvos com sucesso.")
+    return metrics
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", default=os.path.join(script_dir, '..', 'data', 'augmented_knowledge.jsonl'))
+    parser.add_argument("--models-dir", default=os.path.join(script_dir, '..', 'models'))
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--buffer-size", type=int, default=50000)
+    parser.add_argument("--holdout", type=float, default=0.05)
+    args = parser.parse_args()
+
+    stream_train(args.data, args.models_dir, epochs=args.epochs,
+                 batch_size=args.batch_size, buffer_size=args.buffer_size, holdout_ratio=args.holdout)
@@ -1,13 +1,21 @@
+import argparse
 import json
 import pickle
 import os
+import sys
 import glob
 import logging
+import time
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.svm import SVC
+from sklearn.linear_model import LogisticRegression
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from agent.intent_classifier import LinearIntentClassifier
+from agent.artifacts import save_artifacts
+
 # Configuração do logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -39,27 +47,88 @@ def load_training_data_from_json(file_path):
         logging.error(f"Ocorreu um erro inesperado ao ler '{file_path}': {e}")
         return [], []
 
-def train_and_save_model():
+def load_training_data_from_jsonl(file_path):
+    """
+    Carrega os dados de treinamento de um arquivo JSON Lines gerado pelo augment_data.py
+    (uma linha {"intencao": ..., "padroes": [...]} por bloco), lendo linha a linha.
+    """
+    texts, labels = [], []
+    try:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    logging.error(f"Linha {line_no} de '{file_path}' não é um JSON válido.")
+                    continue
+                intent = record.get("intencao")
+                for pattern in record.get("padroes", []):
+                    texts.append(pattern.lower())
+                    labels.append(intent)
+        return texts, labels
+    except Exception as e:
+        logging.error(f"Ocorreu um erro inesperado ao ler '{file_path}': {e}")
+        return [], []
+
+def load_training_data(file_path):
+    """Carrega os dados de treinamento escolhendo o leitor pela extensão (.json ou .jsonl)."""
+    if file_path.endswith('.jsonl'):
+        return load_training_data_from_jsonl(file_path)
+    return load_training_data_from_json(file_path)
+
+def build_classifier(engine, **params):
+    """
+    Cria o classificador para a engine escolhida:
+    - "svc": SVC linear com probabilidades calibradas (Platt, 5-fold interno) — lento para treinar.
+    - "linear": regressão logística multinomial, exportada para LinearIntentClassifier (NumPy).
+
+    `params` sobrescreve os hiperparâmetros padrão (ex.: C=1.0), como na busca do hyperparam_search.py.
+    """
+    if engine == "linear":
+        return LogisticRegression(**{"C": 10.0, "max_iter": 1000, "class_weight": 'balanced', **params})
+    return SVC(**{"kernel": "linear", "probability": True, "random_state": 42, "class_weight": 'balanced', **params})
+
+
+DEFAULT_VECTORIZER_PARAMS = {"ngram_range": (1, 2), "max_features": 5000}
+
+
+def find_augmented_file(data_dir):
+    """Arquivo gerado pelo augment_data.py (JSON Lines; o .json antigo ainda é aceito), ou None."""
+    candidates = [os.path.join(data_dir, name) for name in ('augmented_knowledge.jsonl', 'augmented_knowledge.json')]
+    return next((path for path in candidates if os.path.exists(path)), None)
+
+
+def load_augmented_data(data_dir):
+    """Carrega o arquivo gerado pelo augment_data.py."""
+    augmented_file = find_augmented_file(data_dir)
+
+    if augmented_file is None:
+        logging.error(f"Arquivo de dados aumentado '{os.path.join(data_dir, 'augmented_knowledge.jsonl')}' não encontrado.")
+        logging.error("--> Execute 'python src/augment_data.py' primeiro para gerar os dados de treino.")
+        return [], []
+
+    logging.info(f"Carregando dados do arquivo aumentado: '{os.path.basename(augmented_file)}'...")
+    return load_training_data(augmented_file)
+
+
+def train_and_save_model(engine="svc", vectorizer_params=None, classifier_params=None, data=None):
     """
     Orquestra o processo de carregamento de dados de um arquivo aumentado, 
     treinamento e salvamento do modelo.
+
+    Args:
+        engine (str): "svc" ou "linear".
+        vectorizer_params (dict|None): parâmetros do TfidfVectorizer (padrão: DEFAULT_VECTORIZER_PARAMS).
+        classifier_params (dict|None): hiperparâmetros repassados para build_classifier.
+        data (tuple|None): (textos, rótulos) já carregados; None lê o arquivo aumentado.
     """
     script_dir = os.path.dirname(os.path.abspath(__file__))
     data_dir = os.path.join(script_dir, '..', 'data')
     models_dir = os.path.join(script_dir, '..', 'models')
 
-    # --- PONTO DE ALTERAÇÃO ---
-    # O script agora procura pelo arquivo gerado pelo augment_data.py
-    augmented_json_file = os.path.join(data_dir, 'augmented_knowledge.json')
-    
-    if not os.path.exists(augmented_json_file):
-        logging.error(f"Arquivo de dados aumentado '{augmented_json_file}' não encontrado.")
-        logging.error("--> Execute 'python src/augment_data.py' primeiro para gerar os dados de treino.")
-        return
-
-    logging.info(f"Carregando dados do arquivo aumentado: '{os.path.basename(augmented_json_file)}'...")
-    all_texts, all_labels = load_training_data_from_json(augmented_json_file)
-    # --- FIM DA ALTERAÇÃO ---
+    all_texts, all_labels = data if data is not None else load_augmented_data(data_dir)
 
     if not all_texts or not all_labels:
         logging.error("Nenhum dado de treinamento foi carregado. Verifique o arquivo JSON aumentado.")
@@ -69,17 +138,18 @@ def train_and_save_model():
     logging.info(f"Total de dados carregados: {len(all_texts)} exemplos de {len(unique_labels)} intenções.")
     
     # Vetorização e treinamento
-    vectorizer = TfidfVectorizer(ngram_range=(1, 2), max_features=5000)
+    vectorizer = TfidfVectorizer(**(vectorizer_params or DEFAULT_VECTORIZER_PARAMS))
     X = vectorizer.fit_transform(all_texts)
 
     X_train, X_test, y_train, y_test = train_test_split(
         X, all_labels, test_size=0.25, random_state=42, stratify=all_labels
     )
     
-    logging.info("Iniciando treinamento do modelo SVC...")
-    clf = SVC(kernel="linear", probability=True, random_state=42, class_weight='balanced')
+    logging.info(f"Iniciando treinamento do modelo ({engine})...")
+    clf = build_classifier(engine, **(classifier_params or {}))
+    start = time.perf_counter()
     clf.fit(X_train, y_train)
-    logging.info("Treinamento concluído.")
+    logging.info(f"Treinamento concluído em {time.perf_counter() - start:.2f}s.")
 
     # Avaliação detalhada do modelo
     y_pred = clf.predict(X_test)
@@ -98,17 +168,61 @@ def train_and_save_model():
     # Cria o diretório de modelos se não existir
     os.makedirs(models_dir, exist_ok=True)
 
-    # Salva os modelos
-    vectorizer_path = os.path.join(models_dir, "vectorizer.pkl")
-    model_path = os.path.join(models_dir, "model.pkl")
-
-    with open(vectorizer_path, "wb") as f:
-        pickle.dump(vectorizer, f)
-    
-    with open(model_path, "wb") as f:
-        pickle.dump(clf, f)
+    # Salva os modelos: a engine linear usa o formato sem pickle (vetorizador incluso)
+    if engine == "linear":
+        save_artifacts(os.path.join(models_dir, "intent_linear"), LinearIntentClassifier.from_estimator(clf), vectorizer)
+    else:
+        with open(os.path.join(models_dir, "vectorizer.pkl"), "wb") as f:
+            pickle.dump(vectorizer, f)
+        with open(os.path.join(models_dir, "model.pkl"), "wb") as f:
+            pickle.dump(clf, f)
 
     logging.info("Modelos treinados e salvos com sucesso.")
 
 if __name__ == "__main__":
-    train_and_save_model()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Treina o classificador de intenções do Jarvis.")
+    parser.add_argument("--engine", choices=["svc", "linear"], default=None,
+                        help="svc (padrão): models/model.pkl; linear: models/intent_linear/ (INTENT_ENGINE=linear)")
+    parser.add_argument("--stream", action="store_true",
+                        help="treino out-of-core (HashingVectorizer + SGD, stream_train.py) para corpora grandes; "
+                             "só gera a engine linear")
+    parser.add_argument("--search", action="store_true",
+                        help="busca hiperparâmetros com validação cruzada (hyperparam_search.py) e treina o escolhido")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--n-iter", type=int, default=None, help="amostra N combinações em vez da grade completa")
+    parser.add_argument("--n-jobs", type=int, default=-1)
+    parser.add_argument("--max-latency-ms", type=float, default=None,
+                        help="com --search, escolhe o melhor macro-F1 com latência p95 abaixo deste limite")
+    parser.add_argument("--results", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'logs',
+                                                         'hyperparam_search.jsonl'))
+    args = parser.parse_args()
+    if args.stream and args.engine == "svc":
+        parser.error("--stream gera apenas a engine linear (models/intent_linear/); não use --engine svc.")
+
+    if args.stream:
+        from stream_train import stream_train
+
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        augmented_file = find_augmented_file(os.path.join(script_dir, '..', 'data'))
+        if augmented_file is None:
+            logging.error("Execute 'python src/augment_data.py' primeiro para gerar os dados de treino.")
+            sys.exit(1)
+        stream_train(augmented_file, os.path.join(script_dir, '..', 'models'))
+    elif args.search:
+        from hyperparam_search import run_search, select_best
+
+        data_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
+        texts, labels = load_augmented_data(data_dir)
+        if not texts:
+            sys.exit(1)
+        summaries = run_search(texts, labels, n_splits=args.folds, n_iter=args.n_iter,
+                               n_jobs=args.n_jobs, results_path=args.results)
+        best = select_best(summaries, max_latency_ms=args.max_latency_ms)
+        if best is None:
+            logging.error("Nenhuma configuração atende ao limite de latência.")
+            sys.exit(1)
+        logging.info(f"Configuração escolhida: {best['trial']}")
+        train_and_save_model(engine=best["engine"], vectorizer_params=best["vectorizer_params"],
+                             classifier_params=best["classifier_params"], data=(texts, labels))
+    else:
+        train_and_save_model(engine=args.engine or "svc")
\ No newline at end of file
@@ -0,0 +1,67 @@
+import os
+from pathlib import Path
+
+# config.config exige estas variáveis no import; os testes usam Redis em memória (fakeredis).
+# Com a inicialização em etapas, importar agent.routes não carrega os modelos no import.
+for name, value in {
+    "STAGED_STARTUP": "true",
+    "API_KEY": "test-key",
+    "REDIS_URL": "redis://127.0.0.1:6379/0",
+    "REDIS_HOST": "127.0.0.1",
+    "REDIS_PORT": "6379",
+}.items():
+    os.environ.setdefault(name, value)
+
+import fakeredis
+import pytest
+
+
+@pytest.fixture
+def redis_server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def redis_client(redis_server):
+    return fakeredis.FakeRedis(server=redis_server)
+
+
+KNOWLEDGE_FILE = Path(__file__).resolve().parents[1] / "data" / "knowledge_data.json"
+
+
+class FirstResponseReranker:
+    """Substitui o Reranker (sentence-transformers) nos testes: escolhe sempre a primeira resposta."""
+
+    def precompute(self, responses):
+        pass
+
+    def rank_best_response(self, question, responses):
+        return responses[0] if responses else None
+
+    def rank_best_responses(self, questions, responses_lists):
+        return [self.rank_best_response(q, responses) for q, responses in zip(questions, responses_lists)]
+
+    def disable(self):
+        pass
+
+
+@pytest.fixture
+def make_agent(redis_client):
+    """AgentCore carregado sem etapas, com a base de exemplo, Redis em memória e LLM não configurada."""
+    from agent.core import AgentCore
+    from agent.llm_api import LLMAPI
+    from agent.memory import MemoryManager
+
+    agents = []
+
+    def make(llm=None, **kwargs):
+        memory = MemoryManager(session_key="test_agent", client=redis_client, write_behind=False)
+        agent = AgentCore(staged=False, knowledge_files=[KNOWLEDGE_FILE], kb_snapshot_path=None, memory=memory,
+                          llm=llm or LLMAPI(base_url=""), reranker=FirstResponseReranker(), **kwargs)
+        agents.append(agent)
+        return agent
+
+    yield make
+    for agent in agents:
+        agent.state.kb.close()
+        agent.memory.close()
@@ -0,0 +1,87 @@
+import threading
+
+import numpy as np
+import pytest
+
+from agent.artifacts import load_artifacts, save_artifacts
+from agent.intent_classifier import LinearIntentClassifier
+
+TEXTS = ["olá bom dia", "tchau até logo", "qual a previsão do tempo"]
+
+
+def _model(seed):
+    from sklearn.feature_extraction.text import TfidfVectorizer
+
+    vectorizer = TfidfVectorizer().fit(TEXTS)
+    n_features = len(vectorizer.vocabulary_)
+    coef = np.random.default_rng(seed).normal(size=(3, n_features)).astype(np.float32)
+    return LinearIntentClassifier(coef, np.zeros(3, dtype=np.float32), ["saudacao", "despedida", "clima"]), vectorizer
+
+
+def _versions(target):
+    return sorted(p.name for p in target.parent.glob(f".{target.name}.v-*"))
+
+
+def test_round_trip_through_the_current_link(tmp_path):
+    target = tmp_path / "intent_linear"
+    model, vectorizer = _model(0)
+    save_artifacts(target, model, vectorizer)
+
+    assert target.is_symlink()
+    loaded, loaded_vectorizer = load_artifacts(target)
+    assert np.allclose(loaded.coef_, model.coef_)
+    assert list(loaded.classes_) == ["saudacao", "despedida", "clima"]
+    assert loaded_vectorizer.vocabulary_ == vectorizer.vocabulary_
+
+
+def test_new_save_keeps_the_previous_version_for_readers(tmp_path):
+    target = tmp_path / "intent_linear"
+    save_artifacts(target, *_model(0))
+    resolved = target.resolve()
+    save_artifacts(target, *_model(1))
+
+    # Leitor que resolveu o link antes da troca termina de carregar a versão antiga
+    old, _ = load_artifacts(resolved)
+    new, _ = load_artifacts(target)
+    assert np.allclose(old.coef_, _model(0)[0].coef_)
+    assert np.allclose(new.coef_, _model(1)[0].coef_)
+
+    save_artifacts(target, *_model(2))
+    assert len(_versions(target)) == 2
+    assert not resolved.exists()
+
+
+def test_plain_directory_is_migrated_to_a_link(tmp_path):
+    target = tmp_path / "intent_linear"
+    target.mkdir()
+    (target / "manifest.json").write_text("{}")
+    save_artifacts(target, *_model(0))
+
+    assert target.is_symlink()
+    assert np.allclose(load_artifacts(target)[0].coef_, _model(0)[0].coef_)
+    assert len(_versions(target)) == 2
+
+
+def test_loads_never_fail_while_saving(tmp_path):
+    target = tmp_path / "intent_linear"
+    save_artifacts(target, *_model(0))
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                model, _ = load_artifacts(target)
+                assert model.coef_.shape[0] == 3
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for seed in range(1, 30):
+            save_artifacts(target, *_model(seed))
+    finally:
+        done.set()
+        thread.join(5)
+    assert not errors
@@ -0,0 +1,75 @@
+import threading
+import time
+
+import numpy as np
+
+from agent.batcher import EmbeddingBatcher
+
+
+class FakeEncoder:
+    def __init__(self):
+        self.calls = []
+        self.block = threading.Event()
+        self.block.set()
+
+    def encode(self, sentences, batch_size=None, convert_to_numpy=True):
+        self.calls.append((threading.current_thread().name, list(sentences)))
+        self.block.wait()
+        return np.array([[float(len(s)), 1.0] for s in sentences], dtype=np.float32)
+
+
+def test_concurrent_calls_share_a_batch():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_latency_ms=50, timeout=5)
+    results = {}
+
+    def call(text):
+        results[text] = batcher.encode_one(text)
+
+    threads = [threading.Thread(target=call, args=(t,)) for t in ("a", "bb", "ccc")]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert results["ccc"][0] == 3.0
+    assert batcher.get_stats()["batches"] < 3
+    assert batcher.get_stats()["fallbacks"] == 0
+
+
+def test_stuck_worker_falls_back_to_direct_encode():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_latency_ms=0, timeout=0.2)
+    encoder.block.clear()
+    stuck = threading.Thread(target=lambda: batcher.encode(["travado"]), daemon=True)
+    stuck.start()
+    for _ in range(500):
+        if encoder.calls:
+            break
+        time.sleep(0.01)
+    assert encoder.calls == [("embedding-batcher", ["travado"])]
+
+    # O lote seguinte fica na fila atrás do travado; `encode` não pode esperar para sempre
+    threading.Timer(0.3, encoder.block.set).start()
+    result = batcher.encode(["oi", "tudo bem"])
+    assert result.shape == (2, 2)
+    assert result[1][0] == 8.0
+    assert batcher.get_stats()["fallbacks"] >= 1
+    stuck.join(5)
+
+    # Os pedidos cancelados não são codificados de novo pela thread
+    batcher.encode(["depois"])
+    worker_texts = [texts for name, texts in encoder.calls if name == "embedding-batcher"]
+    assert worker_texts == [["travado"], ["depois"]]
+
+
+def test_dead_worker_is_restarted():
+    encoder = FakeEncoder()
+    batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_latency_ms=0, timeout=5)
+    batcher.encode(["oi"])
+    dead = threading.Thread(target=lambda: None, name="embedding-batcher")
+    dead.start()
+    dead.join()
+    batcher._worker = dead
+
+    assert batcher.encode(["de novo"])[0][0] == 7.0
+    assert encoder.calls[-1][0] == "embedding-batcher"
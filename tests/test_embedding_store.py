@@ -0,0 +1,88 @@
+import json
+import threading
+
+import numpy as np
+import pytest
+
+from agent.embedding_store import EmbeddingStore
+
+
+def _vectors(n, dim=4, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def test_save_and_load_round_trip(tmp_path):
+    store = EmbeddingStore(model_name="modelo-a")
+    store.add(["a", "b"], _vectors(2))
+    store.save(tmp_path / "emb")
+
+    loaded = EmbeddingStore.load(tmp_path / "emb")
+    assert (loaded.model_name, loaded.dim, len(loaded)) == ("modelo-a", 4, 2)
+    assert np.allclose(loaded.embeddings_for(["b", "a"]), store.embeddings_for(["b", "a"]))
+    assert np.allclose(np.linalg.norm(loaded.embeddings_for(["a"]), axis=1), 1.0)
+    assert loaded.embeddings_for(["a", "c"]) is None
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["emb.json", "emb.npy"]
+
+
+def test_save_does_not_touch_a_mapped_matrix(tmp_path):
+    store = EmbeddingStore(model_name="m")
+    store.add(["a", "b"], _vectors(2))
+    store.save(tmp_path / "emb")
+    mapped = EmbeddingStore.load(tmp_path / "emb", mmap=True)
+    before = np.array(mapped.embeddings_for(["a", "b"]))
+
+    # Outro processo regrava o arquivo (ex.: precompute durante um hot-reload)
+    store.add(["c"], _vectors(1, seed=1))
+    store.save(tmp_path / "emb")
+
+    assert np.array_equal(mapped.embeddings_for(["a", "b"]), before)
+    assert len(EmbeddingStore.load(tmp_path / "emb")) == 3
+
+
+def test_load_rejects_index_beyond_matrix(tmp_path):
+    store = EmbeddingStore(model_name="m")
+    store.add(["a"], _vectors(1))
+    store.save(tmp_path / "emb")
+    meta = json.loads((tmp_path / "emb.json").read_text())
+    meta["index"]["x"] = 5
+    (tmp_path / "emb.json").write_text(json.dumps(meta))
+
+    with pytest.raises(ValueError):
+        EmbeddingStore.load(tmp_path / "emb")
+
+
+def test_add_rejects_other_dimension():
+    store = EmbeddingStore()
+    store.add(["a"], _vectors(1, dim=4))
+    with pytest.raises(ValueError):
+        store.add(["b"], _vectors(1, dim=8))
+
+
+def test_readers_never_see_rows_missing_from_the_matrix():
+    store = EmbeddingStore()
+    store.add(["t0"], _vectors(1))
+    adding = ["t0"]
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        # Consulta justamente o texto que está sendo acrescentado
+        while not done.is_set():
+            try:
+                embeddings = store.embeddings_for(adding[-1:])
+                if embeddings is not None and embeddings.shape != (1, 4):
+                    errors.append(embeddings.shape)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(1, 300):
+            adding.append(f"t{i}")
+            store.add([f"t{i}"], _vectors(1, seed=i))
+    finally:
+        done.set()
+        thread.join(5)
+    assert not errors
+    assert len(store) == 300
@@ -0,0 +1,198 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from agent.executor import InferenceExecutor, QueueFullError
+
+
+class BlockingTarget:
+    """Alvo cujas chamadas ficam presas até `release` ser sinalizado."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def prepare_response(self, text, session_id=None):
+        self.started.set()
+        self.release.wait(5)
+        return f"ok: {text}"
+
+
+async def _occupy(executor, target):
+    """Ocupa todas as vagas do executor e aguarda a primeira chamada começar a executar."""
+    slots = executor.max_workers + executor.max_queue
+    tasks = [asyncio.create_task(executor.run("prepare_response", f"t{i}")) for i in range(slots)]
+    await asyncio.get_running_loop().run_in_executor(None, target.started.wait, 5)
+    return tasks
+
+
+def test_run_returns_the_target_result():
+    target = BlockingTarget()
+    target.release.set()
+    executor = InferenceExecutor(target, kind="thread", max_workers=1, max_queue=0)
+    try:
+        assert asyncio.run(executor.run("prepare_response", "oi")) == "ok: oi"
+        stats = executor.get_stats()
+        assert (stats["submitted"], stats["completed"], stats["outstanding"]) == (1, 1, 0)
+    finally:
+        executor.shutdown()
+
+
+def test_full_queue_rejects_and_frees_slots_afterwards():
+    target = BlockingTarget()
+    executor = InferenceExecutor(target, kind="thread", max_workers=1, max_queue=1)
+
+    async def scenario():
+        tasks = await _occupy(executor, target)
+        assert executor.get_stats()["queue_depth"] == 1
+        with pytest.raises(QueueFullError):
+            await executor.run("prepare_response", "extra")
+        target.release.set()
+        await asyncio.gather(*tasks)
+        return await executor.run("prepare_response", "depois")
+
+    try:
+        assert asyncio.run(scenario()) == "ok: depois"
+        stats = executor.get_stats()
+        assert stats["rejected"] == 1
+        assert stats["completed"] == 3
+        assert stats["outstanding"] == 0
+    finally:
+        target.release.set()
+        executor.shutdown()
+
+
+def test_cancelled_awaiter_keeps_the_slot_until_the_call_finishes():
+    target = BlockingTarget()
+    executor = InferenceExecutor(target, kind="thread", max_workers=1, max_queue=0)
+
+    async def scenario():
+        task = asyncio.create_task(executor.run("prepare_response", "lenta"))
+        await asyncio.get_running_loop().run_in_executor(None, target.started.wait, 5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # A chamada continua no pool: o limite de concorrência ainda vale
+        assert executor.get_stats()["outstanding"] == 1
+        with pytest.raises(QueueFullError):
+            await executor.run("prepare_response", "extra")
+        target.release.set()
+        for _ in range(500):
+            if executor.get_stats()["outstanding"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        return await executor.run("prepare_response", "depois")
+
+    try:
+        assert asyncio.run(scenario()) == "ok: depois"
+    finally:
+        target.release.set()
+        executor.shutdown()
+
+
+def test_cancelling_a_queued_call_frees_its_slot():
+    target = BlockingTarget()
+    executor = InferenceExecutor(target, kind="thread", max_workers=1, max_queue=1)
+
+    async def scenario():
+        running = asyncio.create_task(executor.run("prepare_response", "em execução"))
+        await asyncio.get_running_loop().run_in_executor(None, target.started.wait, 5)
+        queued = asyncio.create_task(executor.run("prepare_response", "na fila"))
+        await asyncio.sleep(0.05)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        # A chamada na fila nunca vai rodar: a vaga volta na hora
+        assert executor.get_stats()["outstanding"] == 1
+        again = asyncio.create_task(executor.run("prepare_response", "de novo"))
+        target.release.set()
+        return await asyncio.gather(running, again)
+
+    try:
+        assert asyncio.run(scenario()) == ["ok: em execução", "ok: de novo"]
+        assert executor.get_stats()["rejected"] == 0
+    finally:
+        target.release.set()
+        executor.shutdown()
+
+
+class KnowledgeTarget:
+    def answer_from_knowledge(self, text, state=None):
+        return f"base: {text}"
+
+    def prepare_response(self, text, session_id=None):
+        raise AssertionError("prepare_response altera o estado e não deve rodar no filho")
+
+
+def test_process_mode_only_accepts_stateless_methods():
+    executor = InferenceExecutor(KnowledgeTarget(), kind="process", max_workers=1, max_queue=0)
+    try:
+        with pytest.raises(ValueError):
+            asyncio.run(executor.run("prepare_response", "oi"))
+        assert executor.get_stats()["outstanding"] == 0
+        assert asyncio.run(executor.run("answer_from_knowledge", "oi")) == "base: oi"
+    finally:
+        executor.shutdown()
+
+
+class ParentAgent:
+    """Lado do servidor: registra o contexto gravado neste processo."""
+
+    def __init__(self):
+        self.saved = []
+
+    def is_ready(self):
+        return True
+
+    def save_context(self, user_input, response, session_id=None):
+        self.saved.append((user_input, response, session_id))
+
+
+def test_chat_in_process_mode_saves_context_in_the_server_process(monkeypatch):
+    from agent import routes
+    from config.config import API_KEY
+
+    parent = ParentAgent()
+    executor = InferenceExecutor(KnowledgeTarget(), kind="process", max_workers=1, max_queue=0)
+    monkeypatch.setattr(routes, "executor", executor)
+    monkeypatch.setattr(routes, "agent", parent)
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=routes.app), base_url="http://test") as client:
+            return await client.post("/chat", json={"text": "oi", "session_id": "s1"}, headers={"X-API-KEY": API_KEY})
+
+    try:
+        response = asyncio.run(scenario())
+        assert response.status_code == 200
+        assert response.json()["response"] == "base: oi"
+        assert parent.saved == [("oi", "base: oi", "s1")]
+    finally:
+        executor.shutdown()
+
+
+def test_chat_answers_503_with_retry_after_when_queue_is_full(monkeypatch):
+    from agent import routes
+    from config.config import API_KEY, INFERENCE_RETRY_AFTER
+
+    target = BlockingTarget()
+    executor = InferenceExecutor(target, kind="thread", max_workers=1, max_queue=0)
+    monkeypatch.setattr(routes, "executor", executor)
+
+    async def scenario():
+        tasks = await _occupy(executor, target)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=routes.app), base_url="http://test") as client:
+            response = await client.post("/chat", json={"text": "oi"}, headers={"X-API-KEY": API_KEY})
+        target.release.set()
+        await asyncio.gather(*tasks)
+        return response
+
+    try:
+        response = asyncio.run(scenario())
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == str(INFERENCE_RETRY_AFTER)
+        assert executor.get_stats()["rejected"] == 1
+    finally:
+        target.release.set()
+        executor.shutdown()
@@ -0,0 +1,95 @@
+import json
+import threading
+
+import pytest
+
+from agent.knowledge_base import KnowledgeBase
+
+
+@pytest.fixture
+def kb_file(tmp_path):
+    path = tmp_path / "kb.json"
+    path.write_text(json.dumps({"content": {"intencoes": {
+        "saudacao": {"padroes": ["olá", "bom dia", "boa tarde"], "respostas": ["Olá!"]},
+        "despedida": {"padroes": ["tchau", "até logo"], "respostas": ["Até mais!"]},
+    }}}, ensure_ascii=False), encoding="utf-8")
+    return path
+
+
+def make_kb(path, incremental):
+    return KnowledgeBase(path, snapshot_path=None, incremental=incremental, compaction_interval=3600)
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_added_intent_is_searchable(kb_file, incremental):
+    kb = make_kb(kb_file, incremental)
+    version = kb.version
+    assert kb.add_new_intent("clima", ["previsão do tempo"], ["Sem previsão."])
+    assert not kb.add_new_intent("clima", ["outro"], ["outra"])
+
+    assert kb.version != version
+    if incremental:
+        # Termos fora do vocabulário só contam depois da compactação
+        kb.compact()
+    assert kb.find_most_similar_pattern("previsão do tempo") == "previsão do tempo"
+    assert kb.get_response_by_pattern("previsão do tempo") == ["Sem previsão."]
+    assert kb.find_most_similar_pattern("bom dia") == "bom dia"
+    assert kb.runtime_changes() == [("add_intent", "clima", ["previsão do tempo"], ["Sem previsão."])]
+    kb.close()
+
+
+def test_full_refit_publishes_new_objects(kb_file):
+    kb = make_kb(kb_file, incremental=False)
+    old_vectorizer, old_index, _, _, old_patterns = kb._search_state
+    vocabulary = dict(old_vectorizer.vocabulary_)
+
+    kb.add_new_intent("clima", ["previsão do tempo"], ["Sem previsão."])
+
+    vectorizer, index, delta, base_rows, patterns = kb._search_state
+    # O conjunto publicado antes continua íntegro para buscas que já o leram
+    assert old_vectorizer.vocabulary_ == vocabulary
+    assert len(old_patterns) == 5
+    assert (vectorizer, index, patterns) != (old_vectorizer, old_index, old_patterns)
+    assert (delta, base_rows, len(patterns)) == (None, 6, 6)
+    assert kb.tfidf_matrix.shape[0] == len(kb.patterns) == 6
+
+
+@pytest.mark.parametrize("incremental", [False, True])
+def test_searches_during_adds_see_consistent_state(kb_file, incremental):
+    kb = make_kb(kb_file, incremental)
+    errors = []
+    done = threading.Event()
+
+    def reader():
+        while not done.is_set():
+            try:
+                for pattern, _ in kb.find_similar_patterns("bom dia padrão", k=3):
+                    if kb.get_response_by_pattern(pattern) == []:
+                        errors.append(pattern)
+            except Exception as e:
+                errors.append(e)
+
+    thread = threading.Thread(target=reader)
+    thread.start()
+    try:
+        for i in range(60):
+            kb.add_new_intent(f"intencao_{i}", [f"padrão novo {i}", f"termo{i} bom"], [f"resposta {i}"])
+    finally:
+        done.set()
+        thread.join(5)
+        kb.close()
+    assert not errors
+    if incremental:
+        kb.compact()
+    assert kb.find_most_similar_pattern("padrão novo 59") == "padrão novo 59"
+
+
+def test_compaction_folds_delta_into_the_index(kb_file):
+    kb = make_kb(kb_file, incremental=True)
+    kb.add_new_intent("clima", ["previsão do tempo"], ["Sem previsão."])
+    assert kb.pending_rows() == 1
+
+    assert kb.compact()
+    assert kb.pending_rows() == 0
+    assert kb.find_most_similar_pattern("previsão do tempo") == "previsão do tempo"
+    kb.close()
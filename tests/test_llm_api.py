@@ -0,0 +1,169 @@
+import asyncio
+import importlib.util
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from agent.llm_api import LLMAPI, LLMError, LLMTimeoutError, PLACEHOLDER_RESPONSE
+
+STUB_PATH = Path(__file__).resolve().parents[1] / "scripts" / "llm_stub_server.py"
+
+
+def _load_stub():
+    spec = importlib.util.spec_from_file_location("llm_stub_server", STUB_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+stub = _load_stub()
+
+
+def _wait_until(predicate, timeout=2.0):
+    """O cancelamento chega ao loop do cliente de forma assíncrona; espera o efeito aparecer."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def stub_server():
+    """Inicia o stub da LLM em uma porta livre; `start(--opções)` retorna (servidor, URL base)."""
+    servers = []
+
+    def start(*args):
+        options = stub.build_parser().parse_args(["--port", "0", "--first-token-ms", "0", "--token-ms", "0",
+                                                  "--extra-words", "3", *args])
+        server = stub.make_server(options)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def make_client():
+    clients = []
+
+    def make(base_url, **kwargs):
+        kwargs.setdefault("retry_base_delay", 0.01)
+        client = LLMAPI(base_url=base_url, api_key="", model="jarvis-stub", **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        client.close()
+
+
+def test_placeholder_without_url():
+    llm = LLMAPI(base_url="")
+    assert llm.call_llm("oi") == PLACEHOLDER_RESPONSE
+    assert llm.get_status()["status"] == "placeholder"
+
+
+def test_call_llm_returns_completion(stub_server, make_client):
+    _, url = stub_server()
+    llm = make_client(url)
+    assert llm.call_llm("buracos negros").startswith("Resposta simulada para: buracos negros.")
+    assert llm.test_connection()
+    assert llm.get_status()["calls"] == 1
+
+
+def test_context_turns_are_sent(make_client):
+    llm = make_client("http://127.0.0.1:1/v1", context_turns=1)
+    context = [{"user": "a", "agent": "b"}, {"user": "c", "agent": "d"}]
+    roles = [(m["role"], m["content"]) for m in llm.build_messages("e", context)]
+    assert roles[1:] == [("user", "c"), ("assistant", "d"), ("user", "e")]
+    assert llm.history(context) == context[1:] and llm.history(None) == []
+    assert make_client("http://127.0.0.1:1/v1", context_turns=0).history(context) == []
+
+
+def test_transient_failures_are_retried(stub_server, make_client):
+    server, url = stub_server("--fail-first", "2")
+    llm = make_client(url, max_retries=2)
+    assert llm.call_llm("oi").startswith("Resposta simulada")
+    assert server.requests == 3
+    assert llm.get_status()["retries"] == 2
+
+
+def test_gives_up_after_max_retries(stub_server, make_client):
+    server, url = stub_server("--fail-first", "5")
+    llm = make_client(url, max_retries=1)
+    with pytest.raises(LLMError):
+        llm.call_llm("oi")
+    assert server.requests == 2
+    assert llm.get_status()["failures"] == 1
+
+
+def test_deadline_bounds_the_call(stub_server, make_client):
+    _, url = stub_server("--first-token-ms", "2000")
+    llm = make_client(url, timeout=0.3)
+    start = time.monotonic()
+    with pytest.raises(LLMTimeoutError):
+        llm.call_llm("oi")
+    assert time.monotonic() - start < 1.5
+    assert llm.get_status()["in_flight"] == 0
+
+
+def test_stream_yields_deltas(stub_server, make_client):
+    _, url = stub_server("--token-ms", "5")
+    llm = make_client(url)
+
+    async def collect():
+        return [delta async for delta in llm.astream("oi")]
+
+    parts = asyncio.run(collect())
+    assert len(parts) > 1
+    assert "".join(parts).startswith("Resposta simulada para: oi.")
+
+
+def test_cancelled_stream_releases_the_semaphore(stub_server, make_client):
+    _, url = stub_server("--token-ms", "200", "--extra-words", "50")
+    llm = make_client(url, max_concurrency=1, timeout=5)
+
+    async def scenario():
+        async def consume():
+            async for _ in llm.astream("longa"):
+                pass
+
+        task = asyncio.create_task(consume())
+        while llm.get_status()["in_flight"] == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        # Com uma única vaga, o novo stream só começa se o cancelamento a devolveu
+        stream = llm.astream("curta")
+        try:
+            return await asyncio.wait_for(stream.__anext__(), 3)
+        finally:
+            await stream.aclose()
+
+    assert asyncio.run(scenario()) == "Resposta "
+    assert _wait_until(lambda: llm.get_status()["in_flight"] == 0)
+
+
+def test_cancelled_call_releases_the_semaphore(stub_server, make_client):
+    _, url = stub_server("--first-token-ms", "500")
+    llm = make_client(url, max_concurrency=1, timeout=5)
+
+    async def scenario():
+        task = asyncio.create_task(llm.acall_llm("lenta"))
+        while llm.get_status()["in_flight"] == 0:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return await asyncio.wait_for(llm.acall_llm("seguinte"), 3)
+
+    assert asyncio.run(scenario()).startswith("Resposta simulada para: seguinte.")
@@ -0,0 +1,173 @@
+import json
+import threading
+import time
+
+import fakeredis
+import pytest
+
+from agent.circuit_breaker import CircuitBreaker, CircuitOpenError
+from agent.memory import MemoryManager
+
+
+def _wait_until(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+@pytest.fixture
+def make_memory(redis_client):
+    memories = []
+
+    def make(**kwargs):
+        kwargs.setdefault("write_behind", False)
+        memory = MemoryManager(session_key="test_memory", client=redis_client, **kwargs)
+        # Limiares curtos para o teste não depender dos valores de produção
+        memory.breaker = CircuitBreaker("redis", failure_threshold=2, reset_timeout=0.1)
+        memories.append(memory)
+        return memory
+
+    yield make
+    for memory in memories:
+        memory.close()
+
+
+def _stored(client, key):
+    return [json.loads(item)["user"] for item in client.lrange(key, 0, -1)]
+
+
+def test_saves_and_loads_through_redis(make_memory, redis_client):
+    memory = make_memory()
+    memory.save_interaction("oi", "olá", session_id="s1")
+    memory.save_interaction("tudo bem?", "tudo", session_id="s1")
+
+    assert [item["user"] for item in memory.load_history("s1")] == ["oi", "tudo bem?"]
+    assert _stored(redis_client, "test_memory:s1") == ["oi", "tudo bem?"]
+    assert redis_client.ttl("test_memory:s1") > 0
+
+
+def test_circuit_opens_and_history_is_served_locally(make_memory, redis_server):
+    memory = make_memory()
+    memory.save_interaction("antes", "ok", session_id="s1")
+    redis_server.connected = False
+
+    for text in ("um", "dois", "três"):
+        memory.save_interaction(text, "ok", session_id="s1")
+
+    assert memory.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        memory.execute(lambda: pytest.fail("o Redis não deveria ser chamado com o circuito aberto"))
+    assert [item["user"] for item in memory.load_history("s1")] == ["antes", "um", "dois", "três"]
+    assert memory.get_memory_size("s1") == 4
+    assert memory.pending_count() == 3
+    assert memory.get_status()["status"] == "degraded"
+
+
+def test_pending_writes_are_reconciled_after_recovery(make_memory, redis_server, redis_client):
+    memory = make_memory()
+    memory.save_interaction("antes", "ok", session_id="s1")
+    redis_server.connected = False
+    memory.save_interaction("durante", "ok", session_id="s1")
+    memory.save_interaction("outra sessão", "ok", session_id="s2")
+    assert memory.pending_count() == 2
+
+    redis_server.connected = True
+    time.sleep(memory.breaker.reset_timeout)
+    # A sonda do meio-aberto fecha o circuito e dispara a reconciliação em segundo plano
+    assert memory.get_status()["status"] == "ok"
+    assert _wait_until(lambda: memory.pending_count() == 0)
+
+    assert memory.breaker.state == CircuitBreaker.CLOSED
+    assert _stored(redis_client, "test_memory:s1") == ["antes", "durante"]
+    assert _stored(redis_client, "test_memory:s2") == ["outra sessão"]
+    assert memory.get_write_stats()["flushed"] == 2
+
+
+def test_first_save_after_recovery_keeps_history_order(make_memory, redis_server, redis_client):
+    memory = make_memory()
+    memory.save_interaction("antes", "ok", session_id="s1")
+    redis_server.connected = False
+    memory.save_interaction("durante 1", "ok", session_id="s1")
+    memory.save_interaction("durante 2", "ok", session_id="s1")
+
+    redis_server.connected = True
+    time.sleep(memory.breaker.reset_timeout)
+    # Sem PING antes: a própria gravação fecha o circuito
+    memory.save_interaction("depois", "ok", session_id="s1")
+
+    assert memory.pending_count() == 0
+    assert _stored(redis_client, "test_memory:s1") == ["antes", "durante 1", "durante 2", "depois"]
+    assert [item["user"] for item in memory.load_history("s1")] == ["antes", "durante 1", "durante 2", "depois"]
+
+
+def test_saves_while_circuit_is_open_stay_queued_in_order(make_memory, redis_server, redis_client):
+    memory = make_memory()
+    redis_server.connected = False
+    for text in ("um", "dois", "três"):
+        memory.save_interaction(text, "ok", session_id="s1")
+    assert memory.pending_count() == 3
+
+    redis_server.connected = True
+    time.sleep(memory.breaker.reset_timeout)
+    memory.save_interaction("quatro", "ok", session_id="s1")
+    memory.save_interaction("cinco", "ok", session_id="s1")
+    assert _stored(redis_client, "test_memory:s1") == ["um", "dois", "três", "quatro", "cinco"]
+
+
+def test_failed_probe_reopens_the_circuit(make_memory, redis_server):
+    memory = make_memory()
+    redis_server.connected = False
+    memory.save_interaction("um", "ok")
+    memory.save_interaction("dois", "ok")
+    assert memory.breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(memory.breaker.reset_timeout)
+    assert memory.breaker.state == CircuitBreaker.HALF_OPEN
+    assert memory.get_status()["status"] == "degraded"
+    assert memory.breaker.state == CircuitBreaker.OPEN
+    assert memory.pending_count() == 2
+
+
+def test_write_behind_batch_stays_visible_while_flushing(make_memory, redis_client):
+    memory = make_memory(write_behind=True, flush_interval=60, flush_batch_size=100)
+    memory.save_interaction("um", "ok", session_id="s1")
+    memory.save_interaction("dois", "ok", session_id="s1")
+    assert redis_client.llen("test_memory:s1") == 0
+
+    started, release = threading.Event(), threading.Event()
+    execute = memory.execute
+
+    def slow_execute(operation, name="command"):
+        if name == "flush":
+            started.set()
+            release.wait(5)
+        return execute(operation, name)
+
+    memory.execute = slow_execute
+    flusher = threading.Thread(target=memory.flush)
+    flusher.start()
+    try:
+        assert started.wait(5)
+        # O lote saiu do buffer, mas ainda não chegou ao Redis
+        assert [item["user"] for item in memory.load_history("s1")] == ["um", "dois"]
+        assert memory.pending_count() == 2
+    finally:
+        release.set()
+        flusher.join(5)
+    assert memory.pending_count() == 0
+    assert _stored(redis_client, "test_memory:s1") == ["um", "dois"]
+
+
+def test_write_behind_writes_synchronously_after_close(make_memory, redis_client):
+    memory = make_memory(write_behind=True, flush_interval=60, flush_batch_size=100)
+    memory.save_interaction("pendente", "ok", session_id="s1")
+    memory.close()
+    assert _stored(redis_client, "test_memory:s1") == ["pendente"]
+
+    memory.save_interaction("depois", "ok", session_id="s1")
+    assert _stored(redis_client, "test_memory:s1") == ["pendente", "depois"]
+    assert memory.pending_count() == 0
+    assert memory.get_write_stats()["dropped"] == 0
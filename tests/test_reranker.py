@@ -0,0 +1,63 @@
+import sys
+
+import pytest
+
+from agent import reranker as reranker_module
+from agent.batcher import EmbeddingBatcher
+from agent.model_registry import EncoderLoadError, SharedEncoder
+from agent.reranker import Reranker
+
+RESPONSES = ["Está previsto sol.", "Vai chover."]
+
+
+class BrokenEncoder(SharedEncoder):
+    """Encoder cujo modelo (carregado só no primeiro uso) falha ao carregar."""
+
+    def __init__(self):
+        super().__init__("modelo-inexistente")
+        self.loads = 0
+
+    @property
+    def model(self):
+        self.loads += 1
+        raise EncoderLoadError("pesos não encontrados")
+
+
+@pytest.fixture(params=["direto", "batcher"])
+def broken_reranker(request, monkeypatch):
+    encoder = BrokenEncoder()
+    batcher = EmbeddingBatcher(encoder, timeout=5) if request.param == "batcher" else None
+    monkeypatch.setattr(reranker_module, "get_encoder", lambda name: encoder)
+    monkeypatch.setattr(reranker_module, "get_batcher", lambda name: batcher)
+    reranker = Reranker(store_path=None)
+    assert reranker.model is encoder  # a construção não carrega o modelo
+    return reranker, encoder
+
+
+def test_load_failure_on_first_rank_disables_reranking(broken_reranker):
+    reranker, encoder = broken_reranker
+    assert reranker.rank_best_response("vai chover?", RESPONSES) == RESPONSES[0]
+    assert reranker.model is None and reranker.batcher is None
+
+    loads = encoder.loads
+    assert reranker.rank_best_response("vai chover?", RESPONSES) == RESPONSES[0]
+    assert encoder.loads == loads
+
+
+def test_load_failure_on_precompute_disables_reranking(broken_reranker):
+    reranker, _ = broken_reranker
+    assert reranker.precompute(RESPONSES) == 0
+    assert reranker.model is None
+    assert reranker.rank_best_responses(["oi", "x"], [RESPONSES, []]) == [RESPONSES[0], None]
+
+
+def test_load_failure_on_batch_rank_disables_reranking(broken_reranker):
+    reranker, _ = broken_reranker
+    assert reranker.rank_best_responses(["oi"], [RESPONSES]) == [RESPONSES[0]]
+    assert reranker.model is None
+
+
+def test_shared_encoder_wraps_load_errors(monkeypatch):
+    monkeypatch.setitem(sys.modules, "sentence_transformers", None)
+    with pytest.raises(EncoderLoadError):
+        SharedEncoder("modelo-inexistente-para-teste").encode(["oi"])
@@ -0,0 +1,90 @@
+import pytest
+
+from agent.memory import MemoryManager
+from agent.response_cache import ResponseCache, normalize_text
+
+
+@pytest.fixture
+def memory(redis_client):
+    memory = MemoryManager(session_key="test_cache", client=redis_client, write_behind=False)
+    yield memory
+    memory.close()
+
+
+def test_key_ignores_case_punctuation_and_spacing():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set("Bom dia!", "v1", "Olá!")
+    assert normalize_text("  BOM   dia?? ") == "bom dia"
+    assert cache.get("  BOM   dia?? ", "v1") == "Olá!"
+
+
+def test_version_change_misses_without_clearing_other_versions():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set("oi", "v1", "Olá!")
+    assert cache.get("oi", "v2") is None
+    cache.set("oi", "v2", "Oi, tudo bem?")
+
+    # Durante uma recarga, requisições das duas versões se alternam sem esvaziar o cache
+    for _ in range(3):
+        assert cache.get("oi", "v1") == "Olá!"
+        assert cache.get("oi", "v2") == "Oi, tudo bem?"
+    stats = cache.get_stats()
+    assert (stats["hits_local"], stats["misses"], stats["invalidations"], stats["entries"]) == (6, 1, 0, 2)
+
+
+def test_old_version_entries_leave_through_lru():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.set("oi", "v1", "antiga")
+    cache.set("tchau", "v1", "antiga")
+    cache.set("oi", "v2", "nova")
+    cache.set("tchau", "v2", "nova")
+    assert cache.get("oi", "v1") is None and cache.get("tchau", "v1") is None
+    assert (cache.get("oi", "v2"), cache.get("tchau", "v2")) == ("nova", "nova")
+
+
+def test_invalidate_empties_local_level():
+    cache = ResponseCache(max_entries=10, ttl=60)
+    cache.set("oi", "v1", "Olá!")
+    cache.invalidate()
+    assert cache.get("oi", "v1") is None
+    assert cache.get_stats()["invalidations"] == 1
+
+
+def test_local_level_is_bounded_lru():
+    cache = ResponseCache(max_entries=2, ttl=60)
+    cache.set("a", "v1", "A")
+    cache.set("b", "v1", "B")
+    assert cache.get("a", "v1") == "A"
+    cache.set("c", "v1", "C")
+    assert cache.get("b", "v1") is None
+    assert (cache.get("a", "v1"), cache.get("c", "v1")) == ("A", "C")
+
+
+def test_shared_level_is_versioned(memory):
+    writer = ResponseCache(ttl=60, memory=memory)
+    reader = ResponseCache(ttl=60, memory=memory)
+    writer.set("oi", "v1", "Olá!")
+
+    assert reader.get("oi", "v1") == "Olá!"
+    assert reader.get_stats()["hits_shared"] == 1
+    assert reader.get("oi", "v2") is None
+    assert memory.client.ttl(f"{writer.prefix}:{writer._key('oi', 'v1')}") > 0
+
+
+def test_agent_does_not_serve_cached_answer_after_kb_change(make_agent):
+    agent = make_agent()
+    agent.cache = ResponseCache(max_entries=10, ttl=60)
+    first = agent.answer_from_knowledge("oi")
+    assert first in agent.state.kb.find_responses("saudacao")
+    assert agent.answer_from_knowledge("oi") == first
+    assert agent.cache.get_stats()["hits_local"] == 1
+
+    version = agent.state.version
+    assert agent.state.kb.update_intent_responses("saudacao", ["Resposta nova da base."])
+    assert agent.state.version != version
+    assert agent.answer_from_knowledge("oi") == "Resposta nova da base."
+
+    agent.state.kb.add_new_intent("clima_teste", ["como está o tempo hoje"], ["Sem previsão."])
+    assert agent.answer_from_knowledge("oi") == "Resposta nova da base."
+    # Requisição ainda presa à versão antiga (state lido antes da alteração) continua acertando
+    assert agent.cache.get("oi", version) == first
@@ -0,0 +1,244 @@
+import time
+import types
+
+import numpy as np
+import pytest
+
+from agent import semantic_cache as semantic_cache_module
+from agent.llm_api import LLMAPI, PLACEHOLDER_RESPONSE
+from agent.memory import MemoryManager
+from agent.semantic_cache import SemanticCache, context_key
+
+# Embeddings fixos: paráfrases quase paralelas, assuntos diferentes ortogonais
+VECTORS = {
+    "como troco minha senha": [1.0, 0.0, 0.0, 0.0],
+    "como faço para trocar a senha": [0.99, 0.1, 0.0, 0.0],
+    "qual o horário de atendimento": [0.0, 1.0, 0.0, 0.0],
+    "onde fica a loja": [0.0, 0.0, 1.0, 0.0],
+    "vocês entregam no sábado": [0.0, 0.0, 0.0, 1.0],
+}
+
+
+def embed(text):
+    return np.array(VECTORS[text], dtype=np.float32)
+
+
+class Clock:
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(semantic_cache_module, "time", types.SimpleNamespace(time=clock.time, sleep=time.sleep))
+    return clock
+
+
+@pytest.fixture
+def memory(redis_client):
+    memory = MemoryManager(session_key="test_semantic", client=redis_client, write_behind=False)
+    yield memory
+    memory.close()
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("threshold", 0.9)
+    kwargs.setdefault("ttl", 60)
+    kwargs.setdefault("sync_interval", 0)
+    kwargs.setdefault("prefix", "test:semantic_cache")
+    return SemanticCache(embed, **kwargs)
+
+
+def test_paraphrase_hits_and_other_subject_misses():
+    cache = make_cache()
+    cache.add("como troco minha senha", "Acesse Perfil > Segurança.")
+
+    response, vector = cache.lookup("como faço para trocar a senha")
+    assert response == "Acesse Perfil > Segurança."
+    assert np.isclose(np.linalg.norm(vector), 1.0)
+    assert cache.lookup("qual o horário de atendimento")[0] is None
+    stats = cache.get_stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = make_cache(ttl=60)
+    cache.add("como troco minha senha", "Acesse Perfil > Segurança.")
+    clock.now += 59
+    assert cache.lookup("como troco minha senha")[0] is not None
+    clock.now += 2
+    assert cache.lookup("como troco minha senha")[0] is None
+
+
+def test_full_cache_evicts_least_recently_used():
+    cache = make_cache(max_entries=2)
+    cache.add("como troco minha senha", "senha")
+    cache.add("qual o horário de atendimento", "horário")
+    # O acerto renova a entrada da senha; a do horário passa a ser a mais antiga
+    assert cache.lookup("como troco minha senha")[0] == "senha"
+    cache.add("onde fica a loja", "endereço")
+
+    assert len(cache) == 2
+    assert cache.get_stats()["evictions"] == 1
+    assert cache.lookup("qual o horário de atendimento")[0] is None
+    assert cache.lookup("como troco minha senha")[0] == "senha"
+    assert cache.lookup("onde fica a loja")[0] == "endereço"
+
+
+def test_expired_entries_are_reused_before_evicting(clock):
+    cache = make_cache(max_entries=2, ttl=10)
+    cache.add("como troco minha senha", "senha")
+    clock.now += 5
+    cache.add("qual o horário de atendimento", "horário")
+    clock.now += 6
+    cache.add("onde fica a loja", "endereço")
+
+    assert cache.get_stats()["evictions"] == 0
+    assert cache.lookup("qual o horário de atendimento")[0] == "horário"
+
+
+def test_entries_only_match_their_history():
+    cache = make_cache()
+    cache.add("como troco minha senha", "sem histórico")
+    cache.add("como troco minha senha", "com histórico", context="h1")
+
+    assert cache.lookup("como troco minha senha")[0] == "sem histórico"
+    assert cache.lookup("como troco minha senha", "h1")[0] == "com histórico"
+    assert cache.lookup("como troco minha senha", "h2")[0] is None
+
+
+def test_context_key_normalizes_turns():
+    assert context_key([]) == ""
+    assert context_key([{"user": "Oi!", "agent": "Olá."}]) == context_key([{"user": "oi", "agent": "olá"}])
+    assert context_key([{"user": "oi", "agent": "olá"}]) != context_key([{"user": "oi", "agent": "tchau"}])
+
+
+def test_entries_are_shared_between_workers(memory):
+    writer = make_cache(memory=memory)
+    reader = make_cache(memory=memory)
+    writer.add("como troco minha senha", "Acesse Perfil > Segurança.")
+
+    assert reader.sync() == 1
+    assert reader.sync() == 0
+    assert reader.lookup("como faço para trocar a senha")[0] == "Acesse Perfil > Segurança."
+    reader.add("qual o horário de atendimento", "Das 8h às 18h.", context="h1")
+    assert writer.sync() == 1
+    assert writer.lookup("qual o horário de atendimento")[0] is None
+    assert writer.lookup("qual o horário de atendimento", "h1")[0] == "Das 8h às 18h."
+    assert len(writer) == 2
+    assert reader.get_stats()["synced_from_shared"] == 1
+
+
+def test_sync_skips_expired_entries_published_out_of_order(memory, clock):
+    long_lived = make_cache(memory=memory, ttl=3600)
+    short_lived = make_cache(memory=memory, ttl=5)
+    short_lived.add("qual o horário de atendimento", "curta")
+    long_lived.add("como troco minha senha", "longa")
+    short_lived.add("onde fica a loja", "curta também")
+
+    clock.now += 10
+    reader = make_cache(memory=memory)
+    assert reader.sync() == 1
+    assert reader.lookup("como troco minha senha")[0] == "longa"
+    assert reader.lookup("onde fica a loja")[0] is None
+
+
+def test_shared_stream_is_bounded_without_ttl(memory):
+    cache = make_cache(memory=memory, ttl=0, max_entries=2)
+    for text in VECTORS:
+        cache.add(text, f"resposta: {text}")
+
+    stream = cache._stream_key
+    assert memory.client.xlen(stream) == 2
+    assert memory.client.ttl(stream) == -1
+    assert memory.client.keys("test:semantic_cache*") == [stream.encode("utf-8")]
+    reader = make_cache(memory=memory, ttl=0, max_entries=2)
+    assert reader.sync() == 2
+
+
+def test_shared_stream_expires_with_ttl(memory):
+    cache = make_cache(memory=memory, ttl=60)
+    cache.add("como troco minha senha", "senha")
+    assert 0 < memory.client.ttl(cache._stream_key) <= 60
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """LLM configurada (URL fictícia) cujas chamadas são contadas em vez de enviadas."""
+    calls = []
+    llm = LLMAPI(base_url="http://llm.invalid/v1", context_turns=2)
+
+    def call_llm(prompt, context=None):
+        calls.append((prompt, list(context or [])))
+        return f"gerada {len(calls)}"
+
+    monkeypatch.setattr(llm, "call_llm", call_llm)
+    yield llm, calls
+    llm.close()
+
+
+def test_agent_reuses_answers_generated_without_context(make_agent, llm_calls):
+    llm, calls = llm_calls
+    agent = make_agent(llm=llm)
+    agent.semantic_cache = make_cache()
+
+    assert agent.ask_llm("como troco minha senha", session_id="a") == "gerada 1"
+    assert agent.ask_llm("como faço para trocar a senha", session_id="b") == "gerada 1"
+    assert len(calls) == 1
+
+
+def test_agent_reuses_answers_between_sessions_with_the_same_history(make_agent, llm_calls):
+    llm, calls = llm_calls
+    agent = make_agent(llm=llm)
+    agent.semantic_cache = make_cache()
+    for session in ("a", "b"):
+        agent.save_context("Oi!", "Olá! Como posso ajudar?", session_id=session)
+
+    assert agent.ask_llm("como troco minha senha", session_id="a") == "gerada 1"
+    assert calls[0][1] == [{"user": "Oi!", "agent": "Olá! Como posso ajudar?"}]
+    # Mesmo histórico (após normalização) em outra sessão: acerto, sem nova geração
+    agent.save_context("oi", "olá, como posso ajudar", session_id="c")
+    assert agent.ask_llm("como faço para trocar a senha", session_id="b") == "gerada 1"
+    assert agent.ask_llm("como faço para trocar a senha", session_id="c") == "gerada 1"
+    assert len(calls) == 1
+    assert agent.semantic_cache.get_stats()["hits"] == 2
+
+
+def test_agent_does_not_serve_answers_across_different_histories(make_agent, llm_calls):
+    llm, calls = llm_calls
+    agent = make_agent(llm=llm)
+    agent.semantic_cache = make_cache()
+    assert agent.ask_llm("como troco minha senha", session_id="sem-historico") == "gerada 1"
+    agent.save_context("meu nome é Ana", "Prazer, Ana!", session_id="ana")
+
+    assert agent.ask_llm("como troco minha senha", session_id="ana") == "gerada 2"
+    assert calls[1][1] == [{"user": "meu nome é Ana", "agent": "Prazer, Ana!"}]
+    stats = agent.semantic_cache.get_stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (0, 2, 2)
+
+
+def test_agent_can_ignore_history(make_agent, llm_calls, monkeypatch):
+    from agent import core
+
+    monkeypatch.setattr(core, "SEMANTIC_CACHE_CONTEXT", "ignore")
+    llm, calls = llm_calls
+    agent = make_agent(llm=llm)
+    agent.semantic_cache = make_cache()
+    agent.ask_llm("como troco minha senha", session_id="a")
+    agent.save_context("meu nome é Ana", "Prazer, Ana!", session_id="ana")
+
+    assert agent.ask_llm("como faço para trocar a senha", session_id="ana") == "gerada 1"
+    assert len(calls) == 1
+
+
+def test_agent_never_caches_the_placeholder(make_agent):
+    agent = make_agent(llm=LLMAPI(base_url=""))
+    agent.semantic_cache = make_cache()
+
+    assert agent.ask_llm("como troco minha senha") == PLACEHOLDER_RESPONSE
+    assert len(agent.semantic_cache) == 0
+    assert agent.semantic_cache.get_stats()["skipped"] == 1
@@ -0,0 +1,86 @@
+import asyncio
+import gc
+import os
+import signal
+import time
+
+import httpx
+import pytest
+
+from agent import server
+
+
+class FakeReloader:
+    def __init__(self):
+        self.reasons = []
+
+    def reload(self, reason="manual"):
+        self.reasons.append(reason)
+        return {"version": f"v{len(self.reasons)}", "in_progress": False}
+
+
+@pytest.fixture
+def reloader(monkeypatch):
+    from agent import routes
+
+    fake = FakeReloader()
+    monkeypatch.setattr(routes, "reloader", fake)
+    return fake
+
+
+@pytest.fixture
+def kills(monkeypatch):
+    sent = []
+    monkeypatch.setattr(server.os, "kill", lambda pid, signum: sent.append((pid, signum)))
+    return sent
+
+
+def _post_reload():
+    from agent import routes
+    from config.config import API_KEY
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=routes.app), base_url="http://test") as client:
+            return await client.post("/admin/reload", headers={"X-API-KEY": API_KEY})
+
+    return asyncio.run(scenario())
+
+
+def test_admin_reload_in_single_process(reloader, kills, monkeypatch):
+    monkeypatch.setattr(server, "_master_pid", None)
+    response = _post_reload()
+
+    assert response.status_code == 200
+    assert response.json() == {"version": "v1", "in_progress": False, "pid": os.getpid(), "broadcast": False}
+    assert kills == []
+
+
+def test_admin_reload_in_worker_is_broadcast_by_the_master(reloader, kills, monkeypatch):
+    monkeypatch.setattr(server, "_master_pid", 4242)
+    response = _post_reload()
+
+    assert response.json()["broadcast"] is True
+    assert kills == [(4242, signal.SIGHUP)]
+    assert reloader.reasons == ["admin"]
+
+    # A cópia do sinal devolvida pelo mestre não recarrega de novo o worker que pediu
+    server._on_worker_reload_signal(signal.SIGHUP, None)
+    assert reloader.reasons == ["admin"]
+    # Os demais workers recarregam ao receber o sinal
+    server._on_worker_reload_signal(signal.SIGHUP, None)
+    deadline = time.monotonic() + 2
+    while reloader.reasons == ["admin"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert reloader.reasons == ["admin", "broadcast"]
+
+
+def test_master_forwards_reload_to_every_worker_and_reloads_itself(reloader, kills):
+    prefork = server.PreforkServer(workers=2, report_interval=0)
+    prefork.children = {111: 0, 222: 1}
+    try:
+        prefork.broadcast_reload()
+    finally:
+        gc.unfreeze()
+
+    assert sorted(kills) == [(111, signal.SIGHUP), (222, signal.SIGHUP)]
+    assert reloader.reasons == ["broadcast"]